@@ -0,0 +1,124 @@
+# benchmarks/_common.py
+"""Tiện ích chung cho các benchmark: thống kê, lưu JSON, so sánh 2 lần chạy."""
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+
+def summarize(samples_ns):
+    """Thống kê phân phối (đơn vị ms) từ danh sách thời gian tính bằng ns."""
+    if not samples_ns:
+        return {"n": 0}
+    xs = sorted(samples_ns)
+    n = len(xs)
+
+    def pct(p):
+        k = (n - 1) * p
+        lo, hi = math.floor(k), math.ceil(k)
+        return (xs[lo] + (xs[hi] - xs[lo]) * (k - lo)) / 1e6
+
+    mean = sum(xs) / n
+    var = sum((x - mean) ** 2 for x in xs) / n
+    return {
+        "n": n,
+        "mean_ms": mean / 1e6,
+        "stdev_ms": math.sqrt(var) / 1e6,
+        "min_ms": xs[0] / 1e6,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": xs[-1] / 1e6,
+    }
+
+
+def run_meta(**extra):
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def save_results(path, results, meta):
+    """results: {tên_metric: stats}. Ghi JSON (tạo thư mục nếu cần)."""
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base, new, threshold=0.10, metric="p50_ms"):
+    """
+    So sánh 2 file kết quả. Trả về list (tên, base, new, tỉ lệ, trạng thái)
+    với trạng thái 'REGRESSION' nếu new > base * (1 + threshold), 'improved' nếu nhanh hơn tương ứng.
+    """
+    rows = []
+    b_res, n_res = base["results"], new["results"]
+    for name in sorted(set(b_res) | set(n_res)):
+        b, n = b_res.get(name, {}).get(metric), n_res.get(name, {}).get(metric)
+        if b is None or n is None:
+            rows.append((name, b, n, None, "missing"))
+            continue
+        ratio = n / b if b > 0 else float("inf") if n > 0 else 1.0
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 - threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, b, n, ratio, status))
+    return rows
+
+
+def print_table(results, metrics=("n", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")):
+    width = max((len(k) for k in results), default=10)
+    print(f"{'metric':<{width}}  " + "  ".join(f"{m:>9}" for m in metrics))
+    for name in sorted(results):
+        st = results[name]
+        cells = []
+        for m in metrics:
+            v = st.get(m)
+            cells.append(f"{v:>9}" if isinstance(v, int) else f"{v:>9.3f}" if v is not None else f"{'-':>9}")
+        print(f"{name:<{width}}  " + "  ".join(cells))
+
+
+def print_compare(rows, metric):
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'metric':<{width}}  {'base':>9}  {'new':>9}  {'ratio':>7}  status   ({metric})")
+    for name, b, n, ratio, status in rows:
+        fb = f"{b:9.3f}" if b is not None else f"{'-':>9}"
+        fn = f"{n:9.3f}" if n is not None else f"{'-':>9}"
+        fr = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{name:<{width}}  {fb}  {fn}  {fr}  {status}")
+
+
+def compare_main(args):
+    """Dùng chung cho lệnh 'compare' của các benchmark; trả mã thoát 1 nếu có regression."""
+    rows = compare(load_results(args.base), load_results(args.new), args.threshold, args.metric)
+    print_compare(rows, args.metric)
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) vượt ngưỡng {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+def add_compare_parser(sub):
+    p = sub.add_parser("compare", help="so sánh 2 file kết quả JSON")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="ngưỡng regression (mặc định 0.10 = 10%%)")
+    p.add_argument("--metric", default="p50_ms")
+    return p
@@ -0,0 +1,349 @@
+# benchmarks/core_logic.py
+"""
+Micro-benchmark cho logic lõi (không vẽ):
+  GameManager._check_win_from / resolve_answer      theo cỡ bàn x win_length
+  event_engine.plan / apply_immediate / resolve_answer cho từng event id
+  QuestionManager: load ngân hàng + get_question      theo số câu (+ dedup find_clusters, rút theo tag mix,
+                                                      SharedBank publish / attach + MatchCursor, prepare_reload
+                                                      — kèm kiểm tra câu đã phát không bị phát lại)
+  utils.helpers.wrap_lines                            theo độ dài đoạn văn (cache text_metrics nóng / nguội)
+  event_placement.generate_layout / validate_layout   theo cỡ bàn (20% số ô là ô sự kiện)
+  answer_judge: dựng AnswerBook + chấm (đúng / số / gần đúng / sai) theo số biến thể đáp án mỗi câu
+
+Mỗi metric: warm-up, rồi `repeat` lần đo, mỗi lần `number` lời gọi -> thống kê thời gian/lời gọi.
+
+    python -m benchmarks.core_logic run --out bench_results/core.json
+    python -m benchmarks.core_logic run --only event_engine --sizes 15 50
+    python -m benchmarks.core_logic compare base.json new.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from benchmarks._common import summarize, run_meta, save_results, print_table, add_compare_parser, compare_main
+
+GROUPS = ("win_check", "resolve", "event_engine", "question_bank", "wrap_lines", "event_placement", "answer_judge")
+
+
+def measure(fn, setup=None, number=100, repeat=7, warmup=1):
+    """
+    Đo fn(state) với state = setup() dựng lại trước MỖI lần gọi (không tính vào thời gian).
+    Trả về danh sách ns/lời gọi cho từng lần repeat.
+    """
+    samples = []
+    for i in range(warmup + repeat):
+        total = 0
+        for _ in range(number):
+            state = setup() if setup else None
+            t0 = time.perf_counter_ns()
+            fn(state)
+            total += time.perf_counter_ns() - t0
+        if i >= warmup:
+            samples.append(total // number)
+    return samples
+
+
+# ---------------- Fixtures ----------------
+def _make_game(size, win_length, fill=0.35, seed=0):
+    import core.board as board_mod
+    from core.board import Board
+    from core.game_manager import GameManager
+    from core.player import Player
+
+    board_mod.DEBUG_ASSIGN_ALL_EVENTS = False
+    rng = random.Random(seed)
+    board = Board(size, 0)
+    players = [Player("Đội A", "A", (0, 0, 0)), Player("Đội B", "B", (0, 0, 0)), Player("Đội C", "C", (0, 0, 0))]
+    gm = GameManager(board, players, win_length=win_length)
+    for row in board.cells:
+        for cell in row:
+            if rng.random() < fill:
+                cell.owner = rng.choice("ABC")
+    return board, gm, rng
+
+
+_SYLLABLES = ("an", "bình", "cao", "dương", "đông", "giang", "hà", "khánh", "lạc", "minh", "nam", "phú",
+              "quang", "sơn", "tây", "thanh", "trung", "vĩnh", "xuân", "yên", "hải", "long", "mỹ", "ninh")
+_SUBJECTS = ("toán", "văn", "sử", "địa")
+
+
+def _write_bank(n, seed=0):
+    # Nội dung ngẫu nhiên từ ghép âm tiết: các câu khác nhau thật (không bị dedup gom cụm)
+    rng = random.Random(seed)
+
+    def phrase(k):
+        return " ".join(rng.choice(_SYLLABLES) + rng.choice(_SYLLABLES) for _ in range(k))
+
+    data = []
+    for i in range(n):
+        opts = [phrase(4) for _ in range(4)]
+        data.append({"question": f"Câu {i}: {phrase(10)}?", "options": opts, "answer": rng.choice("ABCD"),
+                     "subject": _SUBJECTS[i % len(_SUBJECTS)], "grade": 1 + i % 5})
+    fd, path = tempfile.mkstemp(suffix=".json", prefix="bench_bank_")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path
+
+
+# ---------------- Groups ----------------
+def bench_win_check(results, args):
+    for size in args.sizes:
+        for L in args.win_lengths:
+            board, gm, rng = _make_game(size, L, fill=0.5)
+            cells = [(r, c, board.cells[r][c].owner) for r in range(size) for c in range(size) if board.cells[r][c].owner]
+            rng.shuffle(cells)
+            it = iter(cells * 1000)
+            results[f"win_check/_check_win_from/size={size}/L={L}"] = summarize(
+                measure(lambda _: gm._check_win_from(*next(it)), number=args.number, repeat=args.repeat, warmup=args.warmup))
+
+
+def bench_resolve(results, args):
+    for size in args.sizes:
+        for L in args.win_lengths:
+            board, gm, rng = _make_game(size, L, fill=0.3)
+            empties = [c for row in board.cells for c in row if c.owner is None]
+
+            def setup():
+                cell = empties[rng.randrange(len(empties))]
+                cell.owner = None
+                return cell
+
+            results[f"resolve/GameManager.resolve_answer/size={size}/L={L}"] = summarize(
+                measure(lambda cell: gm.resolve_answer(cell, rng.random() < 0.7), setup,
+                        number=args.number, repeat=args.repeat, warmup=args.warmup))
+
+
+def bench_event_engine(results, args):
+    from core import event_engine as ee
+    from core.event_mapping import EVENT_TYPE_MAP
+
+    ids = list(ee.KNOWN_EVENT_IDS) + ["CHAOS_MODE"]
+    size = min(args.sizes)
+    board, gm, rng = _make_game(size, 5, fill=0.4)
+    snapshot = [(c, c.owner) for row in board.cells for c in row]
+
+    def reset():
+        for c, owner in snapshot:
+            c.owner, c.protected, c.blocked = owner, False, False
+        gm.current_idx, gm.turn_dir, gm.skip_symbol = 0, 1, None
+        del gm.match_log[:]
+
+    def fresh_ctx(eid):
+        def setup():
+            reset()
+            cell = board.cells[rng.randrange(size)][rng.randrange(size)]
+            ctx = ee.plan(eid, EVENT_TYPE_MAP.get(eid, "bonus"), gm, cell)
+            ctx.selected_target_cells = [c for c, o in snapshot[:3] if o]
+            return ctx, cell
+        return setup
+
+    n = max(1, args.number // 4)
+    for eid in ids:
+        et = EVENT_TYPE_MAP.get(eid, "bonus")
+        results[f"event_engine/plan/{eid}"] = summarize(
+            measure(lambda _: ee.release(ee.plan(eid, et, gm, None)), number=args.number, repeat=args.repeat, warmup=args.warmup))
+        results[f"event_engine/apply_immediate/{eid}"] = summarize(
+            measure(lambda st: ee.apply_immediate(st[0], gm, st[1], board), fresh_ctx(eid), number=n, repeat=args.repeat, warmup=args.warmup))
+        results[f"event_engine/resolve_answer/{eid}"] = summarize(
+            measure(lambda st: ee.resolve_answer(st[0], gm, st[1], True), fresh_ctx(eid), number=n, repeat=args.repeat, warmup=args.warmup))
+
+
+def bench_question_bank(results, args):
+    from core.question_manager import QuestionManager
+    from core.question_dedup import find_clusters, cache_path
+    from core.shared_bank import SharedBank, MatchCursor
+
+    for n in args.bank_sizes:
+        path = _write_bank(n)
+        try:
+            reps = max(1, min(args.repeat, 20000 // max(1, n)))
+            results[f"question_bank/load/n={n}"] = summarize(
+                measure(lambda _: QuestionManager(path, seed=1), number=1, repeat=max(3, reps), warmup=1))
+            qm = QuestionManager(path, seed=1)
+            results[f"question_bank/find_clusters/n={n}"] = summarize(
+                measure(lambda _: find_clusters(qm._all), number=1, repeat=max(3, reps), warmup=1))
+
+            def drain(_):
+                qm.reset_served()
+                while qm.get_question() is not None:
+                    pass
+
+            per_call = [ns // max(1, n) for ns in measure(drain, number=1, repeat=args.repeat, warmup=args.warmup)]
+            results[f"question_bank/get_question/n={n}"] = summarize(per_call)
+
+            # rút theo tỉ lệ tag lệch (toán cạn trước -> phải cân lại trọng số giữa chừng)
+            qm.set_tag_mix({"subject:toán": 4, "subject:văn": 2, "subject:sử": 1, "grade:1": 1})
+            per_call = [ns // max(1, n) for ns in measure(drain, number=1, repeat=args.repeat, warmup=args.warmup)]
+            results[f"question_bank/get_question_tagged/n={n}"] = summarize(per_call)
+
+            # shared memory: chủ sở hữu publish một lần, mỗi worker attach + dựng con trỏ riêng
+            def publish(_):
+                b = SharedBank.from_manager(qm)
+                b.close()
+                b.unlink()
+
+            results[f"question_bank/shared_publish/n={n}"] = summarize(
+                measure(publish, number=1, repeat=max(3, reps), warmup=1))
+            bank = SharedBank.from_manager(qm)
+            try:
+                def attach(_):
+                    b = SharedBank.attach(bank.name)
+                    MatchCursor(b, seed=1).get_question()
+                    b.close()
+
+                results[f"question_bank/shared_attach/n={n}"] = summarize(
+                    measure(attach, number=1, repeat=max(3, reps), warmup=1))
+            finally:
+                bank.close()
+                bank.unlink()
+
+            # hot reload trên ngân hàng không khai báo id (id theo vị trí): xoá hai câu đầu + chèn một câu mới ở đầu
+            # (id theo vị trí của mọi câu sau đó lệch 1).
+            # Kiểm tra luôn: câu đã phát trước khi nạp lại không được phát lại (kể cả khi sửa tại chỗ).
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            rq = QuestionManager(path, seed=1, dedup=False)
+            served = {rq.get_question()["question"] for _ in range(min(20, n // 4))}
+            data = [{"question": "Câu chèn đầu?", "options": ["x", "y"], "answer": "A"}] + data[2:]
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            results[f"question_bank/prepare_reload/n={n}"] = summarize(
+                measure(lambda _: rq.prepare_reload(), number=1, repeat=max(3, reps), warmup=1))
+            rq.apply_reload(rq.prepare_reload())
+            # sửa lỗi chính tả tại chỗ một câu đã phát (nội dung đổi, vị trí giữ nguyên) -> vẫn là câu đã phát
+            i = next(i for i, raw in enumerate(data) if raw["question"] in served)
+            served.add(data[i]["question"] + " (đã sửa)")
+            data[i] = dict(data[i], question=data[i]["question"] + " (đã sửa)")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            rq.apply_reload(rq.prepare_reload())
+            again = set()
+            while True:
+                q = rq.get_question()
+                if q is None:
+                    break
+                if q["question"] in served:
+                    again.add(q["question"])
+            if again:
+                raise RuntimeError(f"hot reload: {len(again)} câu đã phát bị phát lại sau khi thêm / xoá / sửa dòng")
+        finally:
+            os.remove(path)
+            if os.path.exists(cache_path(path)):
+                os.remove(cache_path(path))
+
+
+def bench_wrap_lines(results, args):
+    import pygame
+    from utils.helpers import get_font, wrap_lines
+    from utils import text_metrics
+
+    pygame.font.init()
+    font = get_font("body", "medium")
+    base = "Đơn vị tiền tệ của Nhật Bản là gì? Chất khí nào cần thiết cho sự sống của con người? "
+    for words in (10, 50, 200):
+        text = " ".join((base * (words // 10 + 1)).split()[:words])
+        for width in (300, 700):
+            results[f"wrap_lines/words={words}/width={width}"] = summarize(
+                measure(lambda _: wrap_lines(font, text, width), number=args.number, repeat=args.repeat, warmup=args.warmup))
+        # lần đầu gặp font (cache advance / kerning / từ còn trống)
+        results[f"wrap_lines/cold/words={words}"] = summarize(
+            measure(lambda _: wrap_lines(font, text, 300), text_metrics._metrics.clear,
+                    number=max(1, args.number // 10), repeat=args.repeat, warmup=args.warmup))
+
+
+def bench_event_placement(results, args):
+    from core.event_placement import generate_layout, validate_layout
+
+    for size in args.sizes:
+        count = size * size // 5
+        seeds = iter(range(10 ** 9))
+        results[f"event_placement/generate_layout/size={size}"] = summarize(
+            measure(lambda _: generate_layout(size, count, seed=next(seeds)), number=max(1, args.number // 10),
+                    repeat=args.repeat, warmup=args.warmup))
+        layout = generate_layout(size, count, seed=0)
+        results[f"event_placement/validate_layout/size={size}"] = summarize(
+            measure(lambda _: validate_layout(layout), number=max(1, args.number // 10),
+                    repeat=args.repeat, warmup=args.warmup))
+
+
+def bench_answer_judge(results, args):
+    from core.answer_judge import AnswerBook
+    from core.question_manager import normalize_question
+
+    rng = random.Random(0)
+    words = ["thành", "phố", "Hồ", "Chí", "Minh", "sông", "Cửu", "Long", "Hà", "Nội", "Đà", "Nẵng", "Huế", "vịnh"]
+    for variants in (1, 10, 100):
+        bank = [normalize_question({"id": f"t{i}", "question": f"Câu {i}?", "type": "text",
+                                    "answer": " ".join(rng.sample(words, 3)),
+                                    "accept": [" ".join(rng.sample(words, 3)) for _ in range(variants - 1)]}, i)
+                for i in range(min(2000, 20000 // variants))]
+        results[f"answer_judge/build_book/questions={len(bank)}/variants={variants}"] = summarize(
+            measure(lambda _: AnswerBook(bank), number=1, repeat=max(3, args.repeat // 2), warmup=1))
+        book = AnswerBook(bank)
+        q = bank[0]
+        entry = book.for_question(q)
+        typo = q["answer"][:-2] + q["answer"][-1] + q["answer"][-2]
+        for label, text in (("exact", q["answer"].upper()), ("fuzzy", typo), ("wrong", "không biết"),
+                            ("number", "1.000,5")):
+            results[f"answer_judge/match_{label}/variants={variants}"] = summarize(
+                measure(lambda _: entry.match(text), number=args.number, repeat=args.repeat, warmup=args.warmup))
+
+
+RUNNERS = {
+    "win_check": bench_win_check,
+    "resolve": bench_resolve,
+    "event_engine": bench_event_engine,
+    "question_bank": bench_question_bank,
+    "wrap_lines": bench_wrap_lines,
+    "event_placement": bench_event_placement,
+    "answer_judge": bench_answer_judge,
+}
+
+
+def cmd_run(args):
+    import pygame
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((1, 1))  # Board nạp icon bằng convert_alpha
+    results = {}
+    for group in args.only or GROUPS:
+        t0 = time.perf_counter()
+        RUNNERS[group](results, args)
+        print(f"[bench] {group}: {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    print_table(results, metrics=("n", "mean_ms", "p50_ms", "min_ms", "stdev_ms"))
+    if args.out:
+        save_results(args.out, results, run_meta(
+            benchmark="core_logic", groups=list(args.only or GROUPS), sizes=args.sizes,
+            win_lengths=args.win_lengths, bank_sizes=args.bank_sizes,
+            number=args.number, repeat=args.repeat, warmup=args.warmup,
+        ))
+        print(f"\nĐã lưu: {args.out}")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Micro-benchmark logic lõi của game.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run", help="chạy benchmark và in/lưu kết quả")
+    p.add_argument("--only", nargs="+", choices=GROUPS)
+    p.add_argument("--sizes", type=int, nargs="+", default=[15, 50, 100])
+    p.add_argument("--win-lengths", type=int, nargs="+", default=[3, 5])
+    p.add_argument("--bank-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    p.add_argument("--number", type=int, default=200, help="số lời gọi mỗi lần đo")
+    p.add_argument("--repeat", type=int, default=7)
+    p.add_argument("--warmup", type=int, default=1, help="số lần đo bỏ đi ở đầu")
+    p.add_argument("--out", help="đường dẫn file JSON kết quả")
+    add_compare_parser(sub)
+    args = ap.parse_args(argv)
+    return cmd_run(args) if args.cmd == "run" else compare_main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
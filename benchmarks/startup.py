@@ -0,0 +1,75 @@
+# benchmarks/startup.py
+"""
+Benchmark thời gian khởi động: chạy main.py trong tiến trình con (headless) N lần,
+mỗi lần thoát ngay sau frame đầu của màn chơi (COCARO_EXIT_AFTER_STARTUP=1), rồi đọc dòng [STARTUP]:
+  first_frame   từ đầu main.py tới khi splash hiện lên
+  bank_ready    ngân hàng câu hỏi đã đọc xong (thread nền)
+  ready         frame đầu tiên của màn chơi
+  process       tổng thời gian tiến trình con (gồm khởi động Python + import pygame)
+
+    python -m benchmarks.startup run --runs 10 --out bench_results/startup.json
+    python -m benchmarks.startup compare base.json new.json
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from benchmarks._common import summarize, run_meta, save_results, print_table, add_compare_parser, compare_main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"^\[STARTUP\]\s+(.*)$", re.M)
+
+
+def run_once(timeout):
+    env = dict(os.environ, COCARO_EXIT_AFTER_STARTUP="1")
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    t0 = time.perf_counter_ns()
+    proc = subprocess.run([sys.executable, "main.py"], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    total = time.perf_counter_ns() - t0
+    m = _LINE.search(proc.stdout)
+    if proc.returncode != 0 or not m:
+        raise RuntimeError(f"main.py exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+    stats = {k: float(v) for k, v in (kv.split("=") for kv in m.group(1).split())}
+    stats["process_ms"] = total / 1e6
+    return stats
+
+
+def cmd_run(args):
+    samples = {}
+    for i in range(args.warmup + args.runs):
+        stats = run_once(args.timeout)
+        if i < args.warmup:
+            continue
+        for k, ms in stats.items():
+            samples.setdefault(k[:-3] if k.endswith("_ms") else k, []).append(int(ms * 1e6))
+    results = {f"startup/{k}": summarize(xs) for k, xs in samples.items()}
+    print_table(results, metrics=("n", "mean_ms", "p50_ms", "min_ms", "max_ms"))
+    if args.out:
+        save_results(args.out, results, run_meta(
+            benchmark="startup", runs=args.runs, warmup=args.warmup,
+            video_driver=os.environ.get("SDL_VIDEODRIVER", "dummy"),
+        ))
+        print(f"\nĐã lưu: {args.out}")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark thời gian khởi động game (headless).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run", help="chạy main.py nhiều lần và in/lưu kết quả")
+    p.add_argument("--runs", type=int, default=10)
+    p.add_argument("--warmup", type=int, default=1, help="số lần chạy bỏ đi ở đầu (cache đĩa)")
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--out", help="đường dẫn file JSON kết quả")
+    add_compare_parser(sub)
+    args = ap.parse_args(argv)
+    return cmd_run(args) if args.cmd == "run" else compare_main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
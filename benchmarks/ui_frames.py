@@ -0,0 +1,362 @@
+# benchmarks/ui_frames.py
+"""
+Benchmark thời gian vẽ mỗi frame của UI, chạy headless (SDL dummy video driver).
+
+Phát lại một phiên chơi theo kịch bản trên các bàn từ 5x5 tới 100x100. Mọi thao tác là sự kiện pygame
+được post vào hàng đợi (click, lăn chuột, phím) và xử lý như main.py; mỗi sự kiện được vẽ --event-frames frame:
+  board_idle        bàn đứng yên
+  click_cells       click ô trống -> QuestionPopup -> chọn đáp án đúng -> "Đáp án" -> "Xong" (ô bị chiếm)
+  question_popup    QuestionPopup có đáp án dài, lăn chuột xuống hết rồi lên lại
+  event_intro       click ô sự kiện -> EventIntroPopup của từng event, lăn mô tả, bấm nút đóng
+  target_selection  giữa ván: Tab / click chọn ô mục tiêu, đủ ô -> ConfirmationPopup -> "Hủy"
+
+Đo riêng từng lời gọi Board.draw, SidebarPanel.draw và draw của mỗi popup.
+
+    python -m benchmarks.ui_frames run --out bench_results/ui.json
+    python -m benchmarks.ui_frames compare base.json new.json --threshold 0.1
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from benchmarks._common import summarize, run_meta, save_results, print_table, add_compare_parser, compare_main
+
+DEFAULT_SIZES = (5, 10, 25, 50, 100)
+FRAMES_PER_EVENT = 20  # số frame vẽ sau mỗi sự kiện: frame đầu dựng lại, phần còn lại là vẽ ổn định
+
+
+class FrameTimer:
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, name, fn, *args):
+        t0 = time.perf_counter_ns()
+        out = fn(*args)
+        self.samples.setdefault(name, []).append(time.perf_counter_ns() - t0)
+        return out
+
+
+def _setup(size, seed):
+    import pygame
+    import core.board as board_mod
+    from core.board import Board, GUTTER_SIZE
+    from core.game_manager import GameManager
+    from core.player import Player
+    from ui.sidebar_panel import SidebarPanel
+    from utils.camera import Camera
+    from utils.colors import TEAM_COLORS
+    from utils.config import CELL_SIZE, MARGIN, PANEL_WIDTH, MAX_BOARD_VIEW, WIN_LENGTH
+
+    random.seed(seed)
+    board_mod.DEBUG_ASSIGN_ALL_EVENTS = False
+    world = size * (CELL_SIZE + MARGIN)
+    view = min(world, MAX_BOARD_VIEW)
+    screen = pygame.display.set_mode((view + MARGIN + PANEL_WIDTH + GUTTER_SIZE, max(640, view + MARGIN + GUTTER_SIZE)))
+    board = Board(size, max(1, size * size // 5))
+    camera = Camera((MARGIN + GUTTER_SIZE, MARGIN + GUTTER_SIZE, view, view), world, world)
+    camera.fit()
+    board.camera = camera
+    players = [Player(f"Đội {s}", s, TEAM_COLORS[s]) for s in "ABC"]
+    gm = GameManager(board, players, win_length=WIN_LENGTH)
+    sidebar = SidebarPanel(view + MARGIN + GUTTER_SIZE + 20, 10, PANEL_WIDTH - 40)
+    for i in range(20):
+        sidebar.add_log(f"Đội {'ABC'[i % 3]} đã chiếm ô {chr(65 + i % 26)}{i + 1}.")
+    return screen, board, gm, sidebar
+
+
+def _frame(screen, timer, board, gm, sidebar, popups=()):
+    from utils.colors import BACKGROUND_LIGHT
+    t0 = time.perf_counter_ns()
+    screen.fill(BACKGROUND_LIGHT)
+    timer.time("Board.draw", board.draw, screen)
+    timer.time("SidebarPanel.draw", sidebar.draw, screen, gm, gm.win_length)
+    for popup in popups:
+        timer.time(f"{type(popup).__name__}.draw", popup.draw, screen)
+    timer.samples.setdefault("frame", []).append(time.perf_counter_ns() - t0)
+
+
+def _long_question(questions):
+    q = dict(questions[0])
+    q["question"] = " ".join(x["question"] for x in questions[:4])
+    q["options"] = [" ".join([opt] * 12) for opt in q["options"]] + ["Phương án bổ sung rất dài " * 8]
+    q["id"] = "bench-long"
+    return q
+
+
+class InputFeed:
+    """
+    Đăng (post) sự kiện chuột/phím vào hàng đợi pygame như người chơi thật và nhớ vị trí con trỏ
+    (SDL dummy không di chuyển được chuột: pygame.mouse.set_pos không có tác dụng).
+    """
+
+    def __init__(self):
+        self.pos = (0, 0)
+
+    def click(self, pos):
+        import pygame
+        self.pos = (int(pos[0]), int(pos[1]))
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=self.pos))
+
+    def wheel(self, y, pos=None):
+        import pygame
+        if pos is not None:
+            self.pos = (int(pos[0]), int(pos[1]))
+        pygame.event.post(pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=y, flipped=False))
+
+    def key(self, key, mod=0):
+        import pygame
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode="", scancode=0))
+
+
+def _play(screen, timer, board, gm, sidebar, script, handle, popups, per_event, frames=None):
+    """
+    Chạy một kịch bản theo sự kiện: mỗi bước của `script` đăng (0 hoặc 1) sự kiện rồi được vẽ `per_event` frame.
+    Mỗi frame: lấy hàng đợi pygame -> handle(event) -> vẽ (như vòng lặp trong main.py), nên frame đầu sau
+    sự kiện chịu phần dựng lại, các frame sau là vẽ ổn định. Dừng khi script hết bước hoặc đã vẽ đủ `frames`.
+    """
+    import pygame
+    drawn = 0
+    for _ in script:
+        for _ in range(per_event):
+            for event in pygame.event.get():
+                handle(event)
+            _frame(screen, timer, board, gm, sidebar, popups())
+        drawn += per_event
+        if frames is not None and drawn >= frames:
+            break
+
+
+def _cell_center(board, cell):
+    from utils.config import CELL_SIZE, MARGIN
+    step = CELL_SIZE + MARGIN
+    return board.camera.to_screen(cell.col * step + CELL_SIZE / 2, cell.row * step + CELL_SIZE / 2)
+
+
+def run_scenarios(size, frames, seed, per_event=FRAMES_PER_EVENT):
+    """
+    Chạy mọi kịch bản cho một cỡ bàn; trả về {scene/component: [ns...]}.
+    Mọi thao tác đi qua sự kiện pygame (click qua Board.get_cell_at / handle_event của popup, lăn chuột,
+    phím), mỗi sự kiện được vẽ `per_event` frame.
+    """
+    import math
+    import pygame
+    from core.answer_judge import is_text_question
+    from core.event_data import EVENT_INFO
+    from core.event_mapping import EVENT_TYPE_MAP
+    from core.question_manager import QuestionManager
+    from core.target_selection import TargetSelection
+    from ui.popup_question import QuestionPopup
+    from ui.popup_event_intro import EventIntroPopup
+    from ui.popup_confirmation import ConfirmationPopup
+    from utils.config import DATA_PATH
+
+    screen, board, gm, sidebar = _setup(size, seed)
+    qm = QuestionManager(DATA_PATH, seed=seed)
+    rng = random.Random(seed)
+    feed = InputFeed()
+    out = {}
+
+    def record(scene, timer):
+        for comp, xs in timer.samples.items():
+            out[f"{scene}/{comp}"] = xs
+
+    def play(timer, script, handle, popups=lambda: (), limit=frames):
+        _play(screen, timer, board, gm, sidebar, script, handle, popups, per_event, limit)
+
+    # 1) Bàn đứng yên
+    timer = FrameTimer()
+    for _ in range(frames):
+        _frame(screen, timer, board, gm, sidebar)
+    record("board_idle", timer)
+
+    # 2) Click ô trống -> QuestionPopup -> chọn đáp án đúng -> "Đáp án" -> "Xong" -> ô bị chiếm
+    timer = FrameTimer()
+    empties = [c for row in board.cells for c in row if c.owner is None and not c.event_type]
+    rng.shuffle(empties)
+    turn = {"cell": None, "popup": None}
+
+    def next_choice_question():
+        for _ in range(50):
+            q = qm.get_question()
+            if q and not is_text_question(q):
+                return q
+        raise RuntimeError("Ngân hàng câu hỏi không có câu trắc nghiệm.")
+
+    def on_click_cells(event):
+        popup = turn["popup"]
+        if popup is None:
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                cell = board.get_cell_at(event.pos)
+                if cell and cell.owner is None:
+                    turn["cell"] = cell
+                    turn["popup"] = QuestionPopup(next_choice_question(), team_label=gm.current_player.symbol, seconds=10 ** 6)
+            return
+        popup.handle_event(event, feed.pos)
+        if popup.is_finished():
+            name = gm.current_player.name
+            gm.resolve_answer(turn["cell"], popup.was_correct())
+            sidebar.add_log(f"{name} đã chiếm ô.")
+            turn["popup"] = None
+
+    def click_cells():
+        for cell in empties:
+            feed.click(_cell_center(board, cell))
+            yield
+            popup = turn["popup"]
+            if popup is None:
+                continue
+            option = popup._option_content_rects[max(0, popup._correct_answer_idx)]
+            while not popup._viewport.colliderect(option.move(0, -popup.scroll_y)) and popup.scroll_y < popup.max_scroll:
+                feed.wheel(-1, popup._viewport.center)
+                yield
+            feed.click(popup._viewport.clip(option.move(0, -popup.scroll_y)).center)
+            yield
+            for _ in range(2):  # "Đáp án" (lộ kết quả) rồi "Xong"
+                feed.click(popup._last_done_rect.center)
+                yield
+
+    play(timer, click_cells(), on_click_cells, lambda: (turn["popup"],) if turn["popup"] else ())
+    record("click_cells", timer)
+
+    # 3) QuestionPopup dài, lăn chuột xuống hết rồi lên lại
+    timer = FrameTimer()
+    popup = QuestionPopup(_long_question(qm.peek_questions(4)), team_label="A", seconds=10 ** 6)
+
+    def scroll_question():
+        yield  # mở popup: frame đầu dựng layout, chưa có max_scroll
+        step = -1
+        while True:
+            if popup.scroll_y >= popup.max_scroll:
+                step = 1
+            elif popup.scroll_y <= 0:
+                step = -1
+            feed.wheel(step, popup._viewport.center)
+            yield
+
+    play(timer, scroll_question(), lambda event: popup.handle_event(event, feed.pos), lambda: (popup,))
+    record("question_popup", timer)
+
+    # 4) Click ô sự kiện -> EventIntroPopup (icon thật) của từng event, lăn mô tả, bấm nút đóng
+    timer = FrameTimer()
+    ids = list(EVENT_TYPE_MAP)
+    free = [c for row in board.cells for c in row if c.owner is None]
+    rng.shuffle(free)
+    intro = {"popup": None}
+
+    def on_event_intro(event):
+        popup = intro["popup"]
+        if popup is None:
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                cell = board.get_cell_at(event.pos)
+                if cell and cell.event_type:
+                    eid = cell.event_id
+                    path = os.path.join("assets", "images", "events", f"{eid}.png")
+                    icon = pygame.image.load(path).convert_alpha() if os.path.exists(path) else None
+                    info = EVENT_INFO.get(eid, {})
+                    intro["popup"] = EventIntroPopup(eid, info.get("title", eid), info.get("desc", "") * 6, icon, cell.event_type)
+            return
+        popup.handle_event(event)
+        if popup.is_finished():
+            intro["popup"] = None
+
+    def event_intros():
+        for eid, cell in zip(ids, free):
+            cell.event_id, cell.event_type = eid, EVENT_TYPE_MAP[eid]  # đặt event lên một ô trống rồi click ô đó
+            feed.click(_cell_center(board, cell))
+            yield
+            popup = intro["popup"]
+            notches = max(1, math.ceil(popup.max_scroll / 30 / 3))  # tới cuối mô tả trong tối đa 3 lần lăn
+            while popup.scroll_y < popup.max_scroll:
+                feed.wheel(-notches)
+                yield
+            feed.click(popup.btn_rect.center)
+            yield
+
+    play(timer, event_intros(), on_event_intro, lambda: (intro["popup"],) if intro["popup"] else (), limit=None)
+    record("event_intro", timer)
+
+    # 5) Chọn mục tiêu giữa ván: Tab qua các ô đối thủ, click chọn; đủ ô -> ConfirmationPopup -> "Hủy"
+    timer = FrameTimer()
+    symbols = [p.symbol for p in gm.players]
+    free = [c for row in board.cells for c in row if c.owner is None and not c.event_type]
+    for cell in rng.sample(free, len(free) // 3):
+        cell.owner = rng.choice(symbols)
+    enemy = gm.players[(gm.current_idx + 1) % len(gm.players)].symbol
+    sel = board.target_selection = TargetSelection(board, [c for row in board.cells for c in row if c.owner == enemy], 2)
+    target = {"confirm": None}
+
+    def on_target(event):
+        confirm = target["confirm"]
+        if confirm is not None:
+            confirm.handle_event(event)
+            if confirm.result == "cancel":
+                sel.pop()
+                target["confirm"] = None
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            cell = board.get_cell_at(event.pos)
+            if sel.contains(cell) and sel.point_at(cell) and sel.toggle(cell) and sel.is_complete:
+                target["confirm"] = ConfirmationPopup(message="Áp dụng lên ô B2?")
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_TAB:
+            sel.move(1)
+
+    def pick_targets():
+        i = 0
+        while True:
+            if target["confirm"] is not None:
+                feed.click(target["confirm"].cancel_rect.center)
+            elif i % 3 == 2 and sel.current is not None:
+                feed.click(_cell_center(board, sel.current))
+            else:
+                feed.key(pygame.K_TAB)
+            i += 1
+            yield
+
+    play(timer, pick_targets(), on_target, lambda: (target["confirm"],) if target["confirm"] else ())
+    board.target_selection = None
+    record("target_selection", timer)
+    return out
+
+
+def cmd_run(args):
+    import pygame
+    pygame.init()
+    results = {}
+    for size in args.sizes:
+        t0 = time.perf_counter()
+        samples = run_scenarios(size, args.frames, args.seed, args.event_frames)
+        for name, xs in samples.items():
+            results[f"{size}x{size}/{name}"] = summarize(xs[args.warmup:] or xs)
+        print(f"[bench] {size}x{size}: {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    pygame.quit()
+    print_table(results)
+    if args.out:
+        save_results(args.out, results, run_meta(
+            benchmark="ui_frames", sizes=list(args.sizes), frames=args.frames,
+            event_frames=args.event_frames, warmup=args.warmup, seed=args.seed, video_driver=os.environ.get("SDL_VIDEODRIVER"),
+        ))
+        print(f"\nĐã lưu: {args.out}")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark thời gian vẽ frame UI (headless).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run", help="chạy kịch bản và in/lưu kết quả")
+    p.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    p.add_argument("--frames", type=int, default=240, help="số frame mỗi kịch bản (event_intro: đủ mọi event)")
+    p.add_argument("--event-frames", type=int, default=FRAMES_PER_EVENT, help="số frame vẽ sau mỗi sự kiện")
+    p.add_argument("--warmup", type=int, default=5, help="bỏ qua N mẫu đầu mỗi metric")
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--out", help="đường dẫn file JSON kết quả")
+    add_compare_parser(sub)
+    args = ap.parse_args(argv)
+    return cmd_run(args) if args.cmd == "run" else compare_main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# core/answer_judge.py
+"""
+Chấm câu trả lời tự luận (câu không có "options"; đáp án ở "answer" + các biến thể chấp nhận ở "accept").
+
+- Chuẩn hoá: NFC, bỏ dấu tiếng Việt (đ -> d), chữ thường, bỏ dấu câu, gộp khoảng trắng.
+  "Hà  Nội." == "ha noi" == "HANOI" (so thêm bản bỏ hết khoảng trắng).
+- Số: "3,5" == "3.5" == "7/2" (Fraction); "1.000.000" == "1 000 000" == "1000000". Theo cách viết tiếng Việt,
+  một dấu chấm + đúng 3 chữ số là phân cách nghìn: "10.000" == 10000, "2.500" == 2500 (còn "2,500" == 2,5).
+  Số không chấm gần đúng.
+- Gần đúng: khoảng cách Damerau-Levenshtein (OSA, bit-parallel), ngân sách sửa theo độ dài đáp án (FUZZY_STEPS);
+  chỉ so với biến thể có độ dài chênh trong ngân sách và đủ bigram chung.
+- AnswerBook dựng một lần lúc nạp ngân hàng (QuestionManager._set_bank): mỗi câu tự luận một AcceptedAnswers
+  với khoá đã chuẩn hoá -> khớp đúng O(1), gần đúng chỉ quét vài biến thể cùng cỡ.
+- AnswerJudge chấm trên worker thread (như QuestionPrefetcher); popup hỏi kết quả mỗi frame qua JudgeTicket.
+  Quá hạn (timeout_ms) mà worker chưa xong -> chấm ngay ở main thread, chỉ khớp đúng (không gần đúng).
+"""
+import operator
+import queue
+import re
+import threading
+import time
+import unicodedata
+from fractions import Fraction
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.metrics import REGISTRY
+
+FUZZY_STEPS = ((4, 0), (8, 1), (16, 2))  # (độ dài < n, số lỗi cho phép); dài hơn: 3
+MAX_INPUT = 120
+
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_MARKS = re.compile("[\u0300-\u036f]")  # dấu thanh / dấu phụ sau NFD
+_FRACTION = re.compile(r"^([+-]?\d+)\s*/\s*(\d+)$")
+_NUMBER = re.compile(r"^([+-]?)(\d[\d., ]*)$")
+_DIGITS = re.compile(r"^\d+$")
+_THOUSANDS_DOT = re.compile(r"^[1-9]\d{0,2}\.\d{3}$")
+_GROUPED = {sep: re.compile(r"^\d{1,3}(?:%s\d{3})+$" % re.escape(sep)) for sep in ".,"}
+
+
+def is_text_question(q) -> bool:
+    """Câu tự luận: không có lựa chọn."""
+    return not q.get("options")
+
+
+def fold_text(s) -> str:
+    """Chuỗi so khớp: bỏ dấu, chữ thường, bỏ dấu câu, gộp khoảng trắng."""
+    s = _MARKS.sub("", unicodedata.normalize("NFD", str(s)).casefold()).replace("đ", "d")
+    return " ".join(_PUNCT.sub(" ", s).split())
+
+
+def parse_number(s) -> Optional[Fraction]:
+    """Giá trị số của chuỗi (dấu phẩy / chấm thập phân, phân cách nghìn, phân số a/b); None nếu không phải số."""
+    t = unicodedata.normalize("NFKC", str(s)).strip().replace("−", "-")
+    m = _FRACTION.match(t)
+    if m:
+        num, den = int(m.group(1)), int(m.group(2))
+        return Fraction(num, den) if den else None
+    m = _NUMBER.match(t)
+    if not m:
+        return None
+    sign, body = m.group(1), m.group(2).strip()
+    if " " in body:
+        # khoảng trắng chỉ được dùng làm phân cách nghìn: "1 000 000"
+        if not re.match(r"^\d{1,3}(?: \d{3})+(?:[.,]\d+)?$", body):
+            return None
+        body = body.replace(" ", "")
+    dots, commas = body.count("."), body.count(",")
+    if dots and commas:
+        dec = "." if body.rfind(".") > body.rfind(",") else ","
+    elif dots > 1 or commas > 1:
+        dec = None          # chỉ có phân cách nghìn: "1.000.000"
+    elif dots and _THOUSANDS_DOT.match(body):
+        dec = None          # "10.000", "2.500": dấu chấm + đúng 3 chữ số là phân cách nghìn (thập phân viết ",")
+    elif dots or commas:
+        dec = "." if dots else ","
+    else:
+        dec = None
+    int_part, _, frac = body.rpartition(dec) if dec else (body, "", "")
+    if not int_part or (frac and not _DIGITS.match(frac)):
+        return None
+    if not _DIGITS.match(int_part):
+        sep = {".": ",", ",": "."}.get(dec) or ("." if dots else ",")
+        if not _GROUPED[sep].match(int_part):
+            return None
+        int_part = int_part.replace(sep, "")
+    return Fraction(f"{sign}{int_part}.{frac or 0}")
+
+
+def answer_key(s) -> str:
+    """Khoá so khớp đúng: "#p/q" cho số, ngược lại fold_text."""
+    n = parse_number(s)
+    if n is not None:
+        return f"#{n.numerator}/{n.denominator}"
+    return fold_text(s)
+
+
+def fuzzy_budget(length: int) -> int:
+    for limit, edits in FUZZY_STEPS:
+        if length < limit:
+            return edits
+    return FUZZY_STEPS[-1][1] + 1
+
+
+def char_masks(s: str) -> Dict[str, int]:
+    """Bitmask vị trí của từng ký tự trong s (bit i <-> s[i]) cho osa_distance."""
+    masks: Dict[str, int] = {}
+    for i, ch in enumerate(s):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+
+def osa_distance(a: str, masks: Dict[str, int], m: int) -> int:
+    """
+    Khoảng cách OSA (thêm/xoá/thay/đổi chỗ hai ký tự kề) giữa a và chuỗi b độ dài m (masks = char_masks(b)).
+    Bit-parallel (Myers/Hyyrö): mỗi ký tự của a là vài phép toán trên số nguyên, không duyệt bảng DP.
+    """
+    if m == 0:
+        return len(a)
+    full, top = (1 << m) - 1, 1 << (m - 1)
+    vp, vn, score = full, 0, m
+    d0 = pm_prev = 0
+    for ch in a:
+        pm = masks.get(ch, 0)
+        tr = (((~d0) & pm) << 1) & pm_prev
+        x = pm | vn
+        d0 = (((x & vp) + vp) ^ vp) | x | tr
+        hp = vn | ~(d0 | vp)
+        hn = vp & d0
+        if hp & top:
+            score += 1
+        elif hn & top:
+            score -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = (hn | ~(d0 | hp)) & full
+        vn = hp & d0
+        pm_prev = pm
+    return score
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """osa_distance(a, b), chặn trên ở limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    return min(osa_distance(a, char_masks(b), len(b)), limit + 1)
+
+
+def _bigrams(s: str) -> frozenset:
+    return frozenset(map(operator.add, s, s[1:]))
+
+
+class Judgement:
+    """Kết quả chấm: correct, kind ("exact" | "number" | "fuzzy" | "wrong" | "empty" | "timeout"), đáp án chuẩn."""
+    __slots__ = ("correct", "kind", "expected", "distance")
+
+    def __init__(self, correct: bool, kind: str, expected: str, distance: int = 0):
+        self.correct = correct
+        self.kind = kind
+        self.expected = expected
+        self.distance = distance
+
+    def __repr__(self):
+        return f"Judgement({self.correct}, {self.kind!r}, {self.expected!r}, {self.distance})"
+
+
+class AcceptedAnswers:
+    """
+    Các biến thể đáp án đã chuẩn hoá của một câu tự luận. Biến thể chữ dựng sẵn (bản bỏ khoảng trắng,
+    char_masks, tập bigram) theo độ dài để phần gần đúng không phải chuẩn hoá / dựng lại gì.
+    """
+    __slots__ = ("question", "expected", "keys", "compact", "by_len")
+
+    def __init__(self, question, variants: Sequence[str]):
+        self.question = question
+        self.expected = str(variants[0]) if variants else ""
+        self.keys = frozenset(answer_key(v) for v in variants)
+        # bản bỏ khoảng trắng của biến thể chữ (số đã so bằng giá trị): "ha noi" ~ "hanoi"
+        texts = {k.replace(" ", "") for k in self.keys if not k.startswith("#")}
+        self.compact = frozenset(texts)
+        self.by_len: Dict[int, List[Tuple[str, Dict[str, int], frozenset]]] = {}
+        for t in sorted(texts):
+            self.by_len.setdefault(len(t), []).append((t, char_masks(t), _bigrams(t)))
+
+    @classmethod
+    def from_question(cls, q) -> "AcceptedAnswers":
+        return cls(q, accepted_variants(q))
+
+    def match(self, text: str, deadline: Optional[float] = None, fuzzy: bool = True) -> Judgement:
+        """Chấm text; deadline (perf_counter) chặn phần gần đúng -> "timeout" nếu chưa xét hết."""
+        text = str(text)[:MAX_INPUT]
+        key = answer_key(text)
+        if not key:
+            return Judgement(False, "empty", self.expected)
+        if key in self.keys:
+            return Judgement(True, "number" if key.startswith("#") else "exact", self.expected)
+        if key.startswith("#"):
+            return Judgement(False, "wrong", self.expected)
+        compact = key.replace(" ", "")
+        if compact in self.compact:
+            return Judgement(True, "exact", self.expected)
+        if not fuzzy:
+            return Judgement(False, "wrong", self.expected)
+
+        # Lọc bằng bigram: mỗi phép sửa làm mất tối đa 3 bigram (khác nhau) của chuỗi nhập -> biến thể cách
+        # <= k lỗi phải chung >= |bigram| - 3k; biến thể chung nhiều bigram nhất được tính khoảng cách trước.
+        n, grams = len(compact), _bigrams(compact)
+        candidates = []
+        for length in range(max(1, n - 3), n + 4):
+            for v in self.by_len.get(length, ()):
+                budget = fuzzy_budget(length)
+                common = len(grams & v[2])
+                if abs(length - n) <= budget and common >= len(grams) - 3 * budget:
+                    candidates.append((-common, budget, v))
+        candidates.sort(key=lambda c: c[0])
+        best = None
+        for _, budget, (t, masks, _) in candidates:
+            if deadline is not None and time.perf_counter() > deadline:
+                return Judgement(False, "timeout", self.expected)
+            d = osa_distance(compact, masks, len(t))
+            if d <= budget and (best is None or d < best):
+                best = d
+                if d == 1:
+                    break  # khớp đúng đã loại ở trên: 1 là nhỏ nhất có thể
+        if best is not None:
+            return Judgement(True, "fuzzy", self.expected, best)
+        return Judgement(False, "wrong", self.expected)
+
+
+def accepted_variants(q) -> List[str]:
+    """Đáp án chính + các biến thể trong "accept" (bỏ rỗng, giữ thứ tự)."""
+    out = []
+    for v in [q.get("answer")] + list(q.get("accept", ())):
+        if v is not None and str(v).strip() and str(v) not in out:
+            out.append(str(v))
+    return out
+
+
+class AnswerBook:
+    """Cache AcceptedAnswers theo id câu cho mọi câu tự luận của ngân hàng; câu không đổi (cùng object) dùng lại bản cũ."""
+
+    def __init__(self, questions: Iterable, previous: Optional["AnswerBook"] = None):
+        old = previous._entries if previous is not None else {}
+        self._entries: Dict[str, AcceptedAnswers] = {}
+        for q in questions:
+            if not is_text_question(q):
+                continue
+            prev = old.get(q["id"])
+            self._entries[q["id"]] = prev if prev is not None and prev.question is q else AcceptedAnswers.from_question(q)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def for_question(self, q) -> AcceptedAnswers:
+        """AcceptedAnswers của câu; câu đã bị nạp lại (khác object) hoặc ngoài ngân hàng thì dựng tại chỗ."""
+        entry = self._entries.get(q.get("id"))
+        if entry is None or entry.question is not q:
+            entry = AcceptedAnswers.from_question(q)
+        return entry
+
+
+def judge_text(q, text: str, book: Optional[AnswerBook] = None) -> Judgement:
+    """Chấm đồng bộ (không thread, không hạn giờ)."""
+    entry = book.for_question(q) if book is not None else AcceptedAnswers.from_question(q)
+    return entry.match(text)
+
+
+class JudgeTicket:
+    """Một lần chấm đang chờ; main thread gọi poll() mỗi frame, trả Judgement khi xong."""
+    __slots__ = ("question", "text", "deadline", "result", "_lock", "_book")
+
+    def __init__(self, question, text: str, deadline: float, book):
+        self.question = question
+        self.text = text
+        self.deadline = deadline
+        self.result: Optional[Judgement] = None
+        self._lock = threading.Lock()
+        self._book = book
+
+    def _resolve(self, result: Judgement):
+        with self._lock:
+            if self.result is None:
+                self.result = result
+
+    def poll(self) -> Optional[Judgement]:
+        if self.result is None and time.perf_counter() > self.deadline:
+            # worker chậm (GC, thread khác giữ GIL...): chấm khớp đúng ngay tại chỗ, không chờ thêm
+            self._resolve(self._entry().match(self.text, fuzzy=False))
+        return self.result
+
+    def _entry(self) -> AcceptedAnswers:
+        book = self._book
+        return book.for_question(self.question) if book is not None else AcceptedAnswers.from_question(self.question)
+
+
+class AnswerJudge:
+    """
+    Chấm câu tự luận trên 1 worker thread (daemon). source: đối tượng có .answer_book (QuestionManager),
+    đọc lại mỗi lần chấm để theo kịp ngân hàng nạp lại.
+    """
+
+    def __init__(self, source=None, timeout_ms: float = 30.0, registry=REGISTRY):
+        self.source = source
+        self.timeout_ms = timeout_ms
+        self.registry = registry
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="answer-judge", daemon=True)
+        self._thread.start()
+
+    def submit(self, q, text: str) -> JudgeTicket:
+        book = getattr(self.source, "answer_book", None)
+        ticket = JudgeTicket(q, text, time.perf_counter() + self.timeout_ms / 1000, book)
+        self._queue.put(ticket)
+        return ticket
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _worker(self):
+        while True:
+            ticket = self._queue.get()
+            if ticket is None:
+                return
+            t0 = time.perf_counter_ns()
+            try:
+                result = ticket._entry().match(ticket.text, ticket.deadline)
+            except Exception as e:
+                print(f"[WARN] Judge failed for {ticket.question.get('id')}: {e}")
+                result = Judgement(False, "wrong", str(ticket.question.get("answer", "")))
+            if result.kind == "timeout":
+                result = ticket._entry().match(ticket.text, fuzzy=False)
+            ticket._resolve(result)
+            self.registry.observe("answer.judge_ns", time.perf_counter_ns() - t0)
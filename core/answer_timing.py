@@ -0,0 +1,61 @@
+# core/answer_timing.py
+import time
+from typing import Optional
+
+from utils.metrics import REGISTRY
+
+
+class AnswerTiming:
+    """
+    Mốc thời gian (perf_counter_ns) của một lần trả lời:
+      shown        popup hiện lên (frame đầu tiên được vẽ)
+      first_select lần chọn đáp án đầu tiên
+      changes      số lần đổi sang đáp án khác
+      submit       bấm "Đáp án" hoặc hết giờ (timed_out)
+    submit() ghi vào registry, mỗi số đo hai histogram: theo team và theo question.
+    """
+    __slots__ = ("team", "question_id", "registry", "shown_ns", "first_select_ns", "last_select_ns",
+                 "selected", "changes", "submit_ns", "timed_out")
+
+    def __init__(self, team: str, question_id, registry=REGISTRY):
+        self.team = team
+        self.question_id = question_id
+        self.registry = registry
+        self.shown_ns: Optional[int] = None
+        self.first_select_ns: Optional[int] = None
+        self.last_select_ns: Optional[int] = None
+        self.selected = None
+        self.changes = 0
+        self.submit_ns: Optional[int] = None
+        self.timed_out = False
+
+    def shown(self, t_ns: Optional[int] = None):
+        if self.shown_ns is None:
+            self.shown_ns = time.perf_counter_ns() if t_ns is None else t_ns
+
+    def select(self, idx):
+        t = time.perf_counter_ns()
+        if self.first_select_ns is None:
+            self.first_select_ns = t
+        elif idx != self.selected:
+            self.changes += 1
+        self.selected, self.last_select_ns = idx, t
+
+    def submit(self, timed_out: bool = False):
+        if self.submit_ns is not None:
+            return
+        self.submit_ns = time.perf_counter_ns()
+        self.timed_out = timed_out
+        self._record()
+
+    def _record(self):
+        if self.shown_ns is None:
+            return
+        reg = self.registry
+        for labels in ({"team": self.team}, {"question": str(self.question_id)}):
+            if self.first_select_ns is not None:
+                reg.observe("answer.first_select_ns", self.first_select_ns - self.shown_ns, **labels)
+                reg.observe("answer.decide_ns", self.submit_ns - self.last_select_ns, **labels)
+            reg.observe("answer.submit_ns", self.submit_ns - self.shown_ns, **labels)
+            reg.observe("answer.changes", self.changes, unit="count", **labels)
+            reg.observe("answer.timeout", 1 if self.timed_out else 0, unit="count", **labels)
@@ -0,0 +1,271 @@
+# core/bank_ingest.py
+"""
+Gộp nhiều nguồn câu hỏi thành một ngân hàng bằng chuỗi generator (mỗi lúc chỉ giữ vài câu trong RAM):
+
+    read  -> normalize -> validate -> dedup -> shard
+    .json (list), .jsonl, .csv      cùng luật với QuestionManager._load_questions
+
+    python -m core.bank_ingest datas/questions.json extra.jsonl sheet.csv --out build/bank --shard-size 5000
+
+- read:      JSON list được đọc từng phần tử (raw_decode trên bộ đệm), không json.load cả file.
+             CSV: cột question, A/B/C/D (hoặc option_a..option_d, hoặc options "x|y|z"), answer, id, tags, subject, grade;
+             câu tự luận: để trống lựa chọn, type=text, accept "biến thể 1|biến thể 2".
+- normalize: core.question_manager.normalize_question; câu thiếu id nhận "<tên nguồn>:q<i>" khi gộp nhiều nguồn.
+- validate:  question_error (đáp án phải trỏ đúng lựa chọn).
+- dedup:     bỏ id trùng và câu trùng hẳn (cùng question_key); giữ 8 byte digest / câu, không giữ cả câu.
+             Gần trùng (MinHash) vẫn do QuestionManager xử lý khi nạp từng shard.
+- shard:     ghi ra <out>/bank_0000.json, ... mỗi file tối đa shard_size câu (mỗi shard nạp được bằng QuestionManager).
+Mỗi stage có StageStats: số câu vào / ra và thời gian riêng của stage (đã trừ phần của stage phía trước).
+"""
+import csv
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core.question_dedup import question_key
+from core.question_manager import normalize_question, question_error
+
+READ_CHUNK = 1 << 16
+_WS = " \t\r\n"
+
+
+class StageStats:
+    __slots__ = ("name", "items_in", "items_out", "inclusive_ns", "upstream")
+
+    def __init__(self, name: str, upstream: Optional["StageStats"] = None):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.inclusive_ns = 0   # thời gian next() của stage này, gồm cả các stage phía trước
+        self.upstream = upstream
+
+    @property
+    def own_ns(self) -> int:
+        return self.inclusive_ns - (self.upstream.inclusive_ns if self.upstream else 0)
+
+    def as_dict(self) -> Dict:
+        sec = self.own_ns / 1e9
+        return {"stage": self.name, "in": self.items_in, "out": self.items_out, "dropped": self.items_in - self.items_out,
+                "ms": round(sec * 1000, 2), "per_sec": round(self.items_in / sec) if sec > 0 else None}
+
+
+def _timed(stats: StageStats, gen: Iterator) -> Iterator:
+    """Đo thời gian mỗi lần lấy phần tử từ gen (gồm cả stage phía trước; own_ns trừ đi phần đó)."""
+    clock = time.perf_counter_ns
+    while True:
+        t0 = clock()
+        try:
+            item = next(gen)
+        except StopIteration:
+            stats.inclusive_ns += clock() - t0
+            return
+        stats.inclusive_ns += clock() - t0
+        stats.items_out += 1
+        yield item
+
+
+# ---------------- read ----------------
+def iter_json_array(f, chunk_size: int = READ_CHUNK) -> Iterator:
+    """Từng phần tử của một JSON list trong file text f, đọc theo khối."""
+    decoder = json.JSONDecoder()
+    buf, pos, started, eof = "", 0, False, False
+    while True:
+        while pos < len(buf) and buf[pos] in _WS:
+            pos += 1
+        if pos >= len(buf) and not eof:
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        if not started:
+            if pos >= len(buf) or buf[pos] != "[":
+                raise ValueError("File JSON phải là một list các câu hỏi.")
+            started, pos = True, pos + 1
+            continue
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf) and buf[pos] == ",":
+            pos += 1
+            continue
+        if pos >= len(buf):
+            raise ValueError("JSON list chưa đóng ']'")
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)  # phần tử bị cắt ngang khối: đọc thêm rồi thử lại
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        if end == len(buf) and not eof:
+            # số ở cuối bộ đệm có thể chưa đủ chữ số: đọc thêm để chắc chắn
+            chunk = f.read(chunk_size)
+            if chunk:
+                buf, pos, eof = buf[pos:] + chunk, 0, False
+                continue
+            eof = True
+        yield item
+        pos = end
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+def _csv_row(row: Dict[str, str]) -> Dict:
+    row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+    if row.get("options"):
+        options = [o.strip() for o in row["options"].split("|")]
+    else:
+        options = []
+        for letter in "abcdefgh":
+            v = row.get(letter) or row.get(f"option_{letter}")
+            if v:
+                options.append(v)
+    out = {"question": row.get("question", ""), "options": options, "answer": row.get("answer")}
+    for field in ("id", "tags", "subject", "grade", "type", "accept"):
+        if row.get(field):
+            out[field] = row[field]
+    # answer giữ nguyên chuỗi: "B" hay nội dung lựa chọn ("12") do normalize_question xử lý như khi nạp JSON
+    return out
+
+
+def read_source(path: str) -> Iterator[Dict]:
+    """Bản ghi thô (dict) của một file .json / .jsonl / .csv."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8-sig", newline="" if ext == ".csv" else None) as f:
+        if ext == ".json":
+            yield from iter_json_array(f)
+        elif ext == ".jsonl":
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        elif ext == ".csv":
+            for row in csv.DictReader(f):
+                yield _csv_row(row)
+        else:
+            raise ValueError(f"Không hỗ trợ định dạng nguồn: {path}")
+
+
+# ---------------- stages ----------------
+def read_stage(sources: Sequence[str]) -> Iterator[Tuple[str, int, Dict]]:
+    for path in sources:
+        for i, raw in enumerate(read_source(path)):
+            yield path, i, raw
+
+
+def normalize_stage(items: Iterable[Tuple[str, int, Dict]], prefix_ids: bool, stats: StageStats) -> Iterator[Dict]:
+    for path, i, raw in items:
+        stats.items_in += 1
+        q = normalize_question(raw, i)
+        if q is None:
+            continue
+        if prefix_ids and not (isinstance(raw, dict) and "id" in raw):
+            q["id"] = f"{os.path.splitext(os.path.basename(path))[0]}:{q['id']}"
+        yield q
+
+
+def validate_stage(items: Iterable[Dict], stats: StageStats, errors: List[str], max_errors: int = 50) -> Iterator[Dict]:
+    for q in items:
+        stats.items_in += 1
+        err = question_error(q)
+        if err:
+            if len(errors) < max_errors:
+                errors.append(err)
+            continue
+        yield q
+
+
+def dedup_stage(items: Iterable[Dict], stats: StageStats) -> Iterator[Dict]:
+    seen_ids, seen_keys = set(), set()
+    for q in items:
+        stats.items_in += 1
+        digest = int.from_bytes(hashlib.blake2b(question_key(q).encode("utf-8"), digest_size=8).digest(), "little")
+        if q["id"] in seen_ids or digest in seen_keys:
+            continue
+        seen_ids.add(q["id"])
+        seen_keys.add(digest)
+        yield q
+
+
+def _shard_name(out_dir: str, n: int) -> str:
+    return os.path.join(out_dir, f"bank_{n:04d}.json")
+
+
+def shard_stage(items: Iterable[Dict], out_dir: str, shard_size: int, stats: StageStats) -> Iterator[str]:
+    """Ghi câu vào các shard JSON list; yield đường dẫn mỗi shard khi đóng."""
+    os.makedirs(out_dir, exist_ok=True)
+    f, count, n = None, 0, 0
+    try:
+        for q in items:
+            stats.items_in += 1
+            if f is None:
+                f, count = open(_shard_name(out_dir, n), "w", encoding="utf-8"), 0
+                f.write("[\n")
+            f.write(("" if count == 0 else ",\n") + json.dumps(q, ensure_ascii=False))
+            count += 1
+            if count >= shard_size:
+                f.write("\n]\n")
+                f.close()
+                f = None
+                yield _shard_name(out_dir, n)
+                n += 1
+        if f is not None:
+            f.write("\n]\n")
+            f.close()
+            f = None
+            yield _shard_name(out_dir, n)
+    finally:
+        if f is not None:
+            f.close()
+
+
+# ---------------- pipeline ----------------
+class IngestResult:
+    __slots__ = ("shards", "stages", "errors", "seconds")
+
+    def __init__(self, shards, stages, errors, seconds):
+        self.shards = shards
+        self.stages = stages
+        self.errors = errors
+        self.seconds = seconds
+
+    def report(self) -> Dict:
+        return {"shards": self.shards, "seconds": round(self.seconds, 3),
+                "stages": [s.as_dict() for s in self.stages], "errors": self.errors}
+
+
+def ingest(sources: Sequence[str], out_dir: str, shard_size: int = 5000) -> IngestResult:
+    """Chạy cả chuỗi read -> normalize -> validate -> dedup -> shard, trả về shard đã ghi + thống kê từng stage."""
+    t0 = time.perf_counter()
+    s_read = StageStats("read")
+    s_norm = StageStats("normalize", s_read)
+    s_valid = StageStats("validate", s_norm)
+    s_dedup = StageStats("dedup", s_valid)
+    s_shard = StageStats("shard", s_dedup)
+    errors: List[str] = []
+
+    items = _timed(s_read, read_stage(sources))
+    items = _timed(s_norm, normalize_stage(items, len(sources) > 1, s_norm))
+    items = _timed(s_valid, validate_stage(items, s_valid, errors))
+    items = _timed(s_dedup, dedup_stage(items, s_dedup))
+    shards = list(_timed(s_shard, shard_stage(items, out_dir, shard_size, s_shard)))
+    s_read.items_in = s_read.items_out
+    s_shard.items_out = s_shard.items_in  # số câu đã ghi (items_out của _timed là số shard)
+    return IngestResult(shards, [s_read, s_norm, s_valid, s_dedup, s_shard], errors, time.perf_counter() - t0)
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Gộp các nguồn câu hỏi (.json/.jsonl/.csv) thành các shard ngân hàng.")
+    ap.add_argument("sources", nargs="+")
+    ap.add_argument("--out", required=True, help="thư mục ghi bank_0000.json, ...")
+    ap.add_argument("--shard-size", type=int, default=5000)
+    args = ap.parse_args(argv)
+    result = ingest(args.sources, args.out, args.shard_size)
+    print(json.dumps(result.report(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,158 @@
+# core/bank_reload.py
+"""
+Nạp lại ngân hàng câu hỏi khi file bị sửa, không phải khởi động lại trận.
+
+    reloader = BankReloader(question_manager)      # bắt đầu theo dõi json_path của manager
+    ...
+    msg = reloader.poll()                          # main thread, mỗi frame: tráo ngân hàng nếu đã sẵn sàng
+    reloader.stop()
+
+FileWatcher theo dõi THƯ MỤC chứa file bằng inotify (gọi qua ctypes, chỉ Linux) để bắt cả kiểu lưu
+"ghi file tạm rồi đổi tên" của editor; không có inotify thì hỏi os.stat định kỳ. Các thay đổi liên
+tiếp được gộp (debounce) rồi mới báo. Việc đọc + chuẩn hoá + kiểm tra + tính cụm trùng chạy trên
+thread của watcher (QuestionManager.prepare_reload); main thread chỉ tráo (apply_reload).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from typing import Callable, Optional
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (+ name, len byte)
+
+
+def _load_inotify():
+    """(fd, libc) nếu inotify dùng được, ngược lại None."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    return (fd, libc) if fd >= 0 else None
+
+
+class FileWatcher:
+    """Gọi on_change() (trên thread của watcher) khi file path được ghi xong / thay thế."""
+
+    def __init__(self, path: str, on_change: Callable[[], None], poll_interval: float = 0.5,
+                 debounce: float = 0.25, use_inotify: bool = True):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._inotify = _load_inotify() if use_inotify else None
+        if self._inotify is not None:
+            fd, libc = self._inotify
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), mask) < 0:
+                os.close(fd)
+                self._inotify = None
+        self.backend = "inotify" if self._inotify is not None else "poll"
+        self._last_stat = self._stat()  # mốc cho chế độ poll, lấy trước khi thread chạy
+        target = self._inotify_loop if self._inotify is not None else self._poll_loop
+        self._thread = threading.Thread(target=target, name="bank-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        if self._inotify is not None:
+            os.close(self._inotify[0])
+            self._inotify = None
+
+    def _fire(self):
+        try:
+            self.on_change()
+        except Exception as e:  # watcher không được chết vì một lần nạp lỗi
+            print(f"[WARN] Bank reload failed: {e}")
+
+    def _inotify_loop(self):
+        fd = self._inotify[0]
+        name = os.path.basename(self.path).encode()
+        due = None  # thời điểm báo (sau lần thay đổi cuối + debounce)
+        while not self._stop.is_set():
+            timeout = self.poll_interval if due is None else max(0.0, due - time.monotonic())
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if ready:
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                off = 0
+                while off + _EVENT.size <= len(data):
+                    _, _, _, n = _EVENT.unpack_from(data, off)
+                    ev_name = data[off + _EVENT.size:off + _EVENT.size + n].rstrip(b"\0")
+                    off += _EVENT.size + n
+                    if ev_name == name:
+                        due = time.monotonic() + self.debounce
+            elif due is not None and time.monotonic() >= due:
+                due = None
+                self._fire()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _poll_loop(self):
+        last, due = self._last_stat, None
+        while not self._stop.wait(self.poll_interval if due is None else self.debounce / 2):
+            cur = self._stat()
+            if cur != last:
+                last, due = cur, time.monotonic() + self.debounce
+            elif due is not None and time.monotonic() >= due and cur is not None:
+                due = None
+                self._fire()
+
+
+class BankReloader:
+    """Nối FileWatcher với QuestionManager: chuẩn bị ở thread nền, tráo ở main thread qua poll()."""
+
+    def __init__(self, question_manager, path: Optional[str] = None, **watcher_kw):
+        self.qm = question_manager
+        self._lock = threading.Lock()
+        self._ready = None   # PreparedBank mới nhất chưa tráo
+        self._error = None   # lỗi của lần nạp gần nhất (chuỗi)
+        self.reloads = 0
+        self._prepare_ms = 0.0
+        self.watcher = FileWatcher(path or question_manager.json_path, self._prepare, **watcher_kw)
+
+    def _prepare(self):
+        t0 = time.perf_counter()
+        try:
+            bank = self.qm.prepare_reload()
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._error = str(e)
+            return
+        with self._lock:
+            self._ready, self._error = bank, None
+            self._prepare_ms = (time.perf_counter() - t0) * 1000
+
+    def poll(self) -> Optional[str]:
+        """Gọi mỗi frame; trả về thông báo (cho sidebar) khi vừa tráo ngân hàng hoặc khi nạp lỗi."""
+        if self._ready is None and self._error is None:
+            return None
+        with self._lock:
+            bank, self._ready = self._ready, None
+            error, self._error = self._error, None
+        if error is not None:
+            return f"Ngân hàng câu hỏi lỗi, giữ bản cũ: {error}"
+        self.qm.apply_reload(bank)
+        self.reloads += 1
+        return f"Đã nạp lại ngân hàng ({bank.summary()}, {self._prepare_ms:.0f} ms)"
+
+    def stop(self):
+        self.watcher.stop()
@@ -1,21 +1,30 @@
 # core/board.py
 import os
-import pygame
+import math
 import random
 from utils.config import CELL_SIZE, MARGIN
 from utils.colors import BACKGROUND_MEDIUM, TEAM_COLORS, EVENT_COLORS, TEXT_MUTED
 from utils.helpers import get_font, color
+from utils.glyph_atlas import get_atlas
+from utils.camera import Camera
 # --- NEW: Import danh sách sự kiện ---
 from core.event_mapping import EVENT_TYPE_MAP
+from core.event_placement import generate_layout
 
 # --- NEW: Thêm công tắc để bật/tắt chế độ debug ---
-# Đặt là True để trải đều tất cả sự kiện ra bàn cờ
-# Đặt là False để quay lại chế độ sinh ngẫu nhiên như bình thường
+# Đặt là True để trải đều tất cả sự kiện ra bàn cờ (mỗi event một ô)
+# Đặt là False để quay lại chế độ sinh theo số ô sự kiện như bình thường
 DEBUG_ASSIGN_ALL_EVENTS = True
 
 GUTTER_SIZE = 30
+LOD_CELL_PX = 20  # ô nhỏ hơn ngưỡng này (px trên màn hình) -> vẽ minimap đã cache thay vì từng ô
+
+# Các thuộc tính của Cell được theo dõi thay đổi (undo/redo, cache vẽ, gợi ý...)
+TRACKED_CELL_ATTRS = frozenset(("owner", "event_type", "event_id", "protected", "blocked", "question_used"))
 
 class Cell:
+    _board = None  # Board chứa ô này; gán sau khi tạo để phát thông báo thay đổi
+
     def __init__(self, row, col):
         self.row = row
         self.col = col
@@ -26,6 +35,16 @@ class Cell:
         self.protected = False
         self.blocked = False
 
+    def __setattr__(self, name, value):
+        board = self._board
+        if board is not None and name in TRACKED_CELL_ATTRS:
+            old = getattr(self, name, None)
+            object.__setattr__(self, name, value)
+            if old != value:
+                board._notify(self, name, old, value)
+            return
+        object.__setattr__(self, name, value)
+
     def is_empty(self):
         return self.owner is None
 
@@ -35,10 +54,31 @@ class Board:
     def __init__(self, size, event_count):
         self.size = size
         self.cells = [[Cell(r, c) for c in range(size)] for r in range(size)]
+        # Thông báo thay đổi ô: version tăng mỗi lần đổi, listeners(cell, attr, old, new)
+        self.version = 0
+        self.listeners = []
+        self.replaying = False  # True khi History đang undo/redo: thay đổi là phát lại, không phải nước mới
+        for row in self.cells:
+            for cell in row:
+                cell._board = self
         self._step = CELL_SIZE + MARGIN
-        self.piece_icons = self._load_piece_icons()
-        self.highlight_cells = []
-        self.label_font = get_font("caption", "semibold")
+        # Icon quân cờ + font nhãn nạp khi vẽ lần đầu (không cần pygame lúc dựng Board)
+        self._piece_icons = None
+        self._label_font = None
+        self._icon_cache = {}   # (symbol, px) -> icon đã scale theo zoom
+        self.target_selection = None  # core.target_selection.TargetSelection khi đang chọn mục tiêu (main.py gán)
+        self._target_tiles = {}        # (trạng thái, px) -> ô phủ highlight đã dựng sẵn
+
+        # Camera (main.py gán); None -> bố cục cũ: cả bàn, zoom 1
+        self.camera = None
+        self._default_camera = None
+
+        # Minimap 1 pixel / ô cho chế độ zoom nhỏ; cập nhật tăng dần theo thay đổi ô
+        self._minimap = None
+        self._minimap_dirty = set()
+        self._minimap_gen = 0
+        self._minimap_scaled = (None, None)  # (key, surface)
+        self.add_listener(self._mark_minimap)
 
         # --- MODIFIED: Dùng công tắc debug ---
         if DEBUG_ASSIGN_ALL_EVENTS:
@@ -46,36 +86,54 @@ class Board:
         else:
             self.assign_event_cells(event_count)
 
+    # ---------- Theo dõi thay đổi ô ----------
+    def add_listener(self, fn):
+        """fn(cell, attr, old, new) được gọi sau mỗi thay đổi thuộc tính theo dõi của ô."""
+        self.listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self.listeners:
+            self.listeners.remove(fn)
+
+    def _notify(self, cell, attr, old, new):
+        self.version += 1
+        for fn in self.listeners:
+            fn(cell, attr, old, new)
+
     # --- NEW: Hàm mới để gán tất cả sự kiện cho việc test ---
     def assign_all_events_for_debugging(self):
-        """Trải đều tất cả các event đã định nghĩa lên bàn cờ."""
+        """Trải đều tất cả các event đã định nghĩa lên bàn cờ (cùng ràng buộc vị trí như chế độ thường)."""
         all_event_ids = list(EVENT_TYPE_MAP.keys())
-        random.shuffle(all_event_ids) # Xáo trộn để mỗi lần chạy có một layout khác nhau
-
-        all_cells = [cell for row in self.cells for cell in row]
-        
-        print("--- DEBUG MODE: Assigning all events to board ---")
-        # Gán lần lượt từng event_id cho một ô
-        for i, event_id in enumerate(all_event_ids):
-            if i < len(all_cells): # Đảm bảo không gán nhiều hơn số ô có trên bàn cờ
-                cell = all_cells[i]
-                cell.event_id = event_id
-                cell.event_type = EVENT_TYPE_MAP[event_id] # Lấy type tương ứng
-                print(f"  Assigned {event_id} to cell ({cell.row}, {cell.col})")
-        print("-------------------------------------------------")
+        n = min(len(all_event_ids), self.size * self.size) # Đảm bảo không gán nhiều hơn số ô có trên bàn cờ
+        # seed lấy từ random toàn cục (main.py seed theo trận) -> chơi lại cùng seed được cùng bố cục
+        layout = generate_layout(self.size, event_ids=all_event_ids[:n], seed=random.getrandbits(32))
+        layout.apply(self)
+        # Một dòng tóm tắt thay vì in từng ô (print mỗi ô làm chậm khởi động)
+        print(f"[DEBUG] Assigned {n} events to board")
 
 
     def assign_event_cells(self, count):
-        """Hàm sinh sự kiện ngẫu nhiên gốc."""
-        all_cells = [cell for row in self.cells for cell in row]
-        random.shuffle(all_cells)
-        selected = all_cells[:max(0, min(count, len(all_cells)))]
-        possible_types = list(EVENT_COLORS.keys())
-        for cell in selected:
-            cell.event_type = random.choice(possible_types)
+        """
+        Sinh `count` ô sự kiện bằng core.event_placement: danger giãn cách, mỗi loại chia đều 4 góc phần tư,
+        NUKE_AREA không sát góc; event_id được chọn luôn lúc này.
+        """
+        layout = generate_layout(self.size, max(0, count), seed=random.getrandbits(32))
+        layout.apply(self)
     
+    @property
+    def piece_icons(self):
+        if self._piece_icons is None:
+            self._piece_icons = self._load_piece_icons()
+        return self._piece_icons
+
+    @property
+    def label_font(self):
+        if self._label_font is None:
+            self._label_font = get_font("caption", "semibold")
+        return self._label_font
+
     def _load_piece_icons(self):
-        # ... (Hàm này giữ nguyên, không thay đổi) ...
+        import pygame
         icons = {}
         target = CELL_SIZE - 12
         for sym in ["A", "B", "C", "D", "E", "F"]:
@@ -89,47 +147,162 @@ class Board:
                     print(f"[WARN] Cannot load piece icon {path}: {e}")
         return icons
 
+    # ---------- Camera / vẽ ----------
+    def _camera(self):
+        if self.camera is not None:
+            return self.camera
+        if self._default_camera is None:
+            origin, world = MARGIN + GUTTER_SIZE, self.size * self._step
+            self._default_camera = Camera((origin, origin, world, world), world, world)
+        return self._default_camera
+
+    def _icon_at(self, sym, px):
+        if px == CELL_SIZE - 12:
+            return self.piece_icons.get(sym)
+        key = (sym, px)
+        icon = self._icon_cache.get(key)
+        if icon is None:
+            base = self.piece_icons.get(sym)
+            if base is None or px < 4:
+                return None
+            if len(self._icon_cache) > 64:
+                self._icon_cache.clear()
+            import pygame
+            w = max(1, int(base.get_width() * px / max(1, base.get_height())))
+            icon = self._icon_cache[key] = pygame.transform.smoothscale(base, (w, px))
+        return icon
+
+    @staticmethod
+    def _cell_fill(cell):
+        if cell.owner:
+            return TEAM_COLORS.get(cell.owner, (170, 170, 170))
+        return EVENT_COLORS.get(cell.event_type, BACKGROUND_MEDIUM) if cell.event_type else BACKGROUND_MEDIUM
+
+    def _mark_minimap(self, cell, attr, old, new):
+        if self._minimap is not None and attr in ("owner", "event_type"):
+            self._minimap_dirty.add((cell.row, cell.col))
+
+    def _get_minimap(self):
+        if self._minimap is None:
+            import pygame
+            self._minimap = pygame.Surface((self.size, self.size))
+            self._minimap.fill(color(BACKGROUND_MEDIUM))
+            self._minimap_dirty = {(r, c) for r in range(self.size) for c in range(self.size)}
+        if self._minimap_dirty:
+            for r, c in self._minimap_dirty:
+                self._minimap.set_at((c, r), color(self._cell_fill(self.cells[r][c])))
+            self._minimap_dirty.clear()
+            self._minimap_gen += 1
+        return self._minimap
+
+    def _draw_minimap(self, screen, cam):
+        minimap = self._get_minimap()
+        w = max(1, int(round(self.size * self._step * cam.zoom)))
+        key = (w, self._minimap_gen)
+        if self._minimap_scaled[0] != key:
+            import pygame
+            self._minimap_scaled = (key, pygame.transform.scale(minimap, (w, w)))
+        sx, sy = cam.to_screen(0, 0)
+        screen.blit(self._minimap_scaled[1], (int(round(sx)), int(round(sy))))
+
+    def _draw_labels(self, screen, cam, r0, r1, c0, c1):
+        step, z = self._step, cam.zoom
+        stride = max(1, math.ceil(18 / (step * z)))  # zoom nhỏ: chỉ vẽ mỗi stride nhãn
+        half = CELL_SIZE / 2
+        atlas = get_atlas(self.label_font, color(TEXT_MUTED))
+        top_y, left_x = cam.vy - GUTTER_SIZE // 2, cam.vx - GUTTER_SIZE // 2
+        for c in range(c0 - c0 % stride, c1, stride):
+            if c < c0: continue
+            x_pos = cam.to_screen(c * step + half, 0)[0]
+            atlas.draw(screen, chr(ord('A') + c), center=(x_pos, top_y))
+        for r in range(r0 - r0 % stride, r1, stride):
+            if r < r0: continue
+            y_pos = cam.to_screen(0, r * step + half)[1]
+            atlas.draw(screen, str(r + 1), center=(left_x, y_pos))
+
     def draw(self, screen):
-        # ... (Hàm này giữ nguyên, không thay đổi) ...
-        for c in range(self.size):
-            label_text = chr(ord('A') + c)
-            label_surf = self.label_font.render(label_text, True, color(TEXT_MUTED))
-            x_pos = MARGIN + GUTTER_SIZE + c * self._step + (CELL_SIZE // 2)
-            screen.blit(label_surf, label_surf.get_rect(center=(x_pos, MARGIN + GUTTER_SIZE // 2)))
-        for r in range(self.size):
-            label_text = str(r + 1)
-            label_surf = self.label_font.render(label_text, True, color(TEXT_MUTED))
-            y_pos = MARGIN + GUTTER_SIZE + r * self._step + (CELL_SIZE // 2)
-            screen.blit(label_surf, label_surf.get_rect(center=(MARGIN + GUTTER_SIZE // 2, y_pos)))
-        for r in range(self.size):
-            base_y = MARGIN + GUTTER_SIZE + r * self._step
-            for c in range(self.size):
-                base_x = MARGIN + GUTTER_SIZE + c * self._step
-                cell = self.cells[r][c]
-                rect = pygame.Rect(base_x, base_y, CELL_SIZE, CELL_SIZE)
-                if cell.owner:
-                    icon = self.piece_icons.get(cell.owner)
-                    if icon:
-                        pygame.draw.rect(screen, color(BACKGROUND_MEDIUM), rect, border_radius=10)
-                        ir = icon.get_rect(center=rect.center)
-                        screen.blit(icon, ir)
+        import pygame
+        cam = self._camera()
+        step, z = self._step, cam.zoom
+        r0, r1, c0, c1 = cam.visible_cells(step, self.size)
+        self._draw_labels(screen, cam, r0, r1, c0, c1)
+
+        clip_prev = screen.get_clip()
+        screen.set_clip(pygame.Rect(cam.viewport))
+        cell_px = max(1, int(round(CELL_SIZE * z)))
+        radius, icon_px = max(1, int(6 * z)), int(round((CELL_SIZE - 12) * z))
+        if cell_px < LOD_CELL_PX:
+            self._draw_minimap(screen, cam)
+        else:
+            # Chỉ duyệt các ô đang nhìn thấy (culling)
+            for r in range(r0, r1):
+                base_y = int(round(cam.to_screen(0, r * step)[1]))
+                row = self.cells[r]
+                for c in range(c0, c1):
+                    base_x = int(round(cam.to_screen(c * step, 0)[0]))
+                    cell = row[c]
+                    rect = pygame.Rect(base_x, base_y, cell_px, cell_px)
+                    if cell.owner:
+                        icon = self._icon_at(cell.owner, icon_px)
+                        if icon:
+                            pygame.draw.rect(screen, color(BACKGROUND_MEDIUM), rect, border_radius=max(1, int(10 * z)))
+                            ir = icon.get_rect(center=rect.center)
+                            screen.blit(icon, ir)
+                        else:
+                            fill = TEAM_COLORS.get(cell.owner, (170, 170, 170))
+                            pygame.draw.rect(screen, color(fill), rect, border_radius=radius)
                     else:
-                        fill = TEAM_COLORS.get(cell.owner, (170, 170, 170))
-                        pygame.draw.rect(screen, color(fill), rect, border_radius=6)
-                else:
-                    fill = EVENT_COLORS.get(cell.event_type, BACKGROUND_MEDIUM) if cell.event_type else BACKGROUND_MEDIUM
-                    pygame.draw.rect(screen, color(fill), rect, border_radius=6)
-                if cell in self.highlight_cells:
-                    pygame.draw.rect(screen, (255, 215, 0), rect, 3, border_radius=8)
+                        fill = EVENT_COLORS.get(cell.event_type, BACKGROUND_MEDIUM) if cell.event_type else BACKGROUND_MEDIUM
+                        pygame.draw.rect(screen, color(fill), rect, border_radius=radius)
+
+        if self.target_selection is not None:
+            self._draw_targets(screen, cam, r0, r1, c0, c1, cell_px)
+        screen.set_clip(clip_prev)
+
+    def _target_tile(self, kind, px):
+        """Ô phủ (viền / nền mờ) cho một trạng thái chọn mục tiêu ở kích thước px; dựng một lần rồi blit."""
+        key = (kind, px)
+        tile = self._target_tiles.get(key)
+        if tile is None:
+            import pygame
+            if len(self._target_tiles) > 64:
+                self._target_tiles.clear()
+            tile = pygame.Surface((px, px), pygame.SRCALPHA)
+            rect = tile.get_rect()
+            width = max(1, min(3, px // 4))
+            radius = max(1, int(8 * px / CELL_SIZE))
+            if kind == "selected":
+                pygame.draw.rect(tile, (255, 215, 0, 110), rect, border_radius=radius)
+                pygame.draw.rect(tile, (255, 215, 0), rect, width + 1, border_radius=radius)
+            elif kind == "cursor":
+                pygame.draw.rect(tile, (255, 255, 255), rect, width, border_radius=radius)
+                inner = rect.inflate(-2 * width, -2 * width)
+                if inner.width > 0:
+                    pygame.draw.rect(tile, (40, 40, 40), inner, 1, border_radius=max(1, radius - width))
+            else:
+                pygame.draw.rect(tile, (255, 215, 0), rect, width, border_radius=radius)
+            self._target_tiles[key] = tile
+        return tile
+
+    def _draw_targets(self, screen, cam, r0, r1, c0, c1, cell_px):
+        """Phủ các ứng viên / ô đã chọn / cursor trong vùng nhìn thấy (TargetSelection.visible, tile cache)."""
+        sel, step = self.target_selection, self._step
+        tiles = (None, self._target_tile("candidate", cell_px), self._target_tile("selected", cell_px))
+        for r, c, state in sel.visible(r0, r1, c0, c1):
+            sx, sy = cam.to_screen(c * step, r * step)
+            screen.blit(tiles[state], (int(round(sx)), int(round(sy))))
+        cur = sel.current
+        if cur is not None and r0 <= cur.row < r1 and c0 <= cur.col < c1:
+            sx, sy = cam.to_screen(cur.col * step, cur.row * step)
+            screen.blit(self._target_tile("cursor", cell_px), (int(round(sx)), int(round(sy))))
 
     def get_cell_at(self, mouse_pos):
-        # ... (Hàm này giữ nguyên, không thay đổi) ...
         mx, my = mouse_pos
-        start_x, start_y = MARGIN + GUTTER_SIZE, MARGIN + GUTTER_SIZE
-        if mx < start_x or my < start_y: return None
+        cam = self._camera()
+        if not cam.contains(mx, my): return None
+        wx, wy = cam.to_world(mx, my)
         step = self._step
-        c, r = (mx - start_x) // step, (my - start_y) // step
+        c, r = int(wx // step), int(wy // step)
         if r < 0 or c < 0 or r >= self.size or c >= self.size: return None
-        x, y = start_x + c * step, start_y + r * step
-        if not (x <= mx <= x + CELL_SIZE and y <= my <= y + CELL_SIZE): return None
-        return self.cells[r][c]
\ No newline at end of file
+        if wx - c * step > CELL_SIZE or wy - r * step > CELL_SIZE: return None
+        return self.cells[r][c]
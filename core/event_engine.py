@@ -1,7 +1,95 @@
 # core/event_engine.py
 import random
 
+# ---------- Bit-flag cho immediate / on_correct / on_incorrect ----------
+IMM_FREE_CAPTURE          = 1 << 0
+IMM_SKIP_TURN             = 1 << 1
+IMM_BLOCK_CELL            = 1 << 2
+IMM_OPPONENT_FREE_CAPTURE = 1 << 3
+IMM_SWAP_TEAM_NOW         = 1 << 4
+IMM_TEAM_SWAP_SYMBOLS     = 1 << 5
+IMM_REVERSE_ORDER         = 1 << 6
+IMM_SKIP_NEXT_OPPONENT    = 1 << 7
+IMM_SHUFFLE_EVENTS        = 1 << 8
+IMM_PROTECT_CELL          = 1 << 9
+IMM_NUKE_3X3              = 1 << 10
+
+IMMEDIATE_BITS = {
+    "free_capture": IMM_FREE_CAPTURE, "skip_turn": IMM_SKIP_TURN, "block_cell": IMM_BLOCK_CELL,
+    "opponent_free_capture": IMM_OPPONENT_FREE_CAPTURE, "swap_team_now": IMM_SWAP_TEAM_NOW,
+    "team_swap_symbols": IMM_TEAM_SWAP_SYMBOLS, "reverse_order": IMM_REVERSE_ORDER,
+    "skip_next_opponent": IMM_SKIP_NEXT_OPPONENT, "shuffle_events": IMM_SHUFFLE_EVENTS,
+    "protect_cell": IMM_PROTECT_CELL, "nuke_3x3": IMM_NUKE_3X3,
+}
+
+OUT_CAPTURE    = 1 << 0   # on_correct["capture"]
+OUT_EXTRA_TURN = 1 << 1   # on_correct["extra_turn"]
+OUT_KEEP_EMPTY = 1 << 2   # on_incorrect["keep_empty"]
+OUT_LOSE_TURN  = 1 << 3   # on_incorrect["lose_turn"]
+
+ON_CORRECT_BITS = {"capture": OUT_CAPTURE, "extra_turn": OUT_EXTRA_TURN}
+ON_INCORRECT_BITS = {"keep_empty": OUT_KEEP_EMPTY, "lose_turn": OUT_LOSE_TURN}
+
+
+class _FlagView:
+    """
+    View dạng dict trên một trường bit-flag của EventContext.
+    Giữ nguyên cách dùng cũ: ctx.immediate["nuke_3x3"] = True, ctx.on_correct.get("capture", True)...
+    """
+    __slots__ = ("_ctx", "_slot", "_bits")
+
+    def __init__(self, ctx, slot, bits):
+        self._ctx, self._slot, self._bits = ctx, slot, bits
+
+    def __getitem__(self, key):
+        return bool(getattr(self._ctx, self._slot) & self._bits[key])
+
+    def __setitem__(self, key, value):
+        bit, cur = self._bits[key], getattr(self._ctx, self._slot)
+        setattr(self._ctx, self._slot, (cur | bit) if value else (cur & ~bit))
+
+    def get(self, key, default=None):
+        bit = self._bits.get(key)
+        if bit is None:
+            return default
+        return bool(getattr(self._ctx, self._slot) & bit)
+
+    def __contains__(self, key):
+        return key in self._bits
+
+    def __iter__(self):
+        return iter(self._bits)
+
+    def __len__(self):
+        return len(self._bits)
+
+    def keys(self):
+        return self._bits.keys()
+
+    def items(self):
+        flags = getattr(self._ctx, self._slot)
+        return [(k, bool(flags & b)) for k, b in self._bits.items()]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def _pack(mapping, bits):
+    flags = 0
+    for k, v in mapping.items():
+        if v:
+            flags |= bits[k]
+    return flags
+
+
 class EventContext:
+    __slots__ = (
+        "event_id", "event_type", "ask_team", "remaining", "time_bonus", "allow_reroll",
+        "used_reroll", "notes", "apply_hint", "requires_target_selection", "target_type",
+        "selected_target_cells", "num_targets_to_select", "imm_flags", "outcome_flags",
+        "_steal_return",
+    )
+
     def __init__(
         self, event_id, event_type, ask_team="current", num_questions=1,
         time_bonus=0, allow_reroll=False, notes="",
@@ -15,31 +103,63 @@ class EventContext:
         self.target_type = None
         self.selected_target_cells = [] # Luôn là một danh sách
         self.num_targets_to_select = 1
-        self.immediate = {
-            "free_capture": False, "skip_turn": False, "block_cell": False,
-            "opponent_free_capture": False, "swap_team_now": False,
-            "team_swap_symbols": False, "reverse_order": False,
-            "skip_next_opponent": False, "shuffle_events": False, "protect_cell": False,
-            "nuke_3x3": False,
-        }
-        self.on_correct = { "capture": True, "extra_turn": False }
-        self.on_incorrect = { "keep_empty": True, "lose_turn": False }
+        self.imm_flags = 0
+        self.outcome_flags = OUT_CAPTURE | OUT_KEEP_EMPTY
+        self._steal_return = False
+
+    # Các view dict tương thích API cũ (ghi vào bit-flag bên dưới)
+    @property
+    def immediate(self):
+        return _FlagView(self, "imm_flags", IMMEDIATE_BITS)
+
+    @immediate.setter
+    def immediate(self, mapping):
+        self.imm_flags = _pack(mapping, IMMEDIATE_BITS)
+
+    @property
+    def on_correct(self):
+        return _FlagView(self, "outcome_flags", ON_CORRECT_BITS)
+
+    @on_correct.setter
+    def on_correct(self, mapping):
+        self.outcome_flags = (self.outcome_flags & ~(OUT_CAPTURE | OUT_EXTRA_TURN)) | _pack(mapping, ON_CORRECT_BITS)
+
+    @property
+    def on_incorrect(self):
+        return _FlagView(self, "outcome_flags", ON_INCORRECT_BITS)
+
+    @on_incorrect.setter
+    def on_incorrect(self, mapping):
+        self.outcome_flags = (self.outcome_flags & ~(OUT_KEEP_EMPTY | OUT_LOSE_TURN)) | _pack(mapping, ON_INCORRECT_BITS)
+
+    # ---------- Template (tuple bất biến) ----------
+    def _snapshot(self):
+        return (
+            self.event_id, self.ask_team, self.remaining, self.time_bonus, self.allow_reroll,
+            self.notes, self.apply_hint, self.requires_target_selection, self.target_type,
+            self.num_targets_to_select, self.imm_flags, self.outcome_flags,
+        )
+
+    def _load(self, tpl, event_type):
+        (
+            self.event_id, self.ask_team, self.remaining, self.time_bonus, self.allow_reroll,
+            self.notes, self.apply_hint, self.requires_target_selection, self.target_type,
+            self.num_targets_to_select, self.imm_flags, self.outcome_flags,
+        ) = tpl
+        self.event_type = event_type
+        self.used_reroll = False
+        self.selected_target_cells = []
         self._steal_return = False
+        return self
 
     def __repr__(self):
         return f"<EventContext {self.event_id}>"
 
-def _random_enemy_cells(board, gm, limit=1):
-    cur_sym = gm.current_player.symbol
-    enemy_cells = [c for r in board.cells for c in r if c.owner and c.owner != cur_sym and not getattr(c, "protected", False)]
-    random.shuffle(enemy_cells)
-    return enemy_cells[:max(0, limit)]
 
-def plan(event_id: str, event_type: str, gm, cell):
-    et = (event_type or "bonus").lower()
-    eid = event_id.upper().strip() if event_id else "DOUBLE_CORRECT"
-    ctx = EventContext(eid, et)
+# ---------- Template theo event id + free-list pool ----------
 
+def _configure(ctx, eid):
+    """Cấu hình ctx theo event id (chỉ chạy khi dựng template)."""
     # Dựa trên danh sách sự kiện đã được tinh gọn
     if eid == "CHANGE_OWNER":
         ctx.requires_target_selection, ctx.target_type, ctx.num_targets_to_select = True, "enemy_cell", 1
@@ -88,10 +208,6 @@ def plan(event_id: str, event_type: str, gm, cell):
         ctx.immediate["team_swap_symbols"] = True
         ctx.on_correct["capture"] = False
         ctx.notes = "Hoán đổi ký hiệu 2 đội."
-    elif eid == "NUKE_AREA":
-        ctx.immediate["nuke_3x3"] = True # Bật cờ nuke 3x3
-        ctx.on_correct["capture"] = False # Không cần câu hỏi, không chiếm ô
-        ctx.notes = "Xóa tất cả các ô trong vùng 3x3 xung quanh."
     elif eid == "PROTECT_CELL":
         ctx.immediate["protect_cell"] = True
         ctx.on_correct["capture"] = False
@@ -112,17 +228,77 @@ def plan(event_id: str, event_type: str, gm, cell):
         ctx.immediate["skip_next_opponent"] = True
         ctx.on_correct["capture"] = False
         ctx.notes = "Bỏ qua lượt đối thủ kế tiếp."
-    elif eid == "CHAOS_MODE":
-        choices = [ "DOUBLE_CORRECT", "DOUBLE_MOVE", "FREE_CAPTURE", "EXTRA_TURN_OR_LOSE", "NUKE_AREA" ]
-        chosen = random.choice(choices)
-        return plan(chosen, event_type, gm, cell)
     else:
         ctx.notes = "Fallback: hỏi 1 câu như thường."
         ctx.remaining = 1
     return ctx
 
+KNOWN_EVENT_IDS = (
+    "CHANGE_OWNER", "REMOVE_ONLY", "NUKE_AREA", "DOUBLE_CORRECT", "DOUBLE_MOVE",
+    "EXTRA_TURN_OR_LOSE", "FREE_CAPTURE", "LOSE_TURN", "OPPONENT_CAPTURE", "BLOCK_CELL",
+    "HINT_UNLOCK", "SWITCH_QUESTION", "OPPONENT_QUESTION", "STEAL_QUESTION", "TEAM_SWAP",
+    "PROTECT_CELL", "SHUFFLE_EVENTS", "SWAP_TURN", "REVERSE_ORDER", "SKIP_NEXT_OPPONENT",
+)
+CHAOS_CHOICES = ("DOUBLE_CORRECT", "DOUBLE_MOVE", "FREE_CAPTURE", "EXTRA_TURN_OR_LOSE", "NUKE_AREA")
+
+# Template dựng sẵn một lần khi import: event_id -> tuple giá trị slot
+_TEMPLATES = {eid: _configure(EventContext(eid, ""), eid)._snapshot() for eid in KNOWN_EVENT_IDS}
+_FALLBACK_TEMPLATE = _configure(EventContext("", ""), "")._snapshot()
+
+_POOL = []
+_POOL_MAX = 64
+
+def _acquire(tpl, event_type):
+    ctx = _POOL.pop() if _POOL else EventContext.__new__(EventContext)
+    return ctx._load(tpl, event_type)
+
+def release(ctx):
+    """Trả ctx về pool khi lượt đã xong (không bắt buộc gọi)."""
+    if ctx is None or len(_POOL) >= _POOL_MAX:
+        return
+    ctx.selected_target_cells = []  # không giữ tham chiếu tới ô cũ
+    _POOL.append(ctx)
+
+def _random_enemy_cells(board, gm, limit=1):
+    cur_sym = gm.current_player.symbol
+    enemy_cells = [c for r in board.cells for c in r if c.owner and c.owner != cur_sym and not getattr(c, "protected", False)]
+    random.shuffle(enemy_cells)
+    return enemy_cells[:max(0, limit)]
+
+def template_for(event_id: str):
+    """Template dựng sẵn của event để cache theo ô; None với CHAOS_MODE (phải chọn ngẫu nhiên lúc kích hoạt)."""
+    eid = event_id.upper().strip() if event_id else "DOUBLE_CORRECT"
+    if eid == "CHAOS_MODE":
+        return None
+    return _TEMPLATES.get(eid, _FALLBACK_TEMPLATE)
+
+def plan_from_template(tpl, event_id: str, event_type: str, gm, cell):
+    """Như plan() nhưng dùng template đã lấy sẵn (template_for); tpl None -> plan() bình thường."""
+    if tpl is None:
+        return plan(event_id, event_type, gm, cell)
+    ctx = _acquire(tpl, (event_type or "bonus").lower())
+    if tpl is _FALLBACK_TEMPLATE:
+        ctx.event_id = event_id.upper().strip()
+    return ctx
+
+def plan(event_id: str, event_type: str, gm, cell):
+    et = (event_type or "bonus").lower()
+    eid = event_id.upper().strip() if event_id else "DOUBLE_CORRECT"
+
+    if eid == "CHAOS_MODE":
+        chosen = random.choice(CHAOS_CHOICES)
+        return plan(chosen, event_type, gm, cell)
+
+    tpl = _TEMPLATES.get(eid)
+    if tpl is not None:
+        return _acquire(tpl, et)
+    ctx = _acquire(_FALLBACK_TEMPLATE, et)
+    ctx.event_id = eid
+    return ctx
+
 def apply_immediate(ctx: EventContext, gm, cell, board):
     out = { "turn_ended": False, "open_question": True, "winner": None }
+    flags = ctx.imm_flags
 
     # --- SỬA LỖI: LOGIC THỰC THI CHO REMOVE_ONLY ---
     if ctx.event_id == "REMOVE_ONLY":
@@ -134,7 +310,10 @@ def apply_immediate(ctx: EventContext, gm, cell, board):
         out["turn_ended"], out["open_question"] = True, False
         return out
 
-    if ctx.immediate.get("nuke_3x3"):
+    if not flags:
+        return out
+
+    if flags & IMM_NUKE_3X3:
         center_r, center_c = cell.row, cell.col
         nuked_count = 0
         for dr in range(-1, 2):
@@ -149,8 +328,8 @@ def apply_immediate(ctx: EventContext, gm, cell, board):
         gm.next_turn()
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("free_capture"):
+
+    if flags & IMM_FREE_CAPTURE:
         if not getattr(cell, "protected", False) and not getattr(cell, "blocked", False):
             cell.owner = gm.current_player.symbol
             out["winner"] = gm.resolve_answer(cell, was_correct=True, capture_symbol=gm.current_player.symbol, advance_turn=True)
@@ -158,7 +337,7 @@ def apply_immediate(ctx: EventContext, gm, cell, board):
         out["turn_ended"], out["open_question"] = True, False
         return out
 
-    if ctx.immediate.get("opponent_free_capture"):
+    if flags & IMM_OPPONENT_FREE_CAPTURE:
         next_sym = gm.players[(gm.current_idx + 1) % len(gm.players)].symbol
         if not getattr(cell, "protected", False) and not getattr(cell, "blocked", False):
             cell.owner = next_sym
@@ -166,52 +345,52 @@ def apply_immediate(ctx: EventContext, gm, cell, board):
         else: gm.next_turn()
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("skip_turn"):
+
+    if flags & IMM_SKIP_TURN:
         gm.next_turn()
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("block_cell"):
+
+    if flags & IMM_BLOCK_CELL:
         cell.blocked, cell.event_type = True, None
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("swap_team_now"):
+
+    if flags & IMM_SWAP_TEAM_NOW:
         gm.next_turn()
         return out # Vẫn mở câu hỏi
 
-    if ctx.immediate.get("team_swap_symbols"):
+    if flags & IMM_TEAM_SWAP_SYMBOLS:
         if len(gm.players) >= 2:
             a, b = gm.players[0], gm.players[1]
             a.symbol, b.symbol = b.symbol, a.symbol
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("reverse_order"):
+
+    if flags & IMM_REVERSE_ORDER:
         gm.reverse_order()
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("skip_next_opponent"):
+
+    if flags & IMM_SKIP_NEXT_OPPONENT:
         next_sym = gm.players[(gm.current_idx + 1) % len(gm.players)].symbol
         gm.skip_next_for(next_sym)
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("shuffle_events"):
+
+    if flags & IMM_SHUFFLE_EVENTS:
         event_cells = [c for r in board.cells for c in r if c.owner is None and c.event_type]
         types = [c.event_type for c in event_cells]
         random.shuffle(types)
         for c, t in zip(event_cells, types): c.event_type = t
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
-    if ctx.immediate.get("protect_cell"):
+
+    if flags & IMM_PROTECT_CELL:
         cell.protected = True
         out["turn_ended"], out["open_question"] = True, False
         return out
-        
+
     return out
 
 def resolver_team_symbol(ctx: EventContext, gm):
@@ -226,7 +405,7 @@ def consume_reroll(ctx: EventContext):
 
 def resolve_answer(ctx: EventContext, gm, cell, was_correct: bool):
     out = {"ask_more": False, "captured": False, "extra_turn": False, "resolution_complete": False}
-    
+
     # --- MODIFIED: Hoàn thiện logic cho CHANGE_OWNER ---
     if ctx.event_id == "CHANGE_OWNER" and was_correct:
         if ctx.selected_target_cells:
@@ -234,23 +413,23 @@ def resolve_answer(ctx: EventContext, gm, cell, was_correct: bool):
             if target_cell:
                 target_cell.owner = gm.current_player.symbol
                 # Báo cho main.py biết rằng hành động cướp ô đã xảy ra
-                out["captured"] = True 
-        
+                out["captured"] = True
+
         out["resolution_complete"] = True
         return out
-    
+
     if not was_correct:
         return out
-        
+
     ctx.remaining -= 1
     if ctx.remaining > 0:
         out["ask_more"] = True
-    elif ctx.on_correct.get("capture", True):
+    elif ctx.outcome_flags & OUT_CAPTURE:
         if not getattr(cell, "protected", False) and not getattr(cell, "blocked", False):
             cell.owner = gm.current_player.symbol
             out["captured"] = True
-            
-    if ctx.on_correct.get("extra_turn"):
+
+    if ctx.outcome_flags & OUT_EXTRA_TURN:
         out["extra_turn"] = True
 
     return out
\ No newline at end of file
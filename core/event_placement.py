@@ -0,0 +1,298 @@
+# core/event_placement.py
+"""
+Sinh bố cục ô sự kiện có ràng buộc không gian (thay cho chọn ô / loại hoàn toàn ngẫu nhiên):
+  - ô "danger" cách nhau tối thiểu danger_spacing (khoảng cách Chebyshev, tính cả đường chéo)
+  - số ô mỗi loại chia đều cho 4 góc phần tư (chênh nhau tối đa 1)
+  - NUKE_AREA (và các id trong near_corner_forbidden) không nằm sát góc bàn
+
+Thuật toán: chia số ô theo loại -> theo góc phần tư (vòng tròn, để tổng mỗi góc phần tư cũng đều), rồi trong mỗi
+góc phần tư thử các ô theo thứ tự ngẫu nhiên (_candidates): danger đặt trước vào ô chưa bị chặn (Poisson-disk
+rời rạc — mỗi danger chặn hình vuông bán kính spacing-1 quanh nó trên mặt nạ bytearray), các loại khác lấp ô trống.
+Không đủ chỗ cho danger với spacing hiện tại thì giảm spacing 1 và làm lại (layout.spacing ghi giá trị đã dùng).
+Bàn 100x100, 2000 ô sự kiện: vài ms. Cùng seed -> cùng bố cục.
+
+    layout = generate_layout(board.size, count, seed=42)
+    layout.apply(board)
+    layouts = generate_batch(100, 2000, n=50, seed=1)     # cho bộ mô phỏng cân bằng
+    assert not validate_layout(layout)
+"""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.event_mapping import EVENT_TYPE_MAP, TYPE_TO_IDS
+
+DANGER = "danger"
+
+
+class PlacementRules:
+    __slots__ = ("danger_spacing", "corner_margin", "near_corner_forbidden", "type_weights", "balance_quadrants")
+
+    def __init__(self, danger_spacing: int = 3, corner_margin: int = 1,
+                 near_corner_forbidden: Sequence[str] = ("NUKE_AREA",),
+                 type_weights: Optional[Dict[str, float]] = None, balance_quadrants: bool = True):
+        self.danger_spacing = max(1, danger_spacing)
+        self.corner_margin = corner_margin              # ô cách góc <= margin (Chebyshev) là "sát góc"
+        self.near_corner_forbidden = frozenset(near_corner_forbidden)
+        self.type_weights = dict(type_weights) if type_weights else {t: 1.0 for t in TYPE_TO_IDS}
+        self.balance_quadrants = balance_quadrants
+
+
+DEFAULT_RULES = PlacementRules()
+
+
+class EventLayout:
+    """Kết quả: (row, col) -> event_id; loại suy ra từ EVENT_TYPE_MAP."""
+    __slots__ = ("size", "seed", "spacing", "events")
+
+    def __init__(self, size: int, seed, spacing: int, events: Dict[Tuple[int, int], str]):
+        self.size = size
+        self.seed = seed
+        self.spacing = spacing
+        self.events = events
+
+    def __len__(self):
+        return len(self.events)
+
+    def type_counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for eid in self.events.values():
+            t = EVENT_TYPE_MAP[eid]
+            out[t] = out.get(t, 0) + 1
+        return out
+
+    def quadrant_counts(self) -> List[Dict[str, int]]:
+        out: List[Dict[str, int]] = [{} for _ in range(4)]
+        for (r, c), eid in self.events.items():
+            q = out[_quadrant(self.size, r, c)]
+            t = EVENT_TYPE_MAP[eid]
+            q[t] = q.get(t, 0) + 1
+        return out
+
+    def apply(self, board):
+        """Gán event_type + event_id lên board (xoá sự kiện cũ)."""
+        for row in board.cells:
+            for cell in row:
+                if cell.event_type is not None or cell.event_id is not None:
+                    cell.event_type, cell.event_id = None, None
+        for (r, c), eid in self.events.items():
+            cell = board.cells[r][c]
+            cell.event_id = eid
+            cell.event_type = EVENT_TYPE_MAP[eid]
+
+
+def _quadrant(size: int, r: int, c: int) -> int:
+    h = size // 2
+    return (r >= h) * 2 + (c >= h)
+
+
+def _quadrant_cells(size: int) -> List[List[int]]:
+    """Chỉ số phẳng r*size+c của từng góc phần tư (cạnh lẻ: nửa sau lớn hơn một hàng/cột)."""
+    h = size // 2
+    spans = ((0, h), (h, size))
+    return [[r * size + c for r in range(*spans[qr]) for c in range(*spans[qc])]
+            for qr in (0, 1) for qc in (0, 1)]
+
+
+def _near_corner(size: int, r: int, c: int, margin: int) -> bool:
+    return min(r, size - 1 - r) <= margin and min(c, size - 1 - c) <= margin
+
+
+def _split(total: int, weights: Dict[str, float]) -> Dict[str, int]:
+    """Chia total theo trọng số, phần dư theo phần thập phân lớn nhất (tất định)."""
+    wsum = sum(w for w in weights.values() if w > 0)
+    if total <= 0 or wsum <= 0:
+        return {t: 0 for t in weights}
+    raw = {t: total * max(0.0, w) / wsum for t, w in weights.items()}
+    out = {t: int(v) for t, v in raw.items()}
+    for t in sorted(raw, key=lambda t: raw[t] - out[t], reverse=True)[:total - sum(out.values())]:
+        out[t] += 1
+    return out
+
+
+def _balanced_ids(event_type: str, n: int, rng: random.Random) -> List[str]:
+    """n id thuộc loại event_type, mỗi id xuất hiện đều nhau (vòng lặp trên danh sách đã xáo)."""
+    ids = list(TYPE_TO_IDS.get(event_type, ()))
+    rng.shuffle(ids)
+    return [ids[i % len(ids)] for i in range(n)] if ids else []
+
+
+def generate_layout(size: int, count: int = 0, seed=None, rules: PlacementRules = DEFAULT_RULES,
+                    event_ids: Optional[Sequence[str]] = None) -> EventLayout:
+    """
+    Bố cục `count` ô sự kiện trên bàn size x size (loại theo rules.type_weights, id chia đều trong loại),
+    hoặc đúng danh sách event_ids (ví dụ mỗi event một ô để test).
+    """
+    rng = random.Random(seed)
+    n_cells = size * size
+    if event_ids is not None:
+        by_type: Dict[str, List[str]] = {}
+        for eid in event_ids:
+            by_type.setdefault(EVENT_TYPE_MAP[eid], []).append(eid)
+        for ids in by_type.values():
+            rng.shuffle(ids)
+    else:
+        counts = _split(min(count, n_cells), rules.type_weights)
+        by_type = {t: _balanced_ids(t, k, rng) for t, k in counts.items() if k}
+    overflow = sum(len(v) for v in by_type.values()) - n_cells
+    if overflow > 0:
+        raise ValueError(f"{overflow + n_cells} sự kiện không vừa bàn {size}x{size}")
+
+    # loại -> số ô mỗi góc phần tư (vòng tròn tiếp nối giữa các loại để tổng mỗi góc cũng đều)
+    quads = _quadrant_cells(size)
+    live = [q for q in range(4) if quads[q]]
+    types = sorted(by_type, key=lambda t: (t != DANGER, t))  # danger đặt trước
+    alloc = {t: [0] * 4 for t in types}
+    k = 0
+    for t in types:
+        for _ in range(len(by_type[t])):
+            if rules.balance_quadrants:
+                alloc[t][live[k % len(live)]] += 1
+                k += 1
+            else:
+                alloc[t][live[rng.randrange(len(live))]] += 1
+
+    place_seed = rng.getrandbits(64)
+    for spacing in range(rules.danger_spacing, 0, -1):
+        events = _place(size, quads, alloc, types, spacing, random.Random(place_seed))
+        if events is not None:
+            break
+    else:  # không thể xảy ra khi tổng số ô <= số ô bàn (spacing 1 = không ràng buộc)
+        raise ValueError("Không xếp được bố cục sự kiện")
+
+    return EventLayout(size, seed, spacing, _assign_ids(size, events, by_type, rules, rng))
+
+
+def _candidates(cells: List[int], need: int, rng: random.Random):
+    """
+    Ô ứng viên theo thứ tự ngẫu nhiên: trước hết ném phi tiêu (rút có lặp, O(1) mỗi lần) — đủ khi mật độ
+    thấp; nếu vẫn thiếu thì duyệt toàn bộ theo thứ tự xáo trộn (đảm bảo không bỏ sót ô nào).
+    """
+    n = len(cells)
+    rand = rng.random
+    for _ in range(4 * need + 32):
+        yield cells[int(rand() * n)]
+    rest = cells[:]
+    rng.shuffle(rest)
+    yield from rest
+
+
+def _place(size: int, quads: List[List[int]], alloc, types, spacing: int,
+           rng: random.Random) -> Optional[Dict[int, str]]:
+    """flat index -> loại; None nếu không đủ chỗ cho danger với spacing này."""
+    taken = bytearray(size * size)     # ô đã có sự kiện
+    blocked = bytearray(size * size)   # ô không được đặt danger (quá gần danger khác)
+    reach = spacing - 1
+    placed: Dict[int, str] = {}
+    leftover: Dict[str, int] = {}
+    for q, cells in enumerate(quads):
+        need_other = sum(alloc[t][q] for t in types if t != DANGER)
+        others = _candidates(cells, need_other, rng)
+        for t in types:
+            need = alloc[t][q]
+            if not need:
+                continue
+            if t == DANGER:
+                for idx in _candidates(cells, need, rng):
+                    if need == 0:
+                        break
+                    if taken[idx] or blocked[idx]:
+                        continue
+                    taken[idx] = 1
+                    placed[idx] = t
+                    need -= 1
+                    if reach:
+                        r, c = divmod(idx, size)
+                        for rr in range(max(0, r - reach), min(size, r + reach + 1)):
+                            base = rr * size
+                            blocked[base + max(0, c - reach):base + min(size, c + reach + 1)] = \
+                                b"\1" * (min(size, c + reach + 1) - max(0, c - reach))
+                if need:
+                    return None
+            else:
+                for idx in others:
+                    if not taken[idx]:
+                        taken[idx] = 1
+                        placed[idx] = t
+                        need -= 1
+                        if not need:
+                            break
+                if need:
+                    leftover[t] = leftover.get(t, 0) + need
+    # góc phần tư nhỏ hơn phần được chia (bàn cạnh lẻ rất nhỏ): đặt phần dư vào ô trống bất kỳ
+    if leftover:
+        free = (idx for cells in quads for idx in cells if not taken[idx])
+        for t, need in leftover.items():
+            for _ in range(need):
+                idx = next(free)
+                taken[idx] = 1
+                placed[idx] = t
+    return placed
+
+
+def _assign_ids(size: int, placed: Dict[int, str], by_type: Dict[str, List[str]], rules: PlacementRules,
+                rng: random.Random) -> Dict[Tuple[int, int], str]:
+    """Gán id trong loại: ô sát góc nhận id không bị cấm trước, phần còn lại xáo ngẫu nhiên."""
+    cells_by_type: Dict[str, List[int]] = {}
+    for idx, t in placed.items():
+        cells_by_type.setdefault(t, []).append(idx)
+    events: Dict[Tuple[int, int], str] = {}
+    forbidden = rules.near_corner_forbidden
+    for t, cells in cells_by_type.items():
+        ids = by_type[t][:]
+        corner, rest = [], []
+        for i in cells:
+            (corner if _near_corner(size, *divmod(i, size), rules.corner_margin) else rest).append(i)
+        allowed = [e for e in ids if e not in forbidden]
+        other = [e for e in ids if e in forbidden]
+        if len(allowed) < len(corner):
+            # quá ít id hợp lệ cho các ô sát góc: dùng id hợp lệ bất kỳ của loại này
+            fill = [e for e in TYPE_TO_IDS.get(t, ()) if e not in forbidden] or allowed or ids
+            allowed += [fill[i % len(fill)] for i in range(len(corner) - len(allowed))]
+            other = other[:len(cells) - len(allowed)]
+        for i in corner:
+            events[divmod(i, size)] = allowed.pop()
+        remaining = allowed + other
+        rng.shuffle(remaining)
+        for i, eid in zip(rest, remaining):
+            events[divmod(i, size)] = eid
+    return events
+
+
+def generate_batch(size: int, count: int, n: int, seed=None, rules: PlacementRules = DEFAULT_RULES) -> List[EventLayout]:
+    """n bố cục ứng viên với seed con tất định từ seed (cho bộ mô phỏng cân bằng)."""
+    rng = random.Random(seed)
+    return [generate_layout(size, count, rng.getrandbits(32), rules) for _ in range(n)]
+
+
+def validate_layout(layout: EventLayout, rules: PlacementRules = DEFAULT_RULES,
+                    spacing: Optional[int] = None) -> List[str]:
+    """Danh sách vi phạm (rỗng = hợp lệ). spacing mặc định = layout.spacing (giá trị generator đã dùng được)."""
+    size, errors = layout.size, []
+    spacing = layout.spacing if spacing is None else spacing
+    # khoảng cách danger: lưới bucket cạnh `spacing`, chỉ so với 3x3 bucket lân cận
+    if spacing > 1:
+        buckets: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        for (r, c), eid in layout.events.items():
+            if EVENT_TYPE_MAP.get(eid) != DANGER:
+                continue
+            br, bc = r // spacing, c // spacing
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    for (r2, c2) in buckets.get((br + dr, bc + dc), ()):
+                        if max(abs(r - r2), abs(c - c2)) < spacing:
+                            errors.append(f"danger ({r},{c}) và ({r2},{c2}) cách nhau < {spacing}")
+            buckets.setdefault((br, bc), []).append((r, c))
+    for (r, c), eid in layout.events.items():
+        if not (0 <= r < size and 0 <= c < size):
+            errors.append(f"ô ({r},{c}) ngoài bàn")
+        elif eid not in EVENT_TYPE_MAP:
+            errors.append(f"event id lạ {eid} tại ({r},{c})")
+        elif eid in rules.near_corner_forbidden and _near_corner(size, r, c, rules.corner_margin):
+            errors.append(f"{eid} sát góc tại ({r},{c})")
+    if rules.balance_quadrants and size >= 2:
+        counts = layout.quadrant_counts()
+        for t in {t for q in counts for t in q}:
+            per_q = [q.get(t, 0) for q in counts]
+            if max(per_q) - min(per_q) > 1:
+                errors.append(f"loại {t} lệch giữa các góc phần tư: {per_q}")
+    return errors
@@ -1,5 +1,6 @@
 # core/game_manager.py
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Dict
+from utils.ring_log import RingLog
 
 # 4 hướng: dọc, ngang, chéo chính, chéo phụ
 DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
@@ -11,14 +12,18 @@ class GameManager:
     - turn_dir: +1 (thuận) / -1 (đảo chiều)  -> dùng cho REVERSE_ORDER
     - skip_symbol: bỏ qua lượt kế tiếp của symbol chỉ định -> dùng cho SKIP_NEXT_OPPONENT
     - resolve_answer: an toàn với event đã set owner trước (không ghi đè)
+    - match_log: RingLog giữ log_capacity nước gần nhất; phần cũ hơn ghi ra log_path (nếu có)
+    - recorder: MatchRecorder (core.match_record) tuỳ chọn, nhận các lần trả lời + đội thắng
     """
 
-    def __init__(self, board, players: List, win_length: int = 5):
+    def __init__(self, board, players: List, win_length: int = 5,
+                 log_capacity: int = 1024, log_path: Optional[str] = None):
         self.board = board
         self.players = players
         self.current_idx = 0
         self.win_length = win_length
-        self.match_log: List[Tuple[int, int, str, bool]] = []  # (row, col, symbol, correct)
+        self.match_log = RingLog(log_capacity, log_path)  # (row, col, symbol, correct)
+        self.recorder = None
 
         # Event flags / runtime control
         self.turn_dir = 1         # 1: tiến; -1: lùi (REVERSE_ORDER)
@@ -86,12 +91,16 @@ class GameManager:
 
         # Log lại nước đi
         self.match_log.append((cell.row, cell.col, acting_symbol, was_correct))
+        if self.recorder is not None:
+            self.recorder.answer(cell, acting_symbol, was_correct)
 
         # Kiểm tra thắng chỉ khi có chủ ô
         winner: Optional[str] = None
         if was_correct and cell.owner:
             if self._check_win_from(cell.row, cell.col, cell.owner):
                 winner = cell.owner
+                if self.recorder is not None:
+                    self.recorder.end(winner)
 
         # Nếu chưa ai thắng, chuyển lượt (mặc định)
         if winner is None and advance_turn:
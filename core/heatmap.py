@@ -0,0 +1,83 @@
+# core/heatmap.py
+from array import array
+
+METRICS = ("captures", "contested", "events")
+
+
+class HeatmapStats:
+    """
+    Đếm theo ô cho lớp phủ heatmap (huấn luyện):
+      captures   số lần ô bị chiếm
+      contested  số lần ô đang có chủ bị đổi chủ / bị xoá
+      events     số lần kích hoạt sự kiện tại ô
+    Khởi tạo từ các trận cũ (MatchArchive) rồi cập nhật O(1) mỗi nước của trận đang chơi
+    qua board listener. max_* chỉ tăng nên cũng cập nhật O(1); version tăng mỗi lần đếm đổi.
+    Undo/redo (board.replaying) không được đếm: đó là phát lại, không phải nước mới.
+    Không phụ thuộc pygame.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        n = size * size
+        self.counts = {m: array("I", bytes(4 * n)) for m in METRICS}
+        self.max = dict.fromkeys(METRICS, 0)
+        self.version = 0
+        self.dirty = {m: set() for m in METRICS}  # ô đổi từ lần vẽ trước (overlay tiêu thụ)
+        self._board = None
+
+    # ---------- Nguồn dữ liệu ----------
+    def load_archive(self, archive):
+        """Cộng dồn số đếm từ MatchArchive (các trận cùng cỡ bàn)."""
+        agg = archive.aggregate()
+        for metric, key in (("captures", "captures"), ("contested", "contested"), ("events", "event_cells")):
+            grid = agg.get(key, {}).get(self.size)
+            if grid is None:
+                continue
+            dst = self.counts[metric]
+            for i, v in enumerate(grid):
+                if v:
+                    dst[i] += v
+            self.max[metric] = max(dst) if dst else 0
+            self.dirty[metric] = None  # None = dựng lại toàn bộ
+        self.version += 1
+
+    def attach(self, board):
+        self._board = board
+        board.add_listener(self._on_cell_change)
+
+    def detach(self):
+        if self._board is not None:
+            self._board.remove_listener(self._on_cell_change)
+            self._board = None
+
+    def _bump(self, metric, i):
+        grid = self.counts[metric]
+        grid[i] += 1
+        if grid[i] > self.max[metric]:
+            self.max[metric] = grid[i]
+            self.dirty[metric] = None  # đổi thang màu -> dựng lại toàn bộ
+        elif self.dirty[metric] is not None:
+            self.dirty[metric].add(i)
+        self.version += 1
+
+    def _on_cell_change(self, cell, attr, old, new):
+        if attr != "owner" or self._board.replaying:
+            return
+        i = cell.row * self.size + cell.col
+        if old and old != new:
+            self._bump("contested", i)
+        if new:
+            self._bump("captures", i)
+
+    def record_event(self, cell):
+        self._bump("events", cell.row * self.size + cell.col)
+
+    # ---------- Đọc ----------
+    def value(self, metric, row, col):
+        return self.counts[metric][row * self.size + col]
+
+    def take_dirty(self, metric):
+        """Trả về tập ô cần vẽ lại (None = toàn bộ) và xoá dấu."""
+        d = self.dirty[metric]
+        self.dirty[metric] = set()
+        return d
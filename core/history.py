@@ -0,0 +1,131 @@
+# core/history.py
+from typing import Dict, List, Optional, Tuple
+
+
+class _Step:
+    """
+    Một bước (thường là một lượt) đã ghi: chỉ lưu các ô thực sự đổi, không copy cả bàn.
+    - cells: (row, col, attr) -> [giá trị cũ, giá trị mới]
+    - gm_before / gm_after: trạng thái lượt + ký hiệu các đội (TEAM_SWAP)
+    - log_entries: các dòng match_log được thêm trong bước này
+    """
+    __slots__ = ("label", "cells", "gm_before", "gm_after", "log_entries")
+
+    def __init__(self, label: str, gm_before):
+        self.label = label
+        self.cells: Dict[Tuple[int, int, str], list] = {}
+        self.gm_before = gm_before
+        self.gm_after = None
+        self.log_entries: List[tuple] = []
+
+
+class History:
+    """
+    Undo/redo nhiều bước dạng command log với thao tác ngược.
+    - Lắng nghe Board (board.add_listener) để ghi giá trị cũ của mỗi (ô, thuộc tính) ở lần đổi đầu tiên,
+      nên mọi event sửa bàn tại chỗ (NUKE_AREA, CHANGE_OWNER, SHUFFLE_EVENTS...) đều được ghi lại.
+    - Chi phí undo/redo và bộ nhớ mỗi bước là O(số ô thay đổi).
+
+    Dùng: begin(label) khi bắt đầu lượt, commit() khi lượt kết thúc, undo()/redo() khi đang rảnh.
+    """
+
+    def __init__(self, board, gm, max_steps: int = 200):
+        self.board = board
+        self.gm = gm
+        self.max_steps = max_steps
+        self._steps: List[_Step] = []
+        self._cursor = 0               # số bước đang có hiệu lực (undo lùi, redo tiến)
+        self._current: Optional[_Step] = None
+        board.add_listener(self._on_cell_change)
+
+    # ---------- Ghi ----------
+    def _gm_state(self):
+        gm = self.gm
+        return (
+            gm.current_idx, gm.turn_dir, gm.skip_symbol,
+            tuple(p.symbol for p in gm.players), len(gm.match_log),
+        )
+
+    def _on_cell_change(self, cell, attr, old, new):
+        step = self._current
+        if step is None or self.board.replaying:
+            return
+        key = (cell.row, cell.col, attr)
+        if key not in step.cells:
+            step.cells[key] = [old, None]
+
+    @property
+    def recording(self) -> bool:
+        return self._current is not None
+
+    def begin(self, label: str = ""):
+        """Bắt đầu ghi một bước. Nếu đang ghi dở thì gộp vào bước hiện tại."""
+        if self._current is None:
+            self._current = _Step(label, self._gm_state())
+
+    def commit(self) -> bool:
+        """Kết thúc bước đang ghi. Trả về True nếu có thay đổi được lưu."""
+        step, self._current = self._current, None
+        if step is None:
+            return False
+        cells = self.board.cells
+        for (r, c, attr), pair in list(step.cells.items()):
+            pair[1] = getattr(cells[r][c], attr)
+            if pair[0] == pair[1]:
+                del step.cells[(r, c, attr)]
+        step.gm_after = self._gm_state()
+        step.log_entries = list(self.gm.match_log[step.gm_before[4]:])
+        if not step.cells and step.gm_after == step.gm_before:
+            return False
+
+        # Bước mới xoá nhánh redo
+        del self._steps[self._cursor:]
+        self._steps.append(step)
+        if len(self._steps) > self.max_steps:
+            del self._steps[0]
+        self._cursor = len(self._steps)
+        return True
+
+    # ---------- Undo / redo ----------
+    def can_undo(self) -> bool:
+        return self._current is None and self._cursor > 0
+
+    def can_redo(self) -> bool:
+        return self._current is None and self._cursor < len(self._steps)
+
+    def undo(self) -> Optional[str]:
+        if not self.can_undo():
+            return None
+        self._cursor -= 1
+        step = self._steps[self._cursor]
+        self._apply(step, 0, step.gm_before)
+        del self.gm.match_log[step.gm_before[4]:]
+        return step.label
+
+    def redo(self) -> Optional[str]:
+        if not self.can_redo():
+            return None
+        step = self._steps[self._cursor]
+        self._cursor += 1
+        self._apply(step, 1, step.gm_after)
+        self.gm.match_log.extend(step.log_entries)
+        return step.label
+
+    def _apply(self, step: _Step, which: int, gm_state):
+        board = self.board
+        cells = board.cells
+        board.replaying = True  # listener khác (heatmap, recorder...) đọc cờ này để bỏ qua phát lại
+        try:
+            for (r, c, attr), pair in step.cells.items():
+                setattr(cells[r][c], attr, pair[which])
+        finally:
+            board.replaying = False
+        gm = self.gm
+        gm.current_idx, gm.turn_dir, gm.skip_symbol, symbols, _ = gm_state
+        for p, sym in zip(gm.players, symbols):
+            p.symbol = sym
+
+    def clear(self):
+        self._steps.clear()
+        self._cursor = 0
+        self._current = None
@@ -0,0 +1,312 @@
+# core/match_record.py
+"""
+Định dạng nhị phân append-only cho lịch sử trận đấu + bộ đọc thống kê nhiều trận.
+
+File .cgm:
+  header  HEADER (20 byte) + ký hiệu các đội (n_players byte ASCII) + bảng event id (utf-8, ngăn bởi \\0),
+          đệm tới bội số của 8
+  records RECORD 8 byte mỗi bản ghi: kind u8, symbol u8 (ord, 0 = không có), row u16, col u16, value u16
+    REC_MOVE    chủ ô đổi (symbol = chủ mới, 0 = ô bị xoá)
+    REC_ANSWER  một lần trả lời (symbol = đội trả lời, value = 1 nếu đúng)
+    REC_EVENT   kích hoạt sự kiện (symbol = đội kích hoạt, value = chỉ số trong bảng event id)
+    REC_END     có đội thắng (symbol = đội thắng)
+    REC_REPLAY  chủ ô đổi do undo/redo (như REC_MOVE nhưng không phải nước mới: không tính là chiếm ô)
+  trailer (tuỳ chọn, ghi lúc close) event id đăng ký sau khi đã ghi header (utf-8, ngăn bởi \0, đệm tới bội số
+          của 8) + TRAILER 8 byte: magic "CGMT", độ dài phần id. Chỉ số của chúng nối tiếp bảng trong header.
+
+Bản ghi có độ dài cố định nên file bị cắt ngang (tắt máy giữa chừng) vẫn đọc được phần đầu:
+số bản ghi = (kích thước - header - trailer) // 8 (file không có trailer: id đăng ký muộn đọc thành "?").
+"""
+import glob
+import mmap
+import os
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+MAGIC = b"CGML"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHBxHQ")  # magic, version, n_players, board_size, win_length, names_len, seed
+RECORD = struct.Struct("<BBHHH")      # kind, symbol, row, col, value
+REC_SIZE = RECORD.size
+TRAILER_MAGIC = b"CGMT"
+TRAILER = struct.Struct("<4sI")       # magic, names_len (cùng cỡ một bản ghi)
+
+REC_MOVE, REC_ANSWER, REC_EVENT, REC_END, REC_REPLAY = 1, 2, 3, 4, 5
+MATCH_EXT = ".cgm"
+
+
+def _sym(symbol) -> int:
+    return ord(symbol) if symbol else 0
+
+
+def _unsym(code: int) -> Optional[str]:
+    return chr(code) if code else None
+
+
+# ---------------- Ghi ----------------
+class MatchRecorder:
+    """
+    Ghi một trận vào file .cgm. Mọi thay đổi chủ ô được ghi tự động qua board listener
+    (do event: REC_MOVE; do undo/redo, board.replaying: REC_REPLAY), còn answer/event/end do GameManager
+    và main.py gọi.
+    """
+
+    def __init__(self, path: str, board, win_length: int, seed: int, symbols: Iterable[str],
+                 event_ids: Iterable[str]):
+        self.path = path
+        self.event_ids = list(event_ids)
+        self._event_index = {eid: i for i, eid in enumerate(self.event_ids)}
+        self._header_ids = len(self.event_ids)  # id từ chỉ số này trở đi đăng ký muộn -> ghi vào trailer
+        syms = "".join(symbols).encode("ascii")
+        names = "\0".join(self.event_ids).encode("utf-8")
+        head = HEADER.pack(MAGIC, VERSION, len(syms), board.size, win_length, len(names), seed & (2 ** 64 - 1))
+        head += syms + names
+        head += b"\0" * (-len(head) % REC_SIZE)
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._f = open(path, "wb")
+        self._f.write(head)
+        self._board = board
+        board.add_listener(self._on_cell_change)
+
+    def _write(self, kind, symbol, row, col, value=0):
+        if self._f is not None:
+            self._f.write(RECORD.pack(kind, _sym(symbol), row, col, value))
+
+    def _on_cell_change(self, cell, attr, old, new):
+        if attr == "owner":
+            self._write(REC_REPLAY if self._board.replaying else REC_MOVE, new, cell.row, cell.col)
+
+    def answer(self, cell, symbol, correct: bool):
+        self._write(REC_ANSWER, symbol, cell.row, cell.col, 1 if correct else 0)
+
+    def event(self, cell, event_id: str, symbol):
+        idx = self._event_index.get(event_id)
+        if idx is None:
+            idx = self._event_index[event_id] = len(self.event_ids)
+            self.event_ids.append(event_id)  # id lạ: chỉ số vượt bảng trong header, tên ghi vào trailer lúc close
+        self._write(REC_EVENT, symbol, cell.row, cell.col, idx)
+
+    def end(self, winner):
+        self._write(REC_END, winner, 0, 0)
+        self.flush()
+
+    def flush(self):
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self):
+        if self._f is not None:
+            self._board.remove_listener(self._on_cell_change)
+            late = self.event_ids[self._header_ids:]
+            if late:
+                names = "\0".join(late).encode("utf-8")
+                self._f.write(names + b"\0" * (-len(names) % REC_SIZE) + TRAILER.pack(TRAILER_MAGIC, len(names)))
+            self._f.close()
+            self._f = None
+
+
+# ---------------- Đọc ----------------
+class MatchFile:
+    """Một file .cgm đã mmap: thông tin header + memoryview vùng bản ghi (không copy)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path}: truncated header")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mv = memoryview(self._mm)
+        magic, version, n_players, self.board_size, self.win_length, names_len, self.seed = HEADER.unpack_from(mv)
+        if magic != MAGIC or version != VERSION:
+            mv.release()
+            self._mm.close()
+            raise ValueError(f"{path}: not a match log (magic={magic!r}, version={version})")
+        off = HEADER.size
+        self.symbols = bytes(mv[off:off + n_players]).decode("ascii")
+        off += n_players
+        names = bytes(mv[off:off + names_len]).decode("utf-8")
+        self.event_ids = names.split("\0") if names else []
+        off += names_len
+        off += -off % REC_SIZE
+        end = len(mv)
+        if end - off >= TRAILER.size and mv[end - TRAILER.size:end - 4] == TRAILER_MAGIC:
+            _, late_len = TRAILER.unpack_from(mv, end - TRAILER.size)
+            start = end - TRAILER.size - late_len - (-late_len % REC_SIZE)
+            if start >= off:
+                self.event_ids += bytes(mv[start:start + late_len]).decode("utf-8").split("\0")
+                end = start
+        self.count = (end - off) // REC_SIZE
+        self.records = mv[off:off + self.count * REC_SIZE]
+        self._mv = mv
+
+    def kinds(self) -> memoryview:
+        """View (bước 8 byte) chỉ gồm byte kind của mọi bản ghi — lọc nhanh không cần unpack."""
+        return self.records[0::REC_SIZE]
+
+    def iter_records(self):
+        return RECORD.iter_unpack(self.records)
+
+    def winner(self) -> Optional[str]:
+        with self.kinds() as view:
+            i = bytes(view).find(REC_END)
+        return _unsym(self.records[i * REC_SIZE + 1]) if i >= 0 else None
+
+    def close(self):
+        self.records.release()
+        self._mv.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MatchArchive:
+    """
+    Thống kê trên một thư mục nhiều file .cgm. Các file được mmap theo lô (batch_size file một lúc,
+    để không giữ hàng nghìn file descriptor), mỗi file duyệt bản ghi bằng struct.iter_unpack
+    trên memoryview; mọi truy vấn được tính chung trong một lượt quét và cache lại.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 256, exclude: Iterable[str] = ()):
+        self.directory = directory
+        self.batch_size = max(1, batch_size)
+        self.exclude = {os.path.abspath(p) for p in exclude}  # ví dụ: file của trận đang ghi
+        self._agg = None
+
+    def paths(self) -> List[str]:
+        paths = glob.glob(os.path.join(self.directory, f"*{MATCH_EXT}"))
+        return sorted(p for p in paths if os.path.abspath(p) not in self.exclude)
+
+    def refresh(self):
+        self._agg = None
+
+    def _batches(self):
+        paths = self.paths()
+        for i in range(0, len(paths), self.batch_size):
+            batch = []
+            try:
+                for p in paths[i:i + self.batch_size]:
+                    try:
+                        batch.append(MatchFile(p))
+                    except (OSError, ValueError) as e:
+                        print(f"[WARN] Skip match log {p}: {e}")
+                yield batch
+            finally:
+                for mf in batch:
+                    mf.close()
+
+    def aggregate(self) -> Dict:
+        if self._agg is not None:
+            return self._agg
+        matches = decided = first_wins = 0
+        expected = 0.0
+        events: Dict[str, List[int]] = {}   # event_id -> [lần kích hoạt, đội kích hoạt thắng, trận có kết quả]
+        captures: Dict[int, array] = {}     # board_size -> số lần bị chiếm của từng ô (phẳng, r * size + c)
+        contested: Dict[int, array] = {}    # board_size -> số lần ô đang có chủ bị đổi chủ / xoá
+        event_cells: Dict[int, array] = {}  # board_size -> số lần kích hoạt sự kiện tại ô
+        answers = [0, 0]                    # [tổng, đúng]
+        for batch in self._batches():
+            for mf in batch:
+                matches += 1
+                n = mf.board_size
+                grid = captures.get(n)
+                if grid is None:
+                    grid = captures[n] = array("I", bytes(4 * n * n))
+                    contested[n] = array("I", bytes(4 * n * n))
+                    event_cells[n] = array("I", bytes(4 * n * n))
+                cont, ev_grid = contested[n], event_cells[n]
+                owners = bytearray(n * n)  # chủ hiện tại của từng ô khi phát lại trận
+                winner = _sym(mf.winner())
+                first_mover = 0
+                triggered = []
+                for kind, sym, r, c, val in mf.iter_records():
+                    if kind == REC_MOVE:
+                        i = r * n + c
+                        if owners[i] and owners[i] != sym:
+                            cont[i] += 1
+                        owners[i] = sym
+                        if sym:
+                            grid[i] += 1
+                            if not first_mover:
+                                first_mover = sym
+                    elif kind == REC_REPLAY:
+                        owners[r * n + c] = sym
+                    elif kind == REC_ANSWER:
+                        answers[0] += 1
+                        answers[1] += val
+                    elif kind == REC_EVENT:
+                        eid = mf.event_ids[val] if val < len(mf.event_ids) else "?"
+                        triggered.append((eid, sym))
+                        ev_grid[r * n + c] += 1
+                    elif kind == REC_END:
+                        break
+                if winner:
+                    decided += 1
+                    expected += 1.0 / max(1, len(mf.symbols))
+                    first_wins += first_mover == winner
+                for eid, sym in triggered:
+                    st = events.setdefault(eid, [0, 0, 0])
+                    st[0] += 1
+                    if winner:
+                        st[2] += 1
+                        st[1] += sym == winner
+        self._agg = {
+            "matches": matches,
+            "first_move": {
+                "decided": decided,
+                "first_mover_wins": first_wins,
+                "rate": first_wins / decided if decided else None,
+                "expected": expected / decided if decided else None,
+            },
+            "events": {
+                eid: {"triggers": t, "decided": d, "trigger_team_wins": w, "win_rate": w / d if d else None}
+                for eid, (t, w, d) in sorted(events.items())
+            },
+            "answers": {"total": answers[0], "correct": answers[1],
+                        "rate": answers[1] / answers[0] if answers[0] else None},
+            "captures": captures,
+            "contested": contested,
+            "event_cells": event_cells,
+        }
+        return self._agg
+
+    # ---------- Truy vấn ----------
+    def first_move_advantage(self) -> Dict:
+        """Tỉ lệ đội đi nước đầu thắng, so với kỳ vọng 1/số đội."""
+        return self.aggregate()["first_move"]
+
+    def event_impact(self) -> Dict[str, Dict]:
+        """Với mỗi event: số lần kích hoạt và tỉ lệ đội kích hoạt thắng trận (trong các trận có kết quả)."""
+        return self.aggregate()["events"]
+
+    def capture_frequency(self, board_size: int) -> List[List[int]]:
+        """Số lần mỗi ô bị chiếm, cộng qua mọi trận cùng cỡ bàn."""
+        grid = self.aggregate()["captures"].get(board_size)
+        if grid is None:
+            return [[0] * board_size for _ in range(board_size)]
+        return [list(grid[r * board_size:(r + 1) * board_size]) for r in range(board_size)]
+
+
+def main(argv=None):
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description="Thống kê các file lịch sử trận (.cgm) trong một thư mục.")
+    ap.add_argument("directory")
+    ap.add_argument("--batch-size", type=int, default=256)
+    args = ap.parse_args(argv)
+    agg = dict(MatchArchive(args.directory, args.batch_size).aggregate())
+    for key in ("captures", "contested", "event_cells"):
+        agg[key] = {f"{n}x{n}": sum(grid) for n, grid in agg[key].items()}
+    print(json.dumps(agg, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+# core/question_dedup.py
+"""
+Phát hiện câu hỏi trùng / gần trùng khi nạp ngân hàng (thời gian ~tuyến tính theo số câu).
+
+1) Trùng hẳn: hash của văn bản đã chuẩn hoá (chữ thường, bỏ dấu câu, gộp khoảng trắng,
+   lựa chọn không phụ thuộc thứ tự, kèm nội dung đáp án đúng).
+2) Gần trùng: MinHash một-hoán-vị (one-permutation hashing, SIG_BINS bin) trên shingle 5 ký tự,
+   rồi LSH chia băng (BANDS x ROWS): chỉ so các cặp rơi cùng bucket. Giữ cặp có cùng đáp án đúng và
+   độ giống có trọng số >= threshold: STEM_WEIGHT * độ giống phần câu hỏi + phần còn lại * độ giống cả câu,
+   nên hai câu chỉ chung bộ lựa chọn ("Sông nào dài nhất..." / "Sông nào ngắn nhất...") không bị gộp. Mỗi câu hash đúng một lần cho mỗi shingle; mỗi câu chỉ so với
+   tối đa BUCKET_PROBE câu gần nhất của mỗi bucket, nên bucket đông (câu cùng khuôn mẫu)
+   không làm thuật toán thành bậc hai.
+Kết quả: các cụm (chỉ số trong danh sách câu hỏi) có >= 2 phần tử, cache ở <bank>.dedup.json
+theo sha1 của file ngân hàng + tham số.
+"""
+import hashlib
+import json
+import operator
+import os
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Sequence
+
+SHINGLE = 5
+SIG_BINS = 64
+BANDS, ROWS = 16, 4          # BANDS * ROWS == SIG_BINS
+BUCKET_PROBE = 8
+DEFAULT_THRESHOLD = 0.6
+STEM_WEIGHT = 0.7           # 0.7 * 0 + 0.3 * 1 < DEFAULT_THRESHOLD: chung lựa chọn thôi không đủ
+CACHE_VERSION = 2
+
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+_EMPTY = 0xFFFFFFFF
+
+
+def normalize_text(s) -> str:
+    s = unicodedata.normalize("NFC", str(s)).casefold()
+    s = _PUNCT.sub(" ", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+def answer_text(q) -> str:
+    """Nội dung đáp án đúng đã chuẩn hoá (answer là chỉ số -> văn bản lựa chọn)."""
+    ans, opts = q.get("answer"), q.get("options") or []
+    if isinstance(ans, int) and not isinstance(ans, bool) and 0 <= ans < len(opts):
+        ans = opts[ans]
+    return normalize_text("" if ans is None else ans)
+
+
+def question_key(q) -> str:
+    """
+    Văn bản so sánh của một câu: câu hỏi + các lựa chọn đã sắp xếp (đổi thứ tự vẫn coi là trùng) + đáp án đúng.
+    Câu tự luận (không có options) chỉ có câu hỏi + đáp án.
+    """
+    opts = sorted(normalize_text(o) for o in q.get("options") or [])
+    return normalize_text(q.get("question", "")) + " || " + " | ".join(opts) + " => " + answer_text(q)
+
+
+def signature(text: str) -> List[int]:
+    """MinHash một-hoán-vị: bin = h % SIG_BINS, giữ h // SIG_BINS nhỏ nhất; bin rỗng mượn bin kế tiếp."""
+    sig = [_EMPTY] * SIG_BINS
+    if len(text) < SHINGLE:
+        text = text.ljust(SHINGLE)
+    data = text.encode("utf-8")
+    crc = zlib.crc32
+    hashes = {crc(data[i:i + SHINGLE]) for i in range(len(data) - SHINGLE + 1)}
+    # h = v * SIG_BINS + bin: duyệt giảm dần -> giá trị cuối cùng ghi vào mỗi bin là nhỏ nhất
+    for h in sorted(hashes, reverse=True):
+        sig[h % SIG_BINS] = h // SIG_BINS
+    # Densification: bin rỗng lấy giá trị bin không rỗng kế bên phải (vòng), kèm độ lệch để không trùng ngẫu nhiên
+    if _EMPTY in sig:
+        for b in range(SIG_BINS):
+            if sig[b] == _EMPTY:
+                for k in range(1, SIG_BINS):
+                    v = sig[(b + k) % SIG_BINS]
+                    if v != _EMPTY:
+                        sig[b] = v + k * 0x01000193 & 0x03FFFFFF
+                        break
+    return sig
+
+
+def _similarity(a, b) -> float:
+    return sum(map(operator.eq, a, b)) / SIG_BINS
+
+
+def find_clusters(questions: Sequence[Dict], threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    n = len(questions)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    keys = [question_key(q) for q in questions]
+    answers = [key[key.rfind(" => ") + 4:] for key in keys]
+    exact: Dict[bytes, int] = {}
+    sigs = [None] * n
+    stem_sigs: Dict[int, List[int]] = {}  # chỉ tính cho câu có cặp ứng viên
+
+    def stem_sig(i):
+        sig = stem_sigs.get(i)
+        if sig is None:
+            sig = stem_sigs[i] = signature(keys[i][:keys[i].find(" || ")])
+        return sig
+
+    def similar(i, j):
+        if answers[i] != answers[j]:
+            return False
+        full = _similarity(sigs[i], sigs[j])
+        if STEM_WEIGHT + (1 - STEM_WEIGHT) * full < threshold:
+            return False  # dù phần câu hỏi giống hẳn cũng không đủ
+        return STEM_WEIGHT * _similarity(stem_sig(i), stem_sig(j)) + (1 - STEM_WEIGHT) * full >= threshold
+    buckets: Dict[tuple, List[int]] = {}
+    for i, key in enumerate(keys):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        j = exact.setdefault(digest, i)
+        if j != i:
+            union(i, j)  # trùng hẳn: không cần MinHash
+            continue
+        sig = sigs[i] = signature(key)
+        checked = set()
+        for band in range(BANDS):
+            bucket = buckets.setdefault((band, tuple(sig[band * ROWS:(band + 1) * ROWS])), [])
+            for j in bucket[-BUCKET_PROBE:]:
+                if j in checked:
+                    continue
+                checked.add(j)
+                if find(i) != find(j) and similar(i, j):
+                    union(i, j)
+            bucket.append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def cache_path(bank_path: str) -> str:
+    return os.path.splitext(bank_path)[0] + ".dedup.json"
+
+
+def _file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_or_build_clusters(bank_path: str, questions: Sequence[Dict],
+                           threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """Đọc cụm từ cache nếu khớp (sha1 ngân hàng, số câu, tham số); không thì tính lại và ghi cache."""
+    path = cache_path(bank_path)
+    params = {"version": CACHE_VERSION, "shingle": SHINGLE, "bins": SIG_BINS, "bands": BANDS,
+              "probe": BUCKET_PROBE, "threshold": threshold, "stem_weight": STEM_WEIGHT, "count": len(questions)}
+    try:
+        sha = _file_sha1(bank_path)
+    except OSError:
+        return find_clusters(questions, threshold)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("sha1") == sha and cached.get("params") == params:
+            return [list(c) for c in cached["clusters"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    clusters = find_clusters(questions, threshold)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"sha1": sha, "params": params, "clusters": clusters,
+                       "ids": [[questions[i].get("id") for i in c] for c in clusters]},
+                      f, ensure_ascii=False)
+    except OSError as e:
+        print(f"[WARN] Cannot write dedup cache {path}: {e}")
+    return clusters
@@ -4,18 +4,138 @@ import json
 import random
 import math
 import os
+import unicodedata
+from collections import deque
 from typing import List, Dict, Any, Optional
 
+from core.answer_judge import AnswerBook
+from core.question_dedup import load_or_build_clusters, question_key
+from core.question_pool import Bitset, TagIndex, TaggedPool, normalize_tags
+
+
+def read_bank(json_path: str, min_required: int) -> List[Any]:
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(f"Không tìm thấy file: {json_path}")
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if not isinstance(data, list):
+        raise ValueError("File JSON phải là một list các câu hỏi.")
+    if len(data) < min_required:
+        raise ValueError(f"Phải có ít nhất {min_required} câu hỏi để chơi.")
+    return data
+
+
+def _nfc(value):
+    return unicodedata.normalize("NFC", value) if isinstance(value, str) else value
+
+
+def normalize_question(q: Any, i: int) -> Optional[Dict[str, Any]]:
+    """
+    Chuẩn hoá một mục thô thứ i (gán qid nếu thiếu, answer "A/B/C/D" -> index); None nếu không hợp lệ.
+    Câu tự luận ("type": "text" hoặc không có options): options rỗng, answer là chuỗi, "accept" = các biến thể.
+    Mọi chuỗi hiển thị được đưa về NFC một lần ở đây (dấu tiếng Việt dựng sẵn: đo / render theo glyph có sẵn).
+    """
+    if not isinstance(q, dict):
+        return None
+    qid = q.get("id", f"q{i+1}")
+    question = _nfc(q.get("question") or "").strip()
+    options = q.get("options") or []
+    if isinstance(options, list):
+        options = [_nfc(o) for o in options]
+    answer = _nfc(q.get("answer"))
+
+    if question and (q.get("type") == "text" or not options) and answer is not None and str(answer).strip():
+        accept = q.get("accept") or []
+        if isinstance(accept, str):
+            accept = accept.split("|")
+        accept = [_nfc(a) for a in accept]
+        return {
+            "id": qid,
+            "question": question,
+            "options": [],
+            "answer": str(answer).strip(),
+            "accept": tuple(str(a).strip() for a in accept if str(a).strip()),
+            "tags": normalize_tags(q),
+        }
+
+    # validate cơ bản
+    if not question or not isinstance(options, list) or len(options) < 2:
+        return None
+
+    # nếu có 4 đáp án, chuẩn hoá answer dạng "A/B/C/D" -> index
+    norm_answer = answer
+    if isinstance(answer, str) and len(answer) == 1 and answer.upper() in "ABCD":
+        norm_answer = "ABCD".index(answer.upper())
+
+    return {
+        "id": qid,
+        "question": question,
+        "options": options,
+        "answer": norm_answer,
+        "tags": normalize_tags(q),
+    }
+
+
+class PreparedBank:
+    """Ngân hàng mới đã chuẩn hoá + kiểm tra, dựng sẵn chỉ mục; chỉ đọc, chờ apply_reload()."""
+    __slots__ = ("questions", "clusters", "changed", "added", "removed")
+
+    def __init__(self, questions, clusters, changed, added, removed):
+        self.questions = questions
+        self.clusters = clusters
+        self.changed = changed
+        self.added = added
+        self.removed = removed
+
+    def summary(self) -> str:
+        return f"{len(self.questions)} câu: sửa {len(self.changed)}, thêm {len(self.added)}, bỏ {len(self.removed)}"
+
+
+def question_error(q: Dict[str, Any]) -> Optional[str]:
+    """Lỗi của một câu đã chuẩn hoá (đáp án không trỏ đúng lựa chọn), None nếu hợp lệ."""
+    ans = q["answer"]
+    if not q["options"]:
+        return None if isinstance(ans, str) and ans else f"Câu {q['id']}: câu tự luận thiếu đáp án"
+    if isinstance(ans, int) and not 0 <= ans < len(q["options"]):
+        return f"Câu {q['id']}: đáp án {ans} ngoài {len(q['options'])} lựa chọn"
+    if isinstance(ans, str) and ans not in q["options"]:
+        return f"Câu {q['id']}: đáp án '{ans}' không có trong các lựa chọn"
+    return None
+
+
+def validate_bank(questions: List[Dict[str, Any]], min_required: int):
+    """Kiểm tra chặt hơn lúc nạp đầu (dùng khi nạp lại): đủ số câu, id không trùng, đáp án trỏ đúng lựa chọn."""
+    if len(questions) < min_required:
+        raise ValueError(f"Ngân hàng sau khi chuẩn hoá còn {len(questions)} câu (< {min_required}).")
+    seen = set()
+    for q in questions:
+        if q["id"] in seen:
+            raise ValueError(f"Trùng id câu hỏi: {q['id']}")
+        seen.add(q["id"])
+        err = question_error(q)
+        if err:
+            raise ValueError(err)
+
 
 class QuestionManager:
     """
     Quản lý ngân hàng câu hỏi và cách cấp phát cho game.
 
     - JSON kỳ vọng: list[ { "question": str, "options": [str,str,str,str], "answer": "A|B|C|D" | str } ]
+      Câu tự luận: { "question": str, "type": "text", "answer": str, "accept": [str, ...] } (không có options);
+      answer_book giữ đáp án đã chuẩn hoá của các câu này, dựng lại (tăng dần) mỗi lần nạp ngân hàng.
     - Chia thành 2 pool:
         * used_questions   : dùng để lấp đầy bảng (ưu tiên rút trước)
         * spare_questions  : dự phòng (đổi câu, lặp click, cạn pool chính...)
     - Hiệu năng: dùng chỉ mục (O(1)) thay vì pop(0) (O(n)).
+    - Câu trùng / gần trùng (core.question_dedup) gom thành cụm; mỗi trận chỉ phát tối đa một câu mỗi cụm.
+    - Tag (trường "tags", "subject", "grade" trong JSON) được chỉ mục ngược; set_tag_mix({"subject:toán": 2, ...})
+      bật chế độ rút theo tỉ lệ tag (core.question_pool.TaggedPool). Câu đã phát đánh dấu trong bitset chung
+      nên hai chế độ không bao giờ phát lại cùng một câu.
+    - Nạp lại khi file đổi (core.bank_reload): prepare_reload() chạy ở thread nền, apply_reload() tráo
+      ngân hàng mới ở main thread giữa hai frame; câu đang hiện trên popup và vị trí phát không bị ảnh hưởng.
     """
 
     def __init__(
@@ -25,8 +145,13 @@ class QuestionManager:
         spare_ratio: float = 0.3,
         seed: Optional[int] = None,
         min_required: int = 9,
+        dedup: bool = True,
+        tag_mix: Optional[Dict[str, float]] = None,
     ):
         self._rng = random.Random(seed)
+        self.json_path = json_path
+        self._min_required = min_required
+        self._dedup = dedup
 
         # raw & pools
         self._all: List[Dict[str, Any]] = []
@@ -37,6 +162,21 @@ class QuestionManager:
         self._used_i = 0
         self._spare_i = 0
 
+        # cụm câu trùng: id(question dict) -> số cụm; cụm đã phát trong trận
+        self.clusters: List[List[int]] = []
+        self._cluster_of: Dict[int, int] = {}
+        self._served_clusters = set()
+
+        # câu đã phát (bitset theo chỉ số trong _all) + pool theo tag
+        self._index_of: Dict[int, int] = {}
+        self._served = Bitset(0)
+        self.tag_index: Optional[TagIndex] = None
+        self.answer_book: Optional[AnswerBook] = None  # đáp án tự luận đã chuẩn hoá (core.answer_judge)
+        self._tag_pool: Optional[TaggedPool] = None
+        self.tag_mix: Dict[str, float] = {}
+        self._tag_low_water = 5
+        self._tag_queue: deque = deque()  # chỉ số đã rút trước cho peek_questions
+
         # board/event stats
         self.board_size = 0
         self.total_cells = 0
@@ -44,62 +184,154 @@ class QuestionManager:
 
         # load & prepare
         self._load_questions(json_path, min_required)
+        self._set_bank(self._all, load_or_build_clusters(json_path, self._all) if dedup else [])
         self._split_questions(event_ratio, spare_ratio)
         self._calculate_board_size()
+        if tag_mix:
+            self.set_tag_mix(tag_mix)
 
     # ------------------ Load & prepare ------------------
 
     def _load_questions(self, json_path: str, min_required: int):
-        if not os.path.exists(json_path):
-            raise FileNotFoundError(f"Không tìm thấy file: {json_path}")
-
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if not isinstance(data, list):
-            raise ValueError("File JSON phải là một list các câu hỏi.")
-        if len(data) < min_required:
-            raise ValueError(f"Phải có ít nhất {min_required} câu hỏi để chơi.")
-
-        # Chuẩn hoá: gán qid nếu thiếu, normalize answer
-        self._all = []
-        for i, q in enumerate(data):
-            if not isinstance(q, dict):
-                continue
-            qid = q.get("id", f"q{i+1}")
-            question = (q.get("question") or "").strip()
-            options = q.get("options") or []
-            answer = q.get("answer")
-
-            # validate cơ bản
-            if not question or not isinstance(options, list) or len(options) < 2:
-                continue
-
-            # nếu có 4 đáp án, chuẩn hoá answer dạng "A/B/C/D" -> index
-            norm_answer = answer
-            if isinstance(answer, str) and len(answer) == 1 and answer.upper() in "ABCD":
-                norm_answer = "ABCD".index(answer.upper())
-
-            self._all.append({
-                "id": qid,
-                "question": question,
-                "options": options,
-                "answer": norm_answer,
-            })
-
+        data = read_bank(json_path, min_required)
+        self._all = [q for q in (normalize_question(raw, i) for i, raw in enumerate(data)) if q is not None]
         if len(self._all) < min_required:
             raise ValueError(f"Ngân hàng sau khi chuẩn hoá còn {len(self._all)} câu (< {min_required}).")
 
-    def _split_questions(self, event_ratio: float, spare_ratio: float):
-        total = len(self._all)
-        spare_count = int(total * spare_ratio)
-        used_count = max(0, total - spare_count)
+    def _set_bank(self, questions, clusters):
+        self._all = questions
+        self.clusters = clusters
+        self._cluster_of = {id(questions[i]): k for k, c in enumerate(clusters) for i in c}
+        self._index_of = {id(q): i for i, q in enumerate(questions)}
+        self.tag_index = TagIndex(questions)
+        self.answer_book = AnswerBook(questions, self.answer_book)
 
+    # ------------------ Hot reload ------------------
+
+    def prepare_reload(self, json_path: Optional[str] = None) -> PreparedBank:
+        """
+        (Thread nền) Đọc lại file, chuẩn hoá, kiểm tra, tính cụm trùng. Câu không đổi giữ nguyên object cũ
+        (layout đã dựng sẵn, cụm, ... vẫn dùng được); chỉ câu sửa/thêm là object mới.
+        Ghép câu cũ -> mới: theo "id" nếu file khai báo; câu không có id (id theo vị trí "q<i>" sẽ lệch khi
+        thêm / xoá dòng phía trước) ghép theo nội dung (question_dedup.question_key) và nhận lại id cũ, nên
+        id của một câu ổn định qua các lần nạp. Không khớp nội dung nhưng câu cũ cùng vị trí chưa được ghép
+        (sửa lỗi chính tả tại chỗ) -> cùng câu, đã sửa. Chỉ câu chèn thêm thật mới nhận id chưa từng dùng.
+        Lỗi (JSON hỏng, thiếu câu, id trùng...) -> ValueError/OSError, ngân hàng hiện tại giữ nguyên.
+        """
+        path = json_path or self.json_path
+        data = read_bank(path, self._min_required)
+        entries = [(raw, q) for i, raw in enumerate(data) for q in (normalize_question(raw, i),) if q is not None]
+        explicit = {q["id"] for raw, q in entries if "id" in raw}
+        old = {q["id"]: q for q in self._all}  # _all chỉ bị thay cả list, không sửa tại chỗ
+        # Câu không có id nằm nguyên chỗ, không sửa (id theo vị trí + nội dung trùng khớp): ghép luôn, khỏi tính khoá
+        kept = {q["id"] for raw, q in entries if "id" not in raw and old.get(q["id"]) == q} - explicit
+        by_text: Dict[str, deque] = {}  # nội dung -> các câu cũ (theo thứ tự) cho câu không có id còn lại
+        for q in self._all:
+            if q["id"] not in explicit and q["id"] not in kept:
+                by_text.setdefault(question_key(q), deque()).append(q)
+
+        # Lượt 1: ghép theo id khai báo / nguyên chỗ / nội dung
+        prevs = []
+        for raw, q in entries:
+            if "id" in raw:
+                prev = old.get(q["id"])
+            elif q["id"] in kept:
+                prev = old[q["id"]]
+            else:
+                same = by_text.get(question_key(q))
+                prev = same.popleft() if same else None
+            prevs.append(prev)
+        matched = explicit | {prev["id"] for prev in prevs if prev is not None}
+        # Lượt 2: câu không có id còn lại -> câu cũ cùng vị trí nếu chưa được ghép, không thì là câu mới
+        taken = set(old) | explicit
+        next_id = len(data)
+        questions, changed, added = [], [], []
+        for k, ((raw, q), prev) in enumerate(zip(entries, prevs)):
+            if "id" not in raw:
+                if prev is None and k < len(self._all) and self._all[k]["id"] not in matched:
+                    prev = self._all[k]
+                    matched.add(prev["id"])
+                if prev is not None:
+                    q["id"] = prev["id"]
+                elif q["id"] in taken:
+                    while f"q{next_id + 1}" in taken:
+                        next_id += 1
+                    q["id"] = f"q{next_id + 1}"
+                taken.add(q["id"])
+            if prev is None:
+                added.append(q["id"])
+            elif prev == q:
+                q = prev
+            else:
+                changed.append(q["id"])
+            questions.append(q)
+        validate_bank(questions, self._min_required)
+        ids = {q["id"] for q in questions}
+        removed = [qid for qid in old if qid not in ids]
+        clusters = load_or_build_clusters(path, questions) if self._dedup else []
+        return PreparedBank(questions, clusters, changed, added, removed)
+
+    def apply_reload(self, bank: PreparedBank):
+        """
+        (Main thread) Tráo sang ngân hàng mới:
+        - used/spare giữ thứ tự; câu sửa thay bằng bản mới tại chỗ, câu bị xoá bỏ khỏi pool, câu mới thêm cuối spare.
+        - con trỏ phát dời theo số câu bị xoá phía trước nó -> câu đã phát không bị phát lại, câu chưa phát vẫn chờ.
+        - câu đã phát (bitset, cụm) ánh xạ sang ngân hàng mới theo id (ổn định, xem prepare_reload).
+        Câu popup đang hiện là object cũ, không bị sửa.
+        """
+        by_id = {q["id"]: q for q in bank.questions}
+        served_ids = {q["id"] for i, q in enumerate(self._all) if i in self._served}
+
+        def remap(pool, pointer):
+            out, new_ptr = [], 0
+            for i, q in enumerate(pool):
+                nq = by_id.pop(q["id"], None)
+                if nq is None:
+                    continue
+                out.append(nq)
+                if i < pointer:
+                    new_ptr += 1
+            return out, new_ptr
+
+        self.used_questions, self._used_i = remap(self.used_questions, self._used_i)
+        self.spare_questions, self._spare_i = remap(self.spare_questions, self._spare_i)
+        self.spare_questions += [q for q in bank.questions if q["id"] in by_id]  # câu mới (còn lại trong by_id)
+
+        self._tag_pool = None  # pool cũ trỏ chỉ số của ngân hàng cũ
+        self._tag_queue.clear()
+        self._set_bank(bank.questions, bank.clusters)
+        self._served = Bitset(len(bank.questions))
+        self._served_clusters = set()
+        for q in bank.questions:
+            if q["id"] in served_ids:
+                self._mark_served(q)
+        self.total_cells = len(self.used_questions)  # bàn cờ đã dựng: board_size giữ nguyên
+        if self.tag_mix:
+            self.set_tag_mix(self.tag_mix, self._tag_low_water)
+
+    def _split_questions(self, event_ratio: float, spare_ratio: float):
         shuffled = self._all[:]  # copy
         self._rng.shuffle(shuffled)
 
-        self.used_questions = shuffled[:used_count]
-        self.spare_questions = shuffled[used_count:]
+        # Mỗi cụm trùng chỉ một đại diện được tính vào bàn cờ; các bản còn lại xếp cuối pool dự phòng
+        primaries, extras, seen = [], [], set()
+        for q in shuffled:
+            k = self._cluster_of.get(id(q))
+            if k is None or k not in seen:
+                primaries.append(q)
+                if k is not None:
+                    seen.add(k)
+            else:
+                extras.append(q)
+
+        total = len(primaries)
+        spare_count = int(total * spare_ratio)
+        used_count = max(0, total - spare_count)
+
+        self.used_questions = primaries[:used_count]
+        self.spare_questions = primaries[used_count:] + extras
+        self._served_clusters = set()
+        self._served = Bitset(len(self._all))
 
         # số ô sự kiện tính theo used_count nhưng không vượt used_count
         self.num_event_cells = min(used_count, max(0, int(used_count * event_ratio)))
@@ -129,26 +361,120 @@ class QuestionManager:
         Rút một câu cho ô thường hoặc ô sự kiện cần hỏi.
         Ưu tiên pool 'used_questions', khi hết sẽ sang 'spare_questions'.
         """
-        if self._used_i < len(self.used_questions):
+        if self._tag_pool is not None:
+            q = self._take_tagged()
+            if q is not None:
+                return q
+        q = self._take_used()
+        return q if q is not None else self._take_spare()
+
+    def set_tag_mix(self, mix: Optional[Dict[str, float]], low_water: int = 5):
+        """
+        Bật rút theo tỉ lệ tag, ví dụ {"subject:toán": 2, "subject:văn": 1}; None/{} để tắt.
+        Tag không có câu nào bị bỏ qua. Khi mọi tag trong mix đã cạn, get_question quay về used/spare.
+        """
+        self._tag_queue.clear()
+        self._tag_pool = None
+        self.tag_mix, self._tag_low_water = dict(mix or {}), low_water
+        if mix:
+            pool = TaggedPool(self._all, self.tag_index, mix, self._served, rng=self._rng, low_water=low_water,
+                              accept=lambda idx: self._servable(self._all[idx], self._served_clusters))
+            if not pool.exhausted:
+                self._tag_pool = pool
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Số câu theo từng tag (toàn ngân hàng)."""
+        return {t: len(ids) for t, ids in self.tag_index.index.items()}
+
+    def _servable(self, q, served) -> bool:
+        if self._index_of.get(id(q), -1) in self._served:
+            return False
+        k = self._cluster_of.get(id(q))
+        return k is None or k not in served
+
+    def _mark_served(self, q):
+        idx = self._index_of.get(id(q))
+        if idx is not None:
+            self._served.add(idx)
+            if self._tag_pool is not None:
+                self._tag_pool.note_served(idx)
+        k = self._cluster_of.get(id(q))
+        if k is not None:
+            self._served_clusters.add(k)
+        return q
+
+    def _take_tagged(self):
+        while self._tag_queue:
+            q = self._all[self._tag_queue.popleft()]
+            if self._servable(q, self._served_clusters):
+                return self._mark_served(q)
+        idx = self._tag_pool.draw()
+        if idx is None:
+            self._tag_pool = None  # mọi tag đã cạn
+            return None
+        return self._mark_served(self._all[idx])
+
+    def _take_used(self):
+        while self._used_i < len(self.used_questions):
             q = self.used_questions[self._used_i]
             self._used_i += 1
-            return q
-        if self._spare_i < len(self.spare_questions):
+            if self._servable(q, self._served_clusters):
+                return self._mark_served(q)
+        return None
+
+    def _take_spare(self):
+        while self._spare_i < len(self.spare_questions):
             q = self.spare_questions[self._spare_i]
             self._spare_i += 1
-            return q
+            if self._servable(q, self._served_clusters):
+                return self._mark_served(q)
         return None
 
+    def peek_questions(self, n: int) -> List[Dict[str, Any]]:
+        """Xem trước n câu mà get_question() sẽ trả về tiếp theo (không rút)."""
+        out, served = [], set(self._served_clusters)
+        if self._tag_pool is not None:
+            # rút ngẫu nhiên không xem trước được: rút sẵn vào hàng đợi, get_question lấy từ đó trước
+            while len(self._tag_queue) < n:
+                idx = self._tag_pool.draw()
+                if idx is None:
+                    break
+                self._tag_queue.append(idx)
+            for idx in self._tag_queue:
+                q = self._all[idx]
+                if len(out) < n and self._servable(q, served):
+                    out.append(q)
+                    k = self._cluster_of.get(id(q))
+                    if k is not None:
+                        served.add(k)
+        queued = {id(self._all[i]) for i in self._tag_queue}
+        for pool, start in ((self.used_questions, self._used_i), (self.spare_questions, self._spare_i)):
+            for i in range(start, len(pool)):
+                if len(out) >= n:
+                    return out
+                q = pool[i]
+                if id(q) not in queued and self._servable(q, served):
+                    out.append(q)
+                    k = self._cluster_of.get(id(q))
+                    if k is not None:
+                        served.add(k)
+        return out
+
     def get_spare_question(self) -> Optional[Dict[str, Any]]:
         """Rút trực tiếp từ pool dự phòng (ví dụ cho đổi câu)."""
-        if self._spare_i < len(self.spare_questions):
-            q = self.spare_questions[self._spare_i]
-            self._spare_i += 1
-            return q
-        return None
+        return self._take_spare()
 
     # ------------------ Helpers/diagnostics ------------------
 
+    def reset_served(self):
+        """Bắt đầu lại như trận mới: mọi câu lại được phát (giữ nguyên thứ tự pool và tag mix)."""
+        self._used_i = self._spare_i = 0
+        self._served_clusters.clear()
+        self._served.clear()
+        self._tag_queue.clear()
+        if self.tag_mix:
+            self.set_tag_mix(self.tag_mix, self._tag_low_water)
+
     def remaining_used(self) -> int:
         return max(0, len(self.used_questions) - self._used_i)
 
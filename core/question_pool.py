@@ -0,0 +1,184 @@
+# core/question_pool.py
+"""
+Pool câu hỏi theo tag (môn, lớp...) cho QuestionManager:
+  Bitset        đánh dấu câu đã phát (1 bit / câu)
+  AliasSampler  rút chỉ số theo trọng số, O(1) mỗi lần rút (phương pháp alias của Vose)
+  TagIndex      chỉ mục ngược tag -> danh sách chỉ số câu
+  TaggedPool    rút câu theo tỉ lệ tag mong muốn; pool sắp cạn thì giảm trọng số, cạn hẳn thì bỏ
+                tag đó và chia lại trọng số cho các tag còn lại (không rơi xuống spare_questions)
+"""
+import random
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class Bitset:
+    __slots__ = ("_bits", "count")
+
+    def __init__(self, size: int):
+        self._bits = bytearray((size + 7) >> 3)
+        self.count = 0
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self._bits[i >> 3] & (1 << (i & 7)))
+
+    def add(self, i: int):
+        mask = 1 << (i & 7)
+        if not self._bits[i >> 3] & mask:
+            self._bits[i >> 3] |= mask
+            self.count += 1
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+class AliasSampler:
+    """Rút chỉ số i với xác suất weights[i] / sum(weights); dựng O(n), rút O(1)."""
+
+    def __init__(self, weights: Sequence[float], rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("AliasSampler needs at least one positive weight")
+        self.n = n
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s], self.alias[s] = scaled[s], l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in large + small:  # phần dư do làm tròn số thực
+            self.prob[i] = 1.0
+
+    def draw(self) -> int:
+        i = int(self.rng.random() * self.n)
+        return i if self.rng.random() < self.prob[i] else self.alias[i]
+
+
+class TagIndex:
+    """Tag -> danh sách chỉ số (theo thứ tự trong questions)."""
+
+    def __init__(self, questions: Sequence[Dict]):
+        self.index: Dict[str, List[int]] = {}
+        for i, q in enumerate(questions):
+            for tag in q.get("tags", ()):
+                self.index.setdefault(tag, []).append(i)
+
+    def tags(self) -> List[str]:
+        return sorted(self.index)
+
+    def ids(self, tag: str) -> List[int]:
+        return self.index.get(tag, [])
+
+
+class TaggedPool:
+    """
+    Rút câu theo tỉ lệ tag, ví dụ mix = {"subject:toan": 2, "subject:van": 1}.
+    - Mỗi tag có danh sách chỉ số đã xáo + con trỏ; câu đã phát (served, dùng chung với QuestionManager)
+      hoặc bị accept() từ chối thì bỏ qua khi tới lượt (khấu hao O(1)).
+    - remaining[tag] giảm cho MỌI tag của câu vừa phát (câu có nhiều tag), nên trọng số phản ánh
+      đúng số câu còn lại. Khi remaining < low_water, trọng số tag bị nhân remaining / low_water;
+      khi = 0, tag bị loại. Dựng lại bảng alias chỉ O(số tag).
+    """
+
+    def __init__(self, questions: Sequence[Dict], index: TagIndex, mix: Dict[str, float], served: Bitset,
+                 rng: Optional[random.Random] = None, low_water: int = 5,
+                 accept: Optional[Callable[[int], bool]] = None):
+        self.questions = questions
+        self.rng = rng or random.Random()
+        self.served = served
+        self.low_water = max(1, low_water)
+        self.accept = accept
+        self.mix = {t: float(w) for t, w in mix.items() if w > 0 and index.ids(t)}
+        self._order: Dict[str, List[int]] = {}
+        self._cursor: Dict[str, int] = {}
+        self.remaining: Dict[str, int] = {}
+        for tag in self.mix:
+            ids = [i for i in index.ids(tag) if i not in served]
+            self.rng.shuffle(ids)
+            self._order[tag], self._cursor[tag], self.remaining[tag] = ids, 0, len(ids)
+        self._tags: List[str] = []
+        self._sampler: Optional[AliasSampler] = None
+        self.rebuilds = 0
+        self._rebuild()
+
+    def _weight(self, tag):
+        rem = self.remaining[tag]
+        if rem <= 0:
+            return 0.0
+        return self.mix[tag] * (min(rem, self.low_water) / self.low_water)
+
+    def _rebuild(self):
+        self._tags = [t for t in self.mix if self._weight(t) > 0]
+        self._sampler = AliasSampler([self._weight(t) for t in self._tags], self.rng) if self._tags else None
+        self.rebuilds += 1
+
+    @property
+    def exhausted(self) -> bool:
+        return self._sampler is None
+
+    def _next_from(self, tag) -> Optional[int]:
+        order, i = self._order[tag], self._cursor[tag]
+        while i < len(order):
+            idx = order[i]
+            i += 1
+            if idx in self.served:
+                continue
+            if self.accept is not None and not self.accept(idx):
+                self.note_served(idx, rebuild=False)  # không phát được nữa (ví dụ cùng cụm trùng)
+                continue
+            self._cursor[tag] = i
+            return idx
+        self._cursor[tag] = i
+        self.remaining[tag] = 0
+        return None
+
+    def note_served(self, idx: int, rebuild: bool = True):
+        """Gọi khi câu idx được phát (hoặc bị loại): giảm remaining của các tag của nó."""
+        changed = False
+        for tag in self.questions[idx].get("tags", ()):
+            if tag in self.remaining and self.remaining[tag] > 0:
+                self.remaining[tag] -= 1
+                changed = changed or self.remaining[tag] < self.low_water
+        if changed and rebuild:
+            self._rebuild()
+
+    def draw(self) -> Optional[int]:
+        """Chỉ số câu tiếp theo (chưa đánh dấu served — người gọi làm việc đó), hoặc None nếu mọi tag đã cạn."""
+        while self._sampler is not None:
+            tag = self._tags[self._sampler.draw()]
+            idx = self._next_from(tag)
+            if idx is not None:
+                return idx
+            self._rebuild()  # tag vừa cạn: chia lại trọng số cho các tag còn lại
+        return None
+
+
+def normalize_tags(q: Dict) -> tuple:
+    """tags (list hoặc chuỗi 'a, b') + subject/grade -> tuple tag chữ thường, ví dụ ('subject:toán', 'grade:5')."""
+    raw = q.get("tags") or []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    tags = [str(t).strip().lower() for t in raw if str(t).strip()]
+    for field in ("subject", "grade"):
+        if q.get(field) not in (None, ""):
+            tags.append(f"{field}:{str(q[field]).strip().lower()}")
+    return tuple(dict.fromkeys(tags))
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'subject:toán=2,subject:văn=1' -> {"subject:toán": 2.0, "subject:văn": 1.0} (thiếu '=w' -> 1)."""
+    mix: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        tag, _, w = part.partition("=")
+        mix[tag.strip().lower()] = float(w) if w.strip() else 1.0
+    return mix
+
@@ -0,0 +1,305 @@
+# core/shared_bank.py
+"""
+Ngân hàng câu hỏi đã chuẩn hoá, đặt một lần vào multiprocessing.shared_memory cho nhiều tiến trình
+(worker mô phỏng, phòng thi đấu) cùng đọc — không pickle list dict, không parse JSON lại ở mỗi tiến trình.
+
+    bank = SharedBank.publish(qm._all, qm.clusters)      # tiến trình chính (chủ sở hữu)
+    pool.map(run_match, [(bank.name, seed) for seed in seeds])
+    ...
+    bank = SharedBank.attach(name)                      # worker: chỉ đọc
+    cursor = MatchCursor(bank, seed=seed)               # con trỏ used/spare riêng của trận
+    q = cursor.get_question()
+    ...
+    bank.close(); bank.unlink()                         # chủ sở hữu dọn khi xong
+
+Bố cục segment (mọi phần căn 8 byte):
+  header   HEADER: magic, version, n_questions, n_strings, offset của các phần bên dưới
+  records  RECORD mỗi câu: id, question, option đầu, tag đầu (chỉ số chuỗi), số option, số tag,
+           số biến thể đáp án tự luận ("accept", nằm ngay sau tag), kiểu đáp án + giá trị (ANS_INDEX: chỉ số lựa chọn, ANS_STRING/ANS_JSON: chỉ số chuỗi)
+  clusters int32 mỗi câu: số cụm trùng (core.question_dedup), -1 nếu không thuộc cụm
+  offsets  uint64 x (n_strings + 1): chuỗi i là data[offsets[i]:offsets[i+1]]
+  data     các chuỗi UTF-8 nối liền; option / tag / accept của một câu nằm liên tiếp
+Dict của một câu chỉ được dựng khi câu được phát (MatchCursor), phần còn lại chỉ là chỉ số.
+"""
+import json
+import math
+import random
+import struct
+import weakref
+from array import array
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence
+
+MAGIC = b"CGSB"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxIIQQQQ")  # magic, version, n_questions, n_strings, records, clusters, offsets, data
+RECORD = struct.Struct("<IIIIHHHBxI")  # id, question, opt0, tag0, n_opt, n_tag, n_accept, ans_kind, ans
+ANS_NONE, ANS_INDEX, ANS_STRING, ANS_JSON = 0, 1, 2, 3
+
+
+def _align(n: int) -> int:
+    return n + (-n % 8)
+
+
+def _release(shm: shared_memory.SharedMemory, views: List[memoryview]):
+    # View con phải nhả trước: SharedMemory.close() (kể cả từ __del__) lỗi BufferError nếu còn view trỏ vào mmap
+    for v in reversed(views):
+        v.release()
+    shm.close()
+
+
+class SharedBank:
+    """Một segment shared memory chứa ngân hàng; publish() tạo (chủ sở hữu), attach() mở chỉ đọc."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        self.name = shm.name
+        mv = shm.buf if owner else shm.buf.toreadonly()
+        self._buf = mv
+        views = [mv]
+        # close() khi được gọi, khi object bị thu hồi, hoặc lúc thoát tiến trình (worker của pool không gọi close)
+        self._finalizer = weakref.finalize(self, _release, shm, views)
+        magic, version, n, n_str, rec_off, clu_off, str_off, data_off = HEADER.unpack_from(mv, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Segment {self.name} không phải ngân hàng câu hỏi (magic {magic!r}, v{version})")
+        self._n = n
+        self._rec_off = rec_off
+        self._data_off = data_off
+        self._clusters = mv[clu_off:clu_off + 4 * n].cast("i")
+        self._offsets = mv[str_off:str_off + 8 * (n_str + 1)].cast("Q")
+        views += (self._clusters, self._offsets)
+
+    # ---------- tạo / mở ----------
+    @classmethod
+    def publish(cls, questions: Sequence[Dict[str, Any]], clusters: Sequence[Sequence[int]] = (),
+                name: Optional[str] = None) -> "SharedBank":
+        strings: List[bytes] = []
+
+        def add(s) -> int:
+            strings.append(str(s).encode("utf-8"))
+            return len(strings) - 1
+
+        records = []
+        for q in questions:
+            qid = add(q["id"])
+            text = add(q["question"])
+            opt0 = len(strings)
+            for o in q["options"]:
+                add(o)
+            tag0 = len(strings)
+            for t in q.get("tags", ()):
+                add(t)
+            for a in q.get("accept", ()):
+                add(a)
+            ans = q.get("answer")
+            if ans is None:
+                kind, val = ANS_NONE, 0
+            elif isinstance(ans, int) and not isinstance(ans, bool) and 0 <= ans < 2 ** 32:
+                kind, val = ANS_INDEX, ans
+            elif isinstance(ans, str):
+                kind, val = ANS_STRING, add(ans)
+            else:
+                kind, val = ANS_JSON, add(json.dumps(ans, ensure_ascii=False))
+            records.append((qid, text, opt0, tag0, len(q["options"]), len(q.get("tags", ())), len(q.get("accept", ())),
+                            kind, val))
+
+        cluster_of = array("i", [-1]) * len(questions)
+        for k, members in enumerate(clusters):
+            for i in members:
+                cluster_of[i] = k
+        offsets = array("Q", [0])
+        for s in strings:
+            offsets.append(offsets[-1] + len(s))
+
+        n, n_str = len(questions), len(strings)
+        rec_off = _align(HEADER.size)
+        clu_off = _align(rec_off + RECORD.size * n)
+        str_off = _align(clu_off + 4 * n)
+        data_off = str_off + 8 * (n_str + 1)
+        size = max(1, data_off + offsets[-1])
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        buf = shm.buf
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, n, n_str, rec_off, clu_off, str_off, data_off)
+        for i, rec in enumerate(records):
+            RECORD.pack_into(buf, rec_off + i * RECORD.size, *rec)
+        buf[clu_off:clu_off + 4 * n] = cluster_of.tobytes()
+        buf[str_off:data_off] = offsets.tobytes()
+        buf[data_off:data_off + offsets[-1]] = b"".join(strings)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def from_manager(cls, question_manager, name: Optional[str] = None) -> "SharedBank":
+        return cls.publish(question_manager._all, question_manager.clusters, name)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedBank":
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            # Python < 3.13: chỉ mở segment cũng bị resource_tracker đăng ký rồi xoá khi tiến trình thoát
+            # (hoặc huỷ đăng ký của chủ sở hữu nếu dùng chung tracker) -> tạm tắt đăng ký khi mở
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args, **kwargs: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    def __reduce__(self):
+        # gửi sang tiến trình khác chỉ bằng tên segment
+        return SharedBank.attach, (self.name,)
+
+    def close(self):
+        """Nhả các view rồi đóng segment; gọi nhiều lần không sao."""
+        self._finalizer()
+        self._clusters = self._offsets = self._buf = None
+
+    def unlink(self):
+        if self.owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- đọc ----------
+    def __len__(self) -> int:
+        return self._n
+
+    def _str(self, i: int) -> str:
+        off = self._offsets
+        return str(self._buf[self._data_off + off[i]:self._data_off + off[i + 1]], "utf-8")
+
+    def _record(self, i: int):
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return RECORD.unpack_from(self._buf, self._rec_off + i * RECORD.size)
+
+    def question_id(self, i: int) -> str:
+        return self._str(self._record(i)[0])
+
+    def cluster(self, i: int) -> int:
+        return self._clusters[i]
+
+    def question(self, i: int) -> Dict[str, Any]:
+        """Dict giống QuestionManager._all[i] (dựng mới mỗi lần gọi)."""
+        qid, text, opt0, tag0, n_opt, n_tag, n_acc, kind, val = self._record(i)
+        if kind == ANS_INDEX:
+            answer = val
+        elif kind == ANS_STRING:
+            answer = self._str(val)
+        elif kind == ANS_JSON:
+            answer = json.loads(self._str(val))
+        else:
+            answer = None
+        q = {
+            "id": self._str(qid),
+            "question": self._str(text),
+            "options": [self._str(opt0 + k) for k in range(n_opt)],
+            "answer": answer,
+            "tags": tuple(self._str(tag0 + k) for k in range(n_tag)),
+        }
+        if n_opt == 0:  # câu tự luận (normalize_question luôn có "accept")
+            q["accept"] = tuple(self._str(tag0 + n_tag + k) for k in range(n_acc))
+        return q
+
+
+class MatchCursor:
+    """
+    Con trỏ used/spare của một trận trên SharedBank, cùng API phát câu với QuestionManager
+    (get_question / peek_questions / get_spare_question / get_board_size ...).
+    Chỉ giữ mảng chỉ số (array 'I') + tập cụm đã phát; mỗi câu được giải mã khi phát.
+    """
+
+    def __init__(self, bank: SharedBank, event_ratio: float = 0.2, spare_ratio: float = 0.3,
+                 seed: Optional[int] = None):
+        self.bank = bank
+        order = list(range(len(bank)))
+        random.Random(seed).shuffle(order)
+
+        # giống QuestionManager._split_questions: mỗi cụm một đại diện, bản còn lại cuối spare
+        primaries, extras, seen = array("I"), array("I"), set()
+        for i in order:
+            k = bank.cluster(i)
+            if k < 0 or k not in seen:
+                primaries.append(i)
+                if k >= 0:
+                    seen.add(k)
+            else:
+                extras.append(i)
+        used_count = max(0, len(primaries) - int(len(primaries) * spare_ratio))
+        self.used = primaries[:used_count]
+        self.spare = primaries[used_count:] + extras
+        self._used_i = 0
+        self._spare_i = 0
+        self._served_clusters = set()
+        self.num_event_cells = min(used_count, max(0, int(used_count * event_ratio)))
+        self.total_cells = used_count
+        self.board_size = math.ceil(math.sqrt(max(1, used_count)))
+        self._peeked: Dict[int, Dict[str, Any]] = {}  # câu đã xem trước: trả đúng object đó khi phát (prefetcher so 'is')
+
+    def _decode(self, idx: int, keep: bool = False) -> Dict[str, Any]:
+        q = self._peeked.get(idx) if keep else self._peeked.pop(idx, None)
+        if q is None:
+            q = self.bank.question(idx)
+            if keep:
+                self._peeked[idx] = q
+        return q
+
+    def get_board_size(self) -> int:
+        return self.board_size
+
+    def get_total_cells(self) -> int:
+        return self.total_cells
+
+    def get_event_cell_count(self) -> int:
+        return self.num_event_cells
+
+    def _take(self, pool: array, attr: str) -> Optional[Dict[str, Any]]:
+        i = getattr(self, attr)
+        while i < len(pool):
+            idx = pool[i]
+            i += 1
+            k = self.bank.cluster(idx)
+            if k < 0 or k not in self._served_clusters:
+                if k >= 0:
+                    self._served_clusters.add(k)
+                setattr(self, attr, i)
+                return self._decode(idx)
+        setattr(self, attr, i)
+        return None
+
+    def get_question(self) -> Optional[Dict[str, Any]]:
+        q = self._take(self.used, "_used_i")
+        return q if q is not None else self._take(self.spare, "_spare_i")
+
+    def get_spare_question(self) -> Optional[Dict[str, Any]]:
+        return self._take(self.spare, "_spare_i")
+
+    def peek_questions(self, n: int) -> List[Dict[str, Any]]:
+        out, served = [], set(self._served_clusters)
+        for pool, start in ((self.used, self._used_i), (self.spare, self._spare_i)):
+            for i in range(start, len(pool)):
+                if len(out) >= n:
+                    return out
+                k = self.bank.cluster(pool[i])
+                if k < 0 or k not in served:
+                    out.append(self._decode(pool[i], keep=True))
+                    if k >= 0:
+                        served.add(k)
+        return out
+
+    def remaining_used(self) -> int:
+        return max(0, len(self.used) - self._used_i)
+
+    def remaining_spare(self) -> int:
+        return max(0, len(self.spare) - self._spare_i)
+
+    def is_exhausted(self) -> bool:
+        return self.remaining_used() == 0 and self.remaining_spare() == 0
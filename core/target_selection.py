@@ -0,0 +1,138 @@
+# core/target_selection.py
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Trạng thái mỗi ô trong mask (1 byte / ô)
+NONE, CANDIDATE, SELECTED = 0, 1, 2
+
+
+class TargetSelection:
+    """
+    Chế độ chọn mục tiêu cho event (CHANGE_OWNER, REMOVE_ONLY...):
+    - candidates: các ô hợp lệ, đã xếp theo giá trị chiến lược giảm dần (main.get_targetable_cells).
+    - Membership bằng bytearray theo chỉ số r*size+c: click / vẽ kiểm tra O(1), không quét list.
+    - need: số ô cần chọn (ctx.num_targets_to_select); need == 1 -> chọn ô khác thì thay ô cũ.
+    - cursor: điều hướng bàn phím theo thứ tự xếp hạng (Tab / Shift+Tab), Space chọn / bỏ ô ở cursor.
+    - version tăng mỗi lần chọn / bỏ / dời cursor (dùng cho base_key của ModalLayer).
+    Không phụ thuộc pygame.
+    """
+
+    def __init__(self, board, candidates: Sequence, need: int = 1):
+        self.board = board
+        self.size = board.size
+        self.ranked = list(candidates)
+        self.need = max(1, min(int(need), len(self.ranked))) if self.ranked else 0
+        self._state = bytearray(self.size * self.size)
+        for cell in self.ranked:
+            self._state[cell.row * self.size + cell.col] = CANDIDATE
+        self._rank = {(c.row, c.col): i for i, c in enumerate(self.ranked)}
+        self._selected: List = []
+        self.cursor = 0 if self.ranked else -1
+        self.version = 0
+
+    # ---------- truy vấn ----------
+    def _idx(self, cell) -> int:
+        return cell.row * self.size + cell.col
+
+    def contains(self, cell) -> bool:
+        """Ô có phải mục tiêu hợp lệ (đã chọn hay chưa)."""
+        return cell is not None and self._state[self._idx(cell)] != NONE
+
+    def is_selected(self, cell) -> bool:
+        return cell is not None and self._state[self._idx(cell)] == SELECTED
+
+    @property
+    def selected(self) -> List:
+        """Các ô đã chọn, theo thứ tự chọn."""
+        return list(self._selected)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.need > 0 and len(self._selected) >= self.need
+
+    @property
+    def current(self):
+        """Ô đang ở cursor (None nếu không có ứng viên)."""
+        return self.ranked[self.cursor] if self.cursor >= 0 else None
+
+    def rank_of(self, cell) -> Optional[int]:
+        """Hạng (0 = giá trị cao nhất) của ô trong danh sách ứng viên."""
+        return self._rank.get((cell.row, cell.col))
+
+    def visible(self, r0: int, r1: int, c0: int, c1: int) -> Iterator[Tuple[int, int, int]]:
+        """(row, col, state) của các ứng viên trong vùng [r0, r1) x [c0, c1); duyệt phía nhỏ hơn (vùng hay danh sách)."""
+        state, n = self._state, self.size
+        if (r1 - r0) * (c1 - c0) < len(self.ranked):
+            for r in range(r0, r1):
+                base = r * n
+                row = state[base + c0:base + c1]
+                if not row.strip(b"\0"):
+                    continue
+                for c in range(c0, c1):
+                    s = state[base + c]
+                    if s:
+                        yield r, c, s
+        else:
+            for cell in self.ranked:
+                r, c = cell.row, cell.col
+                if r0 <= r < r1 and c0 <= c < c1:
+                    yield r, c, state[r * n + c]
+
+    # ---------- thao tác ----------
+    def toggle(self, cell) -> bool:
+        """Chọn / bỏ chọn ô; trả về False nếu ô không hợp lệ hoặc đã đủ số ô (need > 1)."""
+        if not self.contains(cell):
+            return False
+        i = self._idx(cell)
+        if self._state[i] == SELECTED:
+            self._state[i] = CANDIDATE
+            self._selected.remove(cell)
+        else:
+            if len(self._selected) >= self.need:
+                if self.need != 1:
+                    return False
+                self._unselect(self._selected[0])
+            self._state[i] = SELECTED
+            self._selected.append(cell)
+        self.version += 1
+        return True
+
+    def _unselect(self, cell):
+        self._state[self._idx(cell)] = CANDIDATE
+        self._selected.remove(cell)
+
+    def pop(self):
+        """Bỏ ô chọn gần nhất (huỷ xác nhận); trả về ô đó hoặc None."""
+        if not self._selected:
+            return None
+        cell = self._selected[-1]
+        self._unselect(cell)
+        self.version += 1
+        return cell
+
+    def clear(self):
+        for cell in self._selected:
+            self._state[self._idx(cell)] = CANDIDATE
+        self._selected.clear()
+        self.version += 1
+
+    def move(self, delta: int = 1):
+        """Dời cursor delta bậc theo thứ tự xếp hạng (vòng quanh); trả về ô mới."""
+        if not self.ranked:
+            return None
+        self.cursor = (self.cursor + delta) % len(self.ranked)
+        self.version += 1
+        return self.current
+
+    def point_at(self, cell) -> bool:
+        """Đặt cursor vào ô (vd. ô vừa click)."""
+        rank = self.rank_of(cell) if cell is not None else None
+        if rank is None:
+            return False
+        if rank != self.cursor:
+            self.cursor = rank
+            self.version += 1
+        return True
+
+    def toggle_current(self) -> bool:
+        cell = self.current
+        return cell is not None and self.toggle(cell)
@@ -0,0 +1,189 @@
+# core/threat_tracker.py
+from typing import Dict, List, Optional, Tuple
+from core.game_manager import DIRECTIONS
+
+BLOCK = "#"  # ô bị khoá / ô trống được bảo vệ: không ai chiếm được
+
+
+class ThreatTracker:
+    """
+    Chấm điểm nước đi + phát hiện đe doạ cho chế độ luyện tập, cập nhật TĂNG DẦN.
+
+    - Bàn được chia thành các "cửa sổ" win_length ô liên tiếp theo 4 hướng.
+    - Cửa sổ "thuần" của một đội (chỉ gồm ô của đội đó + ô trống) có k quân
+      cộng WEIGHTS[k] vào điểm của mỗi ô trống trong cửa sổ.
+    - Khi một ô đổi (owner / blocked / protected), chỉ các cửa sổ đi qua ô đó
+      (tối đa 4 * win_length) được chấm lại: O(win_length²) mỗi thay đổi.
+    - Đe doạ: cửa sổ thuần có k = win_length - 1 (thắng ngay) hoặc win_length - 2 (mở).
+    """
+
+    def __init__(self, board, win_length: int = 5):
+        self.board = board
+        self.n = board.size
+        self.L = win_length
+        self.WEIGHTS = [0] + [10 ** k for k in range(1, win_length + 1)]
+
+        n, L = self.n, self.L
+        self._occ: List[Optional[str]] = [None] * (n * n)
+        self._win_cells: List[Tuple[int, ...]] = []
+        self._cell_windows: List[List[int]] = [[] for _ in range(n * n)]
+        for dr, dc in DIRECTIONS:
+            for r in range(n):
+                for c in range(n):
+                    er, ec = r + dr * (L - 1), c + dc * (L - 1)
+                    if not (0 <= er < n and 0 <= ec < n):
+                        continue
+                    w = len(self._win_cells)
+                    idxs = tuple((r + dr * i) * n + (c + dc * i) for i in range(L))
+                    self._win_cells.append(idxs)
+                    for idx in idxs:
+                        self._cell_windows[idx].append(w)
+
+        self._win_state: List[Optional[Tuple[str, int]]] = [None] * len(self._win_cells)
+        self._scores: Dict[str, Dict[int, int]] = {}           # symbol -> idx -> điểm
+        self._buckets: Dict[str, Dict[int, set]] = {}          # symbol -> điểm -> {idx}
+        self._threat_windows: Dict[str, Dict[int, int]] = {}   # symbol -> window -> k (k >= L-2)
+        self._cache: Dict[tuple, object] = {}
+        self.version = 0
+
+        # Quét toàn bàn đúng một lần lúc khởi tạo
+        for row in board.cells:
+            for cell in row:
+                self._occ[cell.row * n + cell.col] = self._occupant(cell)
+        for w in range(len(self._win_cells)):
+            self._win_state[w] = self._compute_state(w)
+            self._add(w)
+        board.add_listener(self._on_cell_change)
+
+    # ---------- Cập nhật tăng dần ----------
+    @staticmethod
+    def _occupant(cell):
+        if cell.owner:
+            return cell.owner
+        if cell.blocked or cell.protected:
+            return BLOCK
+        return None
+
+    def _on_cell_change(self, cell, attr, old, new):
+        if attr not in ("owner", "blocked", "protected"):
+            return
+        idx = cell.row * self.n + cell.col
+        occ = self._occupant(cell)
+        if occ == self._occ[idx]:
+            return
+        windows = self._cell_windows[idx]
+        for w in windows:
+            self._remove(w)
+        self._occ[idx] = occ
+        for w in windows:
+            self._win_state[w] = self._compute_state(w)
+            self._add(w)
+        self.version += 1
+        self._cache.clear()
+
+    def _compute_state(self, w):
+        sym, k = None, 0
+        for idx in self._win_cells[w]:
+            o = self._occ[idx]
+            if o is None:
+                continue
+            if o == BLOCK or (sym is not None and o != sym):
+                return None
+            sym, k = o, k + 1
+        return (sym, k) if sym is not None else None
+
+    def _add(self, w):
+        self._contribute(w, +1)
+
+    def _remove(self, w):
+        self._contribute(w, -1)
+
+    def _contribute(self, w, sign):
+        state = self._win_state[w]
+        if state is None:
+            return
+        sym, k = state
+        if k >= self.L - 2:
+            threats = self._threat_windows.setdefault(sym, {})
+            if sign > 0:
+                threats[w] = k
+            else:
+                threats.pop(w, None)
+        delta = sign * self.WEIGHTS[k]
+        if not delta:
+            return
+        scores = self._scores.setdefault(sym, {})
+        buckets = self._buckets.setdefault(sym, {})
+        for idx in self._win_cells[w]:
+            if self._occ[idx] is not None:
+                continue
+            old = scores.get(idx, 0)
+            new = old + delta
+            if old:
+                bucket = buckets[old]
+                bucket.discard(idx)
+                if not bucket:
+                    del buckets[old]
+            if new:
+                scores[idx] = new
+                buckets.setdefault(new, set()).add(idx)
+            else:
+                scores.pop(idx, None)
+
+    # ---------- Truy vấn (có cache tới lần thay đổi kế tiếp) ----------
+    def _cell(self, idx):
+        return self.board.cells[idx // self.n][idx % self.n]
+
+    def score(self, cell, symbol: str) -> int:
+        """Điểm của một ô trống đối với đội symbol."""
+        return self._scores.get(symbol, {}).get(cell.row * self.n + cell.col, 0)
+
+    def best_cells(self, symbol: str, k: int = 3):
+        """k ô trống tốt nhất cho đội symbol: list[(cell, score)]."""
+        key = ("best", symbol, k)
+        if key not in self._cache:
+            out = []
+            buckets = self._buckets.get(symbol, {})
+            for s in sorted(buckets, reverse=True):
+                for idx in sorted(buckets[s]):
+                    out.append((self._cell(idx), s))
+                    if len(out) >= k:
+                        break
+                if len(out) >= k:
+                    break
+            self._cache[key] = out
+        return self._cache[key]
+
+    def threats(self, symbol: str):
+        """
+        Đe doạ của đội symbol:
+        - "win_now": các ô trống hoàn thành chuỗi win_length ngay
+        - "open":    các ô trống trong cửa sổ còn thiếu 2 quân
+        """
+        key = ("threats", symbol)
+        if key not in self._cache:
+            win_now, open_ = set(), set()
+            for w, k in self._threat_windows.get(symbol, {}).items():
+                target = win_now if k == self.L - 1 else open_
+                for idx in self._win_cells[w]:
+                    if self._occ[idx] is None:
+                        target.add(idx)
+            open_ -= win_now
+            self._cache[key] = {
+                "win_now": [self._cell(i) for i in sorted(win_now)],
+                "open": [self._cell(i) for i in sorted(open_)],
+            }
+        return self._cache[key]
+
+    def cell_value(self, cell, symbol: Optional[str] = None) -> int:
+        """
+        Giá trị chiến lược của một ô ĐÃ có chủ đối với chủ của nó (tổng trọng số các cửa sổ thuần đi qua ô).
+        Dùng để xếp hạng mục tiêu cho CHANGE_OWNER / REMOVE_ONLY.
+        """
+        symbol = symbol or cell.owner
+        total = 0
+        for w in self._cell_windows[cell.row * self.n + cell.col]:
+            state = self._win_state[w]
+            if state is not None and state[0] == symbol:
+                total += self.WEIGHTS[state[1]]
+        return total
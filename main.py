@@ -1,67 +1,180 @@
 # main.py
-import pygame, os, random
+import time
+STARTUP_T0 = time.perf_counter()  # mốc đo thời gian khởi động (trước mọi import nặng)
+
+import json, os, random, sys
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from utils.config import (
+    DATA_PATH, CELL_SIZE, MARGIN, PANEL_WIDTH, WIN_LENGTH, PRACTICE_MODE, MAX_BOARD_VIEW, STARTUP_LOG_PATH,
+    MATCH_LOG_DIR, QUESTION_TAG_MIX, BANK_HOT_RELOAD, EVENT_HOVER_PREVIEW, TEXT_ANSWER_JUDGE_MS,
+)
+from ui.splash_screen import SplashScreen, SPLASH_SIZE
+
+def startup_ms():
+    return (time.perf_counter() - STARTUP_T0) * 1000.0
+
+# ---------------- Khởi động theo giai đoạn ----------------
+# 1) Mở cửa sổ + vẽ splash ngay: frame đầu tiên không phải chờ ngân hàng câu hỏi / ảnh
+pygame.init()
+screen = pygame.display.set_mode(SPLASH_SIZE)
+pygame.display.set_caption("CỜ GIÁO - Quiz Cờ Ca Rô")
+splash = SplashScreen()
+splash.show(screen, 0.0, "Đang khởi động...")
+startup_stats = {"first_frame_ms": startup_ms()}
+
+# 2) Đọc ngân hàng câu hỏi ở thread nền (thuần Python, không đụng pygame)
 from core.question_manager import QuestionManager
+from core.answer_judge import AnswerJudge
+from core.bank_reload import BankReloader
+from core.match_record import MatchRecorder, MatchArchive, MATCH_EXT
+from core.heatmap import HeatmapStats
+# Seed của trận (ghi vào header lịch sử trận): COCARO_SEED=... để chơi lại đúng bàn cờ
+MATCH_SEED = int(os.environ.get("COCARO_SEED") or random.randrange(2 ** 32))
+random.seed(MATCH_SEED)
+_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bank-loader")
+_bank_future = _loader.submit(QuestionManager, DATA_PATH, seed=MATCH_SEED, tag_mix=QUESTION_TAG_MIX)
+
+# 3) Trong lúc đó main thread nạp module UI, font và ảnh; mỗi giai đoạn cập nhật splash
+def startup_stage(progress, label):
+    if not splash.pump():
+        pygame.quit()
+        sys.exit(0)
+    splash.show(screen, progress, label)
+
+startup_stage(0.1, "Nạp mô-đun...")
 from core.board import Board
-from utils.config import DATA_PATH, CELL_SIZE, MARGIN, PANEL_WIDTH, WIN_LENGTH
+from utils.camera import Camera
 from utils.colors import BACKGROUND_LIGHT, TEAM_COLORS, TEXT_PRIMARY, SURFACE
 from utils.helpers import get_font, color
+from utils.glyph_atlas import get_atlas
 from ui.popup_question import QuestionPopup
+from ui.question_prefetcher import QuestionPrefetcher
 from ui.popup_confirmation import ConfirmationPopup
 from core.player import Player
 from core.game_manager import GameManager
+from core.history import History
+from core.threat_tracker import ThreatTracker
+from core.target_selection import TargetSelection
 from ui.sidebar_panel import SidebarPanel
-from ui.popup_event_intro import EventIntroPopup
-from core.event_data import EVENT_INFO
-from core.event_mapping import EVENT_TYPE_MAP, TYPE_TO_IDS
+from ui.event_cache import EventCellCache
+from ui.modal_layer import ModalLayer
+from ui.heatmap_overlay import HeatmapOverlay
+from utils.metrics import REGISTRY as METRICS
+from core.event_mapping import EVENT_TYPE_MAP
 from core.event_engine import (
-    plan as plan_event,
     apply_immediate,
     resolver_team_symbol,
     resolve_answer,
     reroll_allowed,
     consume_reroll,
+    release as release_event_ctx,
 )
 
+startup_stage(0.3, "Nạp font...")
+for _style, _weight in (("body", "medium"), ("body", "semibold"), ("label", "bold"), ("heading2", "bold"),
+                        ("caption", "semibold"), ("caption", "bold")):
+    get_font(_style, _weight)
+
+_event_icons = {}  # event_id -> Surface | None; nạp một lần thay vì đọc file mỗi lần mở intro
+
 def load_event_icon(event_id: str):
+    if event_id in _event_icons:
+        return _event_icons[event_id]
+    icon = None
     path = os.path.join("assets", "images", "events", f"{event_id}.png")
     if os.path.exists(path):
-        try: return pygame.image.load(path).convert_alpha()
+        try: icon = pygame.image.load(path).convert_alpha()
         except Exception as e: print(f"[WARN] Failed to load icon {event_id}.png: {e}")
     else: print(f"[WARN] Icon not found: {path}")
-    return None
+    _event_icons[event_id] = icon
+    return icon
 
-pygame.init()
-question_manager = QuestionManager(DATA_PATH)
+_ids = list(EVENT_TYPE_MAP)
+for _i, _eid in enumerate(_ids):
+    if _i % 4 == 0:
+        startup_stage(0.4 + 0.3 * _i / max(1, len(_ids)), "Nạp hình ảnh...")
+    load_event_icon(_eid)
+
+# 4) Chờ ngân hàng câu hỏi (vẫn vẽ splash + xử lý sự kiện để cửa sổ không treo)
+while not _bank_future.done():
+    startup_stage(0.75, "Đọc ngân hàng câu hỏi...")
+    time.sleep(1 / 60)
+question_manager = _bank_future.result()
+_loader.shutdown(wait=False)
+startup_stats["bank_ready_ms"] = startup_ms()
 BOARD_SIZE = question_manager.get_board_size()
 
+# 5) Dựng bàn cờ + cửa sổ kích thước thật
+startup_stage(0.9, "Dựng bàn cờ...")
 # --- NEW: Thêm Gutter vào kích thước cửa sổ ---
 GUTTER_SIZE = 30
-WINDOW_WIDTH  = BOARD_SIZE * (CELL_SIZE + MARGIN) + MARGIN + PANEL_WIDTH + GUTTER_SIZE
-WINDOW_HEIGHT = BOARD_SIZE * (CELL_SIZE + MARGIN) + MARGIN + GUTTER_SIZE
+# Bàn lớn không còn đòi cửa sổ khổng lồ: vùng bàn bị chặn ở MAX_BOARD_VIEW, phần còn lại xem qua camera
+BOARD_WORLD = BOARD_SIZE * (CELL_SIZE + MARGIN)
+BOARD_VIEW = min(BOARD_WORLD, MAX_BOARD_VIEW)
+WINDOW_WIDTH  = BOARD_VIEW + MARGIN + PANEL_WIDTH + GUTTER_SIZE
+WINDOW_HEIGHT = BOARD_VIEW + MARGIN + GUTTER_SIZE
 
 screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("CỜ GIÁO - Quiz Cờ Ca Rô")
 clock = pygame.time.Clock()
+prefetcher = QuestionPrefetcher(question_manager, screen.get_size())
+answer_judge = AnswerJudge(question_manager, timeout_ms=TEXT_ANSWER_JUDGE_MS)  # chấm câu tự luận ngoài main thread
+prefetcher.refill()
+# Sửa file ngân hàng trong lúc chơi -> nạp lại ở nền, tráo giữa hai frame (không mất trận)
+bank_reloader = BankReloader(question_manager) if BANK_HOT_RELOAD else None
 board = Board(BOARD_SIZE, question_manager.get_event_cell_count())
+board.piece_icons  # nạp icon quân cờ ngay, tránh khựng ở lượt đi đầu tiên
+camera = Camera((MARGIN + GUTTER_SIZE, MARGIN + GUTTER_SIZE, BOARD_VIEW, BOARD_VIEW), BOARD_WORLD, BOARD_WORLD)
+camera.fit()
+board.camera = camera
+event_cache = EventCellCache(board, screen.get_size(), load_event_icon)
+panning = False
 players = [
     Player("Đội A", "A", TEAM_COLORS["A"]),
     Player("Đội B", "B", TEAM_COLORS["B"]),
     Player("Đội C", "C", TEAM_COLORS["C"]), # <-- Thêm dòng này
 ]
+MATCH_ID = time.strftime("%Y%m%d_%H%M%S")
 gm = GameManager(board, players, win_length=WIN_LENGTH)
+gm.recorder = MatchRecorder(
+    os.path.join(MATCH_LOG_DIR, f"{MATCH_ID}{MATCH_EXT}"), board, WIN_LENGTH, MATCH_SEED,
+    [p.symbol for p in players], EVENT_TYPE_MAP,
+)
+# Heatmap (phím H): đếm trực tiếp trận này; các trận cũ chỉ được đọc khi bật lần đầu
+heatmap = HeatmapStats(BOARD_SIZE)
+heatmap.attach(board)
+heatmap_overlay = HeatmapOverlay(heatmap)
+heatmap_archive_loaded = False
 gm.board = board
+history = History(board, gm)
+threat_tracker = ThreatTracker(board, win_length=WIN_LENGTH)
 sidebar = SidebarPanel(
-    BOARD_SIZE * (CELL_SIZE + MARGIN) + MARGIN + GUTTER_SIZE + 20, 10, PANEL_WIDTH - 40,
+    BOARD_VIEW + MARGIN + GUTTER_SIZE + 20, 10, PANEL_WIDTH - 40,
+    log_path=os.path.join(MATCH_LOG_DIR, f"{MATCH_ID}_sidebar.log"),
 )
 
+def record_startup(stats):
+    """In + ghi thêm một dòng JSON vào STARTUP_LOG_PATH để theo dõi thời gian khởi động qua các lần chạy."""
+    print("[STARTUP] " + "  ".join(f"{k}={v:.1f}" for k, v in stats.items()))
+    try:
+        d = os.path.dirname(STARTUP_LOG_PATH)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(STARTUP_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(stats, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), board_size=BOARD_SIZE)) + "\n")
+    except OSError as e:
+        print(f"[WARN] Cannot write startup log: {e}")
+
 GAME_STATE = "PLAYING"
 popup_intro, popup_question, popup_confirm = None, None, None
-selected_cell, target_cells_cache = None, []
+modal_layer = ModalLayer()
+selected_cell = None
 BASE_SECONDS = 15
 current_evt_ctx = None
 
 # --- NEW: Biến cho tooltip và font ---
 hovered_cell_label = None
+hovered_preview = None  # thẻ tên sự kiện khi hover ô sự kiện (EVENT_HOVER_PREVIEW)
 tooltip_font = get_font("caption", "bold")
 
 def get_targetable_cells(target_type):
@@ -72,8 +185,41 @@ def get_targetable_cells(target_type):
             for cell in row:
                 if cell.owner and cell.owner != current_symbol and not getattr(cell, "protected", False):
                     targets.append(cell)
+        # Ô có giá trị chiến lược cao nhất với đối thủ đứng trước
+        targets.sort(key=lambda c: threat_tracker.cell_value(c), reverse=True)
     return targets
 
+def start_target_selection():
+    """Vào TARGET_SELECTION cho current_evt_ctx; không có ô hợp lệ -> bỏ qua bước chọn."""
+    global GAME_STATE
+    sel = TargetSelection(board, get_targetable_cells(current_evt_ctx.target_type), current_evt_ctx.num_targets_to_select)
+    if not sel.ranked:
+        sidebar.add_log("Không có ô mục tiêu hợp lệ.")
+        if current_evt_ctx.event_id == "REMOVE_ONLY": reset_turn_state()
+        else: open_question_for_ctx()
+        return
+    board.target_selection, GAME_STATE = sel, "TARGET_SELECTION"
+    reveal_cell(sel.current)
+    sidebar.add_log(f"Chọn {sel.need} ô mục tiêu (Tab: ô giá trị cao tiếp theo, Space: chọn, Enter: xác nhận).")
+
+def reveal_cell(cell):
+    step = CELL_SIZE + MARGIN
+    camera.reveal(cell.col * step, cell.row * step, cell.col * step + CELL_SIZE, cell.row * step + CELL_SIZE, margin=step)
+
+def confirm_targets():
+    global popup_confirm, GAME_STATE
+    labels = ", ".join(get_cell_label(c) for c in board.target_selection.selected)
+    popup_confirm = ConfirmationPopup(message=f"Áp dụng lên ô {labels}?")
+    GAME_STATE = "AWAITING_CONFIRMATION"
+
+def make_question_popup(q, team_label, seconds, cell_label, event_context=None):
+    popup = QuestionPopup(
+        q, team_label=team_label, seconds=seconds, event_context=event_context,
+        cell_label=cell_label, prepared=prefetcher.take(q), judge=answer_judge,
+    )
+    prefetcher.refill()
+    return popup
+
 def open_question_for_ctx():
     global popup_question, selected_cell
     if not current_evt_ctx: return
@@ -81,26 +227,71 @@ def open_question_for_ctx():
     seconds = BASE_SECONDS + getattr(current_evt_ctx, "time_bonus", 0)
     q = question_manager.get_question()
     if q:
-        popup_question = QuestionPopup(
+        popup_question = make_question_popup(
             q, team_label=team_symbol, seconds=seconds, event_context=current_evt_ctx, cell_label=get_cell_label(selected_cell)
         )
 
 def reset_turn_state():
-    global current_evt_ctx, selected_cell, target_cell_cache, GAME_STATE
-    current_evt_ctx, selected_cell, target_cell_cache = None, None, None
-    board.highlight_cells = []
+    global current_evt_ctx, selected_cell, GAME_STATE
+    release_event_ctx(current_evt_ctx)
+    history.commit()
+    current_evt_ctx, selected_cell = None, None
+    board.target_selection = None
     GAME_STATE = "PLAYING"
 
 def get_cell_label(cell):
     if not cell: return ""
     return f"{chr(ord('A') + cell.col)}{cell.row + 1}"
 
+def draw_base(surface):
+    surface.fill(color(BACKGROUND_LIGHT))
+    board.draw(surface)
+    heatmap_overlay.draw(surface, board)
+    sidebar.draw(surface, gm, gm.win_length, hints=threat_tracker if PRACTICE_MODE else None)
+
+# COCARO_EXIT_AFTER_STARTUP=1: thoát ngay sau frame đầu của màn chơi (benchmarks/startup.py dùng)
+exit_after_startup = bool(os.environ.get("COCARO_EXIT_AFTER_STARTUP"))
 running = True
 while running:
     events = pygame.event.get()
     mouse_pos = pygame.mouse.get_pos()
     for event in events:
         if event.type == pygame.QUIT: running = False
+    # Thứ tự modal (dưới -> trên); chỉ modal trên cùng nhận sự kiện trong frame này
+    modal_layer.set_active([popup_question, popup_intro, popup_confirm])
+
+    reload_msg = bank_reloader.poll() if bank_reloader else None
+    if reload_msg:
+        sidebar.add_log(reload_msg)
+        prefetcher.refill()
+
+    # --- Zoom (lăn chuột) / pan (kéo chuột phải/giữa, phím mũi tên) khi không có popup ---
+    if popup_intro is None and popup_question is None and popup_confirm is None:
+        for event in events:
+            if sidebar.handle_event(event, mouse_pos):
+                continue
+            if event.type == pygame.MOUSEWHEEL and camera.contains(*mouse_pos):
+                camera.zoom_at(1.15 ** event.y, mouse_pos)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (2, 3):
+                panning = True
+            elif event.type == pygame.MOUSEBUTTONUP and event.button in (2, 3):
+                panning = False
+            elif event.type == pygame.MOUSEMOTION and panning:
+                camera.pan(*event.rel)
+            elif event.type == pygame.KEYDOWN and not event.mod & pygame.KMOD_CTRL:
+                if event.key == pygame.K_h:
+                    if not heatmap_archive_loaded:
+                        heatmap.load_archive(MatchArchive(MATCH_LOG_DIR, exclude=[gm.recorder.path]))
+                        heatmap_archive_loaded = True
+                    mode_label = heatmap_overlay.cycle()
+                    sidebar.add_log(f"Heatmap: {mode_label}" if mode_label else "Heatmap: tắt")
+                elif event.key == pygame.K_LEFT: camera.pan(80, 0)
+                elif event.key == pygame.K_RIGHT: camera.pan(-80, 0)
+                elif event.key == pygame.K_UP: camera.pan(0, 80)
+                elif event.key == pygame.K_DOWN: camera.pan(0, -80)
+                elif event.key in (pygame.K_0, pygame.K_HOME): camera.fit()
+    else:
+        panning = False
 
     # --- NEW: Xử lý hover để hiển thị tooltip ---
     # Chỉ hiện tooltip khi không có popup nào đang che
@@ -108,61 +299,82 @@ while running:
         hovered_cell = board.get_cell_at(mouse_pos)
         if hovered_cell:
             hovered_cell_label = get_cell_label(hovered_cell)
+            hovered_preview = event_cache.preview(hovered_cell) if EVENT_HOVER_PREVIEW and hovered_cell.owner is None else None
         else:
-            hovered_cell_label = None
+            hovered_cell_label, hovered_preview = None, None
+        event_cache.warm(budget_ms=1.0)  # frame rảnh: dựng dần layout intro của các event trên bàn
     else:
-        hovered_cell_label = None
+        hovered_cell_label, hovered_preview = None, None
 
     # --- Xử lý trạng thái game (giữ nguyên) ---
     if GAME_STATE == "PLAYING":
         if popup_intro is None and popup_question is None and current_evt_ctx is None:
             for event in events:
+                # Ctrl+Z: hoàn tác lượt; Ctrl+Y / Ctrl+Shift+Z: làm lại
+                if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL:
+                    label = None
+                    if event.key == pygame.K_z and not event.mod & pygame.KMOD_SHIFT:
+                        label = history.undo()
+                        if label: sidebar.add_log(f"Hoàn tác: {label}")
+                    elif event.key in (pygame.K_y, pygame.K_z):
+                        label = history.redo()
+                        if label: sidebar.add_log(f"Làm lại: {label}")
+                    continue
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     cell = board.get_cell_at(mouse_pos)
                     if not cell or cell.owner is not None: continue
                     selected_cell = cell
+                    history.begin(f"{gm.current_player.name} chọn ô {get_cell_label(cell)}")
                     if cell.event_type:
-                        base_type, event_id = str(cell.event_type).lower(), getattr(cell, "event_id", None)
-                        if not event_id:
-                            candidates = TYPE_TO_IDS.get(base_type, [])
-                            event_id = random.choice(candidates) if candidates else random.choice(list(EVENT_TYPE_MAP.keys()))
-                            setattr(cell, "event_id", event_id)
-                        info, icon = EVENT_INFO.get(event_id, {}), load_event_icon(event_id)
-                        sidebar.add_log(f"Sự kiện tại {get_cell_label(cell)}: {info.get('title', event_id)}")
-                        popup_intro = EventIntroPopup(
-                            event_id=event_id, title=info.get("title", "Sự kiện"), desc=info.get("desc", ""), 
-                            icon_surface=icon, event_type=EVENT_TYPE_MAP.get(event_id, base_type),
-                        )
+                        # id, nội dung, icon, layout intro đã phân giải sẵn (hover/warm) -> popup mở ngay
+                        bundle, popup_intro = event_cache.open_intro(cell)
+                        sidebar.add_log(f"Sự kiện tại {get_cell_label(cell)}: {bundle.assets.title}")
                     else:
                         q = question_manager.get_question()
-                        if q: popup_question = QuestionPopup(q, team_label=gm.current_player.symbol, seconds=BASE_SECONDS, cell_label=get_cell_label(cell))
-        if popup_intro:
-            for event in events: popup_intro.handle_event(event)
-        if popup_question:
+                        if q: popup_question = make_question_popup(q, team_label=gm.current_player.symbol, seconds=BASE_SECONDS, cell_label=get_cell_label(cell))
+        if modal_layer.is_top(popup_intro):
+            modal_layer.route(events)
+        if modal_layer.is_top(popup_question):
             for event in events:
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_R and current_evt_ctx and reroll_allowed(current_evt_ctx):
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_r and not popup_question.accepts_text \
+                        and current_evt_ctx and reroll_allowed(current_evt_ctx):
                     consume_reroll(current_evt_ctx)
                     sidebar.add_log(f"{gm.current_player.name} đã đổi câu hỏi!")
+                    popup_question.stop_text_input()  # đổi câu khi đang chấm câu tự luận
                     popup_question, q = None, question_manager.get_question()
                     if q: open_question_for_ctx()
+                    break  # popup mới nhận sự kiện từ frame sau
                 else: popup_question.handle_event(event)
     elif GAME_STATE == "TARGET_SELECTION":
+        sel = board.target_selection
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 cell = board.get_cell_at(mouse_pos)
-                if cell and cell in board.highlight_cells:
-                    target_cell_cache = cell
-                    popup_confirm = ConfirmationPopup(message=f"Áp dụng lên ô {get_cell_label(cell)}?")
-                    GAME_STATE = "AWAITING_CONFIRMATION"
+                if sel.contains(cell) and sel.point_at(cell) and sel.toggle(cell) and sel.is_complete:
+                    confirm_targets()
+                    break
+            elif event.type == pygame.KEYDOWN:
+                # Tab / Shift+Tab: ứng viên kế tiếp / trước theo giá trị; Space: chọn ô ở cursor; Enter: xác nhận
+                if event.key == pygame.K_TAB:
+                    reveal_cell(sel.move(-1 if event.mod & pygame.KMOD_SHIFT else 1))
+                elif event.key == pygame.K_SPACE:
+                    if sel.toggle_current() and sel.is_complete:
+                        confirm_targets()
+                        break
+                elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                    if not sel.selected: sel.toggle_current()
+                    if sel.is_complete:
+                        confirm_targets()
+                        break
     elif GAME_STATE == "AWAITING_CONFIRMATION":
         if popup_confirm:
-            for event in events: popup_confirm.handle_event(event)
+            if modal_layer.is_top(popup_confirm): modal_layer.route(events)
             if popup_confirm.result is not None:
                 if popup_confirm.result == "confirm":
-                    current_evt_ctx.selected_target_cells = target_cells_cache
+                    current_evt_ctx.selected_target_cells = board.target_selection.selected
                     
                     if current_evt_ctx.event_id in ["REMOVE_ONLY", "NUKE_AREA"]:
-                        log_msg = f"{gm.current_player.name} xóa {len(target_cells_cache)} ô."
+                        log_msg = f"{gm.current_player.name} xóa {len(current_evt_ctx.selected_target_cells)} ô."
                         sidebar.add_log(log_msg)
                         apply_immediate(current_evt_ctx, gm, selected_cell, board)
                         reset_turn_state()
@@ -172,21 +384,22 @@ while running:
                         GAME_STATE = "PLAYING"
                 
                 elif popup_confirm.result == "cancel":
-                    target_cells_cache = []
+                    board.target_selection.pop()  # bỏ ô chọn cuối, các ô trước (nhiều mục tiêu) giữ nguyên
                     GAME_STATE = "TARGET_SELECTION"
                 
                 popup_confirm = None
 
     if popup_intro and popup_intro.is_finished():
-        eid, base_type = getattr(selected_cell, "event_id", None), str(selected_cell.event_type).lower() if selected_cell.event_type else "bonus"
-        current_evt_ctx = plan_event(eid, EVENT_TYPE_MAP.get(eid, base_type), gm, selected_cell)
+        current_evt_ctx = event_cache.plan(selected_cell, gm)
+        gm.recorder.event(selected_cell, current_evt_ctx.event_id, gm.current_player.symbol)
+        heatmap.record_event(selected_cell)
         if current_evt_ctx.requires_target_selection and current_evt_ctx.event_id == "REMOVE_ONLY":
-            GAME_STATE, board.highlight_cells = "TARGET_SELECTION", get_targetable_cells(current_evt_ctx.target_type)
+            start_target_selection()
         else:
             imm = apply_immediate(current_evt_ctx, gm, selected_cell, board)
             if imm["open_question"]:
                 if current_evt_ctx.requires_target_selection:
-                    GAME_STATE, board.highlight_cells = "TARGET_SELECTION", get_targetable_cells(current_evt_ctx.target_type)
+                    start_target_selection()
                 else: open_question_for_ctx()
             else:
                 if current_evt_ctx.event_id == "LOSE_TURN": sidebar.add_log(f"{gm.current_player.name} bị mất lượt!")
@@ -237,24 +450,44 @@ while running:
             reset_turn_state()
             popup_question = None
 
-    screen.fill(color(BACKGROUND_LIGHT))
-    board.draw(screen)
-    sidebar.draw(screen, gm, gm.win_length)
-    if popup_question: popup_question.draw(screen)
-    if popup_intro: popup_intro.draw(screen)
-    if popup_confirm: popup_confirm.draw(screen)
+    # Khi có modal, nền (bàn + sidebar) chỉ vẽ lại nếu base_key đổi; các frame khác blit ảnh chụp
+    modal_layer.set_active([popup_question, popup_intro, popup_confirm])
+    base_key = (
+        board.version, camera.zoom, camera.x, camera.y,
+        board.target_selection.version if board.target_selection else -1,
+        sidebar.version, gm.current_idx, gm.turn_dir, gm.skip_symbol, heatmap_overlay.key,
+    )
+    modal_layer.draw(screen, draw_base, base_key)
 
     # --- NEW: Vẽ tooltip nếu có ---
     if hovered_cell_label:
-        text_surf = tooltip_font.render(hovered_cell_label, True, color(SURFACE))
-        tooltip_rect = text_surf.get_rect(center=(mouse_pos[0], mouse_pos[1] - 25))
+        tip_atlas = get_atlas(tooltip_font, color(SURFACE))
+        tooltip_rect = pygame.Rect((0, 0), tip_atlas.size(hovered_cell_label))
+        tooltip_rect.center = (mouse_pos[0], mouse_pos[1] - 25)
         
         # Thêm background cho tooltip
         bg_rect = tooltip_rect.inflate(12, 6)
         pygame.draw.rect(screen, color(TEXT_PRIMARY), bg_rect, border_radius=5)
         
-        screen.blit(text_surf, tooltip_rect)
+        tip_atlas.draw(screen, hovered_cell_label, topleft=tooltip_rect.topleft)
+        if hovered_preview is not None:
+            screen.blit(hovered_preview, hovered_preview.get_rect(midtop=(bg_rect.centerx, bg_rect.bottom + 36)))
 
     pygame.display.flip()
+    if startup_stats is not None:
+        startup_stats["ready_ms"] = startup_ms()  # frame đầu tiên của màn chơi
+        record_startup(startup_stats)
+        startup_stats = None
+        if exit_after_startup:
+            running = False
     clock.tick(60)
+prefetcher.stop()
+answer_judge.stop()
+if bank_reloader:
+    bank_reloader.stop()
+gm.match_log.close()
+gm.recorder.close()
+sidebar.close()
+if METRICS.names():
+    METRICS.dump(os.path.join(MATCH_LOG_DIR, f"{MATCH_ID}_metrics.json"))
 pygame.quit()
\ No newline at end of file
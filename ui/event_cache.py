@@ -0,0 +1,140 @@
+# ui/event_cache.py
+import random
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import pygame
+
+from core.event_data import EVENT_INFO
+from core.event_engine import plan_from_template, template_for
+from core.event_mapping import EVENT_TYPE_MAP, TYPE_TO_IDS
+from ui.popup_event_intro import EventIntroPopup
+from utils.colors import EVENT_COLORS, TEXT_PRIMARY, SURFACE
+from utils.helpers import get_font, color
+
+
+class EventAssets:
+    """Phần dùng chung cho mọi ô cùng event_id: nội dung, icon, template plan, popup giới thiệu đã dựng layout."""
+    __slots__ = ("event_id", "event_type", "title", "desc", "icon", "template", "intro", "_preview")
+
+    def __init__(self, event_id: str, event_type: str, icon):
+        info = EVENT_INFO.get(event_id, {})
+        self.event_id = event_id
+        self.event_type = EVENT_TYPE_MAP.get(event_id, event_type)
+        self.title = info.get("title", "Sự kiện")
+        self.desc = info.get("desc", "")
+        self.icon = icon
+        self.template = template_for(event_id)
+        self.intro = EventIntroPopup(event_id=event_id, title=self.title, desc=self.desc,
+                                     icon_surface=icon, event_type=self.event_type)
+        self._preview = None
+
+    def preview(self):
+        """Thẻ nhỏ (dải màu loại + tiêu đề) để hiện khi hover ô; dựng một lần."""
+        if self._preview is None:
+            font = get_font("caption", "semibold")
+            text = font.render(self.title, True, color(SURFACE))
+            pad, stripe = 6, 6
+            surf = pygame.Surface((text.get_width() + 2 * pad + stripe, text.get_height() + 2 * pad), pygame.SRCALPHA)
+            pygame.draw.rect(surf, color(TEXT_PRIMARY), surf.get_rect(), border_radius=5)
+            pygame.draw.rect(surf, EVENT_COLORS.get(self.event_type, (170, 170, 170)),
+                             (0, 0, stripe + 4, surf.get_height()), border_top_left_radius=5, border_bottom_left_radius=5)
+            surf.blit(text, (stripe + pad, pad))
+            self._preview = surf
+        return self._preview
+
+
+class EventBundle:
+    """Kết quả phân giải một ô sự kiện: event_id (đã chọn nếu ô chưa có) + assets dùng chung."""
+    __slots__ = ("event_id", "event_type", "assets")
+
+    def __init__(self, event_id: str, event_type: str, assets: EventAssets):
+        self.event_id = event_id
+        self.event_type = event_type
+        self.assets = assets
+
+
+class EventCellCache:
+    """
+    Cache phân giải ô sự kiện cho main.py (mở intro / plan / preview khi hover):
+    - Bundle theo ô dựng lười ở lần hover/click đầu; ô chưa có event_id được chọn id một lần (random toàn cục,
+      như trước) và chỉ ghi vào ô khi thật sự mở intro.
+    - Assets theo event_id (nội dung, icon, template, layout intro, thẻ preview) dùng chung giữa các ô; warm()
+      dựng dần layout intro của mọi event trên bàn trong các frame rảnh, theo ngân sách thời gian.
+    - Ô đổi event_id / event_type (undo, event khác...) -> bundle của ô bị bỏ qua board listener.
+    """
+
+    def __init__(self, board, screen_size: Tuple[int, int], icon_loader: Callable[[str], Optional[pygame.Surface]]):
+        self.board = board
+        self.screen_size = tuple(screen_size)
+        self.icon_loader = icon_loader
+        self._cells: Dict[Tuple[int, int], EventBundle] = {}
+        self._assets: Dict[str, EventAssets] = {}
+        self._warm_queue = None
+        board.add_listener(self._on_cell_change)
+
+    def _on_cell_change(self, cell, attr, old, new):
+        if attr not in ("event_id", "event_type"):
+            return
+        b = self._cells.get((cell.row, cell.col))
+        if b is not None and new != (b.event_id if attr == "event_id" else b.event_type):
+            del self._cells[(cell.row, cell.col)]
+
+    def set_screen_size(self, screen_size):
+        self.screen_size = tuple(screen_size)
+        self._warm_queue = None  # layout intro dựng lại (lười) theo kích thước mới
+
+    def assets(self, event_id: str, event_type: str = "bonus") -> EventAssets:
+        a = self._assets.get(event_id)
+        if a is None:
+            a = self._assets[event_id] = EventAssets(event_id, event_type, self.icon_loader(event_id))
+        return a
+
+    def get(self, cell) -> Optional[EventBundle]:
+        """Bundle của ô (None nếu ô không có sự kiện). O(1) khi đã có."""
+        if not cell.event_type:
+            return None
+        b = self._cells.get((cell.row, cell.col))
+        if b is None:
+            base_type, event_id = str(cell.event_type).lower(), cell.event_id
+            if not event_id:
+                candidates = TYPE_TO_IDS.get(base_type, [])
+                event_id = random.choice(candidates) if candidates else random.choice(list(EVENT_TYPE_MAP.keys()))
+            b = self._cells[(cell.row, cell.col)] = EventBundle(event_id, base_type, self.assets(event_id, base_type))
+        return b
+
+    def open_intro(self, cell) -> Tuple[EventBundle, EventIntroPopup]:
+        """Bundle + popup giới thiệu mới (layout đã dựng sẵn nếu warm/hover đã chạy); ghi event_id vào ô nếu thiếu."""
+        b = self.get(cell)
+        if not cell.event_id:
+            cell.event_id = b.event_id
+        return b, b.assets.intro.prepare(self.screen_size).clone()
+
+    def plan(self, cell, gm):
+        """EventContext cho ô từ template đã cache (thay cho plan(event_id, ...) dựng lại từ đầu)."""
+        b = self.get(cell)
+        a = b.assets
+        return plan_from_template(a.template, b.event_id, EVENT_TYPE_MAP.get(b.event_id, b.event_type), gm, cell)
+
+    def preview(self, cell, prepare_intro: bool = True) -> Optional[pygame.Surface]:
+        """Thẻ preview khi hover; tiện thể dựng layout intro của event này (một lần) để click mở ngay."""
+        b = self.get(cell)
+        if b is None:
+            return None
+        if prepare_intro:
+            b.assets.intro.prepare(self.screen_size)
+        return b.assets.preview()
+
+    def warm(self, budget_ms: float = 1.0) -> int:
+        """Dựng layout intro cho các event_id có trên bàn, dừng khi hết ngân sách; trả về số layout đã dựng."""
+        if self._warm_queue is None:
+            ids = {(c.event_id or "", str(c.event_type).lower()) for row in self.board.cells for c in row
+                   if c.event_type and c.event_id}
+            self._warm_queue = sorted(ids)
+        deadline = time.perf_counter() + budget_ms / 1000
+        built = 0
+        while self._warm_queue and time.perf_counter() < deadline:
+            event_id, event_type = self._warm_queue.pop()
+            self.assets(event_id, event_type).intro.prepare(self.screen_size)
+            built += 1
+        return built
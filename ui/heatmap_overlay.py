@@ -0,0 +1,86 @@
+# ui/heatmap_overlay.py
+import pygame
+from core.heatmap import METRICS
+
+MODE_LABELS = {"captures": "Tần suất chiếm ô", "contested": "Ô tranh chấp", "events": "Kích hoạt sự kiện"}
+MAX_ALPHA = 170
+
+# Thang màu lạnh -> nóng cho từng lớp
+_RAMPS = {
+    "captures":  ((255, 214, 109), (232, 77, 63)),
+    "contested": ((162, 89, 255), (255, 79, 94)),
+    "events":    ((0, 207, 207), (33, 58, 89)),
+}
+
+
+def _ramp(metric, t):
+    (r0, g0, b0), (r1, g1, b1) = _RAMPS[metric]
+    return (int(r0 + (r1 - r0) * t), int(g0 + (g1 - g0) * t), int(b0 + (b1 - b0) * t), int(MAX_ALPHA * t))
+
+
+class HeatmapOverlay:
+    """
+    Lớp phủ heatmap vẽ đè lên Board.draw:
+    - Bản đồ nhỏ 1 pixel / ô (SRCALPHA) cho lớp đang chọn; chỉ tô lại các ô HeatmapStats báo đổi,
+      dựng lại toàn bộ khi đổi lớp hoặc khi giá trị lớn nhất (thang màu) đổi.
+    - Ảnh đã phóng theo camera được cache theo (version, lớp, vùng ô đang thấy, zoom):
+      các frame không có nước đi mới chỉ blit lại.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.mode = None          # None = tắt, hoặc một phần tử của METRICS
+        self._small = None
+        self._small_mode = None
+        self._scaled_key = None
+        self._scaled = None
+
+    @property
+    def key(self):
+        """Đổi khi ảnh phủ đổi (dùng cho base_key của ModalLayer)."""
+        return (self.mode, self.stats.version) if self.mode else None
+
+    def cycle(self):
+        """Tắt -> captures -> contested -> events -> tắt. Trả về nhãn lớp mới (None nếu tắt)."""
+        order = (None,) + METRICS
+        self.mode = order[(order.index(self.mode) + 1) % len(order)]
+        return MODE_LABELS.get(self.mode)
+
+    def _update_small(self):
+        stats, mode, n = self.stats, self.mode, self.stats.size
+        dirty = stats.take_dirty(mode)
+        if self._small is None or self._small_mode != mode:
+            self._small = pygame.Surface((n, n), pygame.SRCALPHA)
+            self._small_mode, dirty = mode, None
+        grid, top = stats.counts[mode], stats.max[mode]
+        if dirty is None:
+            self._small.fill((0, 0, 0, 0))
+            cells = (i for i in range(n * n) if grid[i])
+        else:
+            cells = dirty
+        if top <= 0:
+            return
+        for i in cells:
+            self._small.set_at((i % n, i // n), _ramp(mode, grid[i] / top) if grid[i] else (0, 0, 0, 0))
+
+    def draw(self, screen, board):
+        if not self.mode:
+            return
+        cam = board._camera()
+        step = board._step
+        r0, r1, c0, c1 = cam.visible_cells(step, board.size)
+        if r1 <= r0 or c1 <= c0:
+            return
+        key = (self.stats.version, self.mode, r0, r1, c0, c1, cam.zoom)
+        if key != self._scaled_key:
+            if self.stats.dirty[self.mode] != set() or self._small_mode != self.mode:
+                self._update_small()
+            part = self._small.subsurface((c0, r0, c1 - c0, r1 - r0))
+            size = (max(1, int(round((c1 - c0) * step * cam.zoom))), max(1, int(round((r1 - r0) * step * cam.zoom))))
+            self._scaled = pygame.transform.scale(part, size)
+            self._scaled_key = key
+        sx, sy = cam.to_screen(c0 * step, r0 * step)
+        clip_prev = screen.get_clip()
+        screen.set_clip(pygame.Rect(cam.viewport).clip(clip_prev))
+        screen.blit(self._scaled, (int(round(sx)), int(round(sy))))
+        screen.set_clip(clip_prev)
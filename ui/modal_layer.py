@@ -0,0 +1,71 @@
+# ui/modal_layer.py
+import pygame
+
+# ---------------- Overlay mờ dùng chung ----------------
+_overlay_cache = {}
+
+def get_overlay(size, alpha):
+    """Surface SRCALPHA phủ toàn màn hình, cache theo (size, alpha) thay vì tạo mới mỗi frame."""
+    key = (tuple(size), alpha)
+    surf = _overlay_cache.get(key)
+    if surf is None:
+        if len(_overlay_cache) > 8:  # đổi kích thước cửa sổ nhiều lần -> bỏ cache cũ
+            _overlay_cache.clear()
+        surf = pygame.Surface(key[0], pygame.SRCALPHA)
+        surf.fill((0, 0, 0, alpha))
+        _overlay_cache[key] = surf
+    return surf
+
+def blit_overlay(screen, alpha):
+    screen.blit(get_overlay(screen.get_size(), alpha), (0, 0))
+
+
+class ModalLayer:
+    """
+    Quản lý các popup (modal) đang mở:
+    - Thứ tự: danh sách từ dưới lên trên; chỉ popup trên cùng nhận sự kiện.
+    - Khi có modal: vẽ nền (bàn cờ + sidebar) một lần rồi chụp lại; các frame sau chỉ blit ảnh chụp,
+      cho tới khi base_key đổi (bàn/sidebar thay đổi) hoặc đổi kích thước màn hình.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self._snapshot = None
+        self._snapshot_key = None
+
+    def set_active(self, popups):
+        """popups: các popup đang mở, theo thứ tự từ dưới lên (None được bỏ qua)."""
+        self.stack = [p for p in popups if p is not None]
+        if not self.stack:
+            self._snapshot, self._snapshot_key = None, None
+
+    @property
+    def top(self):
+        return self.stack[-1] if self.stack else None
+
+    def is_top(self, popup):
+        return popup is not None and popup is self.top
+
+    def route(self, events):
+        """Gửi sự kiện chỉ cho modal trên cùng."""
+        top = self.top
+        if top is not None:
+            for event in events:
+                top.handle_event(event)
+        return top
+
+    def invalidate(self):
+        self._snapshot, self._snapshot_key = None, None
+
+    def draw(self, screen, draw_base, base_key=None):
+        if not self.stack:
+            draw_base(screen)
+            return
+        key = (screen.get_size(), base_key)
+        if self._snapshot is None or self._snapshot_key != key:
+            draw_base(screen)
+            self._snapshot, self._snapshot_key = screen.copy(), key
+        else:
+            screen.blit(self._snapshot, (0, 0))
+        for popup in self.stack:
+            popup.draw(screen)
@@ -2,6 +2,7 @@
 import pygame
 from utils.colors import SURFACE, TEXT_PRIMARY, BACKGROUND_MEDIUM, EVENT_COLORS
 from utils.helpers import get_font, color, wrap_lines
+from ui.modal_layer import blit_overlay
 
 class ConfirmationPopup:
     def __init__(self, message: str, confirm_text="Xác nhận", cancel_text="Hủy"):
@@ -31,9 +32,7 @@ class ConfirmationPopup:
         sw, sh = screen.get_size()
         
         # Overlay mờ
-        overlay = pygame.Surface((sw, sh), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        screen.blit(overlay, (0, 0))
+        blit_overlay(screen, 120)
         
         # Card
         card_w = 400
@@ -3,6 +3,7 @@ import pygame
 from utils.helpers import get_font
 from utils.colors import TEXT_SECONDARY, EVENT_COLORS
 from utils.helpers import wrap_lines, text_block_height  # dùng helpers thay vì hàm wrap nội bộ
+from ui.modal_layer import blit_overlay
 
 ELLIPSIS = "…"
 
@@ -16,7 +17,8 @@ class EventIntroPopup:
     - Nút "Sẵn sàng" cố định
     - Màu accent theo event_type
     """
-    def __init__(self, event_id: str, title: str, desc: str, icon_surface: pygame.Surface, event_type: str):
+    def __init__(self, event_id: str, title: str, desc: str, icon_surface: pygame.Surface, event_type: str,
+                 prepared=None):
         self.event_id = event_id or "EVENT"
         self.title = (title or "").strip() or "Sự kiện"
         self.desc = (desc or "").strip()
@@ -40,6 +42,21 @@ class EventIntroPopup:
         self.scroll_y = 0
         self.max_scroll = 0
 
+        # Layout đã dựng sẵn, khoá theo kích thước màn hình; prepared = (key, layout) từ prepare() của popup khác
+        self._layout_key, self._layout = prepared if prepared else (None, None)
+
+    def prepare(self, screen_size):
+        """Dựng layout trước (ví dụ khi hover ô sự kiện) để frame mở popup chỉ còn blit."""
+        key = tuple(screen_size)
+        if self._layout_key != key:
+            self._layout_key, self._layout = key, self._build_layout(*key)
+        return self
+
+    def clone(self):
+        """Popup mới (chưa bấm, chưa cuộn) dùng chung layout đã dựng."""
+        return EventIntroPopup(self.event_id, self.title, self.desc, self.icon, self.event_type,
+                               prepared=(self._layout_key, self._layout))
+
     # ---------------- Interaction ----------------
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION and self.btn_rect:
@@ -68,38 +85,36 @@ class EventIntroPopup:
     def is_finished(self):
         return self.finished
 
-    # ---------------- Drawing ----------------
-    def draw(self, screen):
-        sw, sh = screen.get_size()
-
-        # Overlay
-        overlay = pygame.Surface((sw, sh), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        screen.blit(overlay, (0, 0))
-
-        # Card
+    # ---------------- Layout (cache theo kích thước màn hình) ----------------
+    def _build_layout(self, sw, sh):
+        """
+        Dựng một lần cho mỗi (kích thước màn hình, nội dung): icon đã scale, các dòng tiêu đề,
+        surface mô tả và các rect. Các frame sau chỉ blit theo scroll_y.
+        """
+        lay = {}
         card_w = min(840, int(sw * 0.84))
         card_h = min(520, int(sh * 0.76))
-        self.card_rect = pygame.Rect(0, 0, card_w, card_h)
-        self.card_rect.center = (sw // 2, sh // 2)
-        pygame.draw.rect(screen, (255, 255, 255), self.card_rect, border_radius=16)
+        card_rect = pygame.Rect(0, 0, card_w, card_h)
+        card_rect.center = (sw // 2, sh // 2)
+        lay["card_rect"] = card_rect
 
         pad = 28
-        inner_left  = self.card_rect.x + pad
-        inner_right = self.card_rect.right - pad
+        inner_left  = card_rect.x + pad
+        inner_right = card_rect.right - pad
         inner_w     = inner_right - inner_left
-        cur_y       = self.card_rect.y + pad
+        cur_y       = card_rect.y + pad
 
         # Icon (center)
+        lay["icon"] = None
         if self.icon:
             max_ih = 100
             ih = max_ih
             iw = int(self.icon.get_width() * (ih / max(1, self.icon.get_height())))
             icon_surf = pygame.transform.smoothscale(self.icon, (iw, ih))
             icon_rect = icon_surf.get_rect()
-            icon_rect.centerx = self.card_rect.centerx
+            icon_rect.centerx = card_rect.centerx
             icon_rect.y = cur_y
-            screen.blit(icon_surf, icon_rect)
+            lay["icon"] = (icon_surf, icon_rect)
             cur_y = icon_rect.bottom + 16
         else:
             cur_y += 8
@@ -109,41 +124,47 @@ class EventIntroPopup:
         title_lines = wrap_lines(self.title_font, self.title, maxw_title)
         if len(title_lines) > 3:
             title_lines = title_lines[:3]
-            while self.title_font.size(title_lines[-1] + ELLIPSIS)[0] > maxw_title and len(title_lines[-1]) > 1:
-                title_lines[-1] = title_lines[-1][:-1]
-            title_lines[-1] = title_lines[-1] + ELLIPSIS
-
+            last = title_lines[-1]
+            # Tìm độ dài lớn nhất còn vừa khi thêm "…" (tìm nhị phân thay vì bớt từng ký tự)
+            lo, hi = 1, len(last)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if self.title_font.size(last[:mid] + ELLIPSIS)[0] <= maxw_title:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            title_lines[-1] = last[:lo] + ELLIPSIS
+
+        lay["titles"] = []
         for ln in title_lines:
             surf = self.title_font.render(ln, True, self.accent)
             rect = surf.get_rect()
-            rect.centerx = self.card_rect.centerx
+            rect.centerx = card_rect.centerx
             rect.y = cur_y
-            screen.blit(surf, rect)
+            lay["titles"].append((surf, rect))
             cur_y = rect.bottom + 8
 
         cur_y += 6  # chút khoảng cách trước phần mô tả
 
         # Nút (đặt trước để giữ vùng desc không đè lên)
         btn_w, btn_h = 180, 52
-        self.btn_rect = pygame.Rect(
-            self.card_rect.right - pad - btn_w,
-            self.card_rect.bottom - pad - btn_h,
-            btn_w, btn_h
-        )
+        btn_rect = pygame.Rect(card_rect.right - pad - btn_w, card_rect.bottom - pad - btn_h, btn_w, btn_h)
+        lay["btn_rect"] = btn_rect
+        lay["btn_text"] = self.btn_font.render("Sẵn sàng", True, (255, 255, 255))
+        lay["btn_hover_color"] = self._mix(self.accent, (255, 255, 255), 0.15)
 
         # Khu vực mô tả (scrollable)
-        content_bottom  = self.btn_rect.top - 16
+        content_bottom  = btn_rect.top - 16
         content_height  = max(60, content_bottom - cur_y)
         content_rect    = pygame.Rect(inner_left, cur_y, inner_w, content_height)
+        lay["content_rect"] = content_rect
 
-        # Render desc vào surface riêng (dùng wrap_lines + text_block_height)
-        content_surf = pygame.Surface((inner_w, max(content_height, 10)), pygame.SRCALPHA)
+        # Render toàn bộ mô tả vào một surface cao đủ chứa hết; khi cuộn chỉ đổi vùng blit
         desc_lines = wrap_lines(self.desc_font, self.desc, int(inner_w * 0.92))
         total_h = text_block_height(self.desc_font, desc_lines, line_spacing=6)
-
-        # clamp scroll
-        self.max_scroll = max(0, total_h - content_height)
-        self.scroll_y = max(0, min(self.scroll_y, self.max_scroll))
+        lay["total_h"] = total_h
+        lay["max_scroll"] = max(0, total_h - content_height)
+        content_surf = pygame.Surface((inner_w, max(content_height, total_h, 10)), pygame.SRCALPHA)
 
         # Vẽ từng dòng (canh giữa) vào content_surf
         y = 0
@@ -158,9 +179,36 @@ class EventIntroPopup:
             r.y = y
             content_surf.blit(s, r)
             y += s.get_height() + 6
+        lay["content_surf"] = content_surf
+        return lay
+
+    # ---------------- Drawing ----------------
+    def draw(self, screen):
+        sw, sh = screen.get_size()
+        if self._layout_key != (sw, sh):
+            self._layout_key, self._layout = (sw, sh), self._build_layout(sw, sh)
+        lay = self._layout
+
+        # Overlay
+        blit_overlay(screen, 120)
+
+        # Card
+        self.card_rect = lay["card_rect"]
+        self.btn_rect = lay["btn_rect"]
+        pygame.draw.rect(screen, (255, 255, 255), self.card_rect, border_radius=16)
+
+        if lay["icon"]:
+            screen.blit(*lay["icon"])
+        for surf, rect in lay["titles"]:
+            screen.blit(surf, rect)
+
+        # clamp scroll
+        content_rect = lay["content_rect"]
+        self.max_scroll = lay["max_scroll"]
+        self.scroll_y = max(0, min(self.scroll_y, self.max_scroll))
 
         # Blit với cắt theo scroll
-        screen.blit(content_surf, (content_rect.x, content_rect.y),
+        screen.blit(lay["content_surf"], (content_rect.x, content_rect.y),
                     area=pygame.Rect(0, self.scroll_y, content_rect.w, content_rect.h))
 
         # Scrollbar (nếu cần)
@@ -168,15 +216,15 @@ class EventIntroPopup:
             bar_w = 6
             rail = pygame.Rect(content_rect.right - bar_w, content_rect.y, bar_w, content_rect.h)
             pygame.draw.rect(screen, (230, 230, 230), rail, border_radius=3)
-            visible_ratio = content_rect.h / (total_h + 1e-6)
+            visible_ratio = content_rect.h / (lay["total_h"] + 1e-6)
             thumb_h = max(24, int(rail.h * visible_ratio))
             thumb_y = rail.y + int((self.scroll_y / max(1, self.max_scroll)) * (rail.h - thumb_h))
             pygame.draw.rect(screen, (200, 200, 200), (rail.x, thumb_y, bar_w, thumb_h), border_radius=3)
 
         # Nút "Sẵn sàng"
-        btn_color = self._mix(self.accent, (255, 255, 255), 0.15) if self.hover_btn else self.accent
+        btn_color = lay["btn_hover_color"] if self.hover_btn else self.accent
         pygame.draw.rect(screen, btn_color, self.btn_rect, border_radius=12)
-        btn_text = self.btn_font.render("Sẵn sàng", True, (255, 255, 255))
+        btn_text = lay["btn_text"]
         screen.blit(btn_text, btn_text.get_rect(center=self.btn_rect.center))
 
     # ---------------- Helpers ----------------
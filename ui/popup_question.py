@@ -1,12 +1,19 @@
 # ui/popup_question.py
+import math
+import time
 import pygame
 from utils.colors import (
     SURFACE, BACKGROUND_MEDIUM, TEXT_PRIMARY, TEXT_MUTED,
     TEXT_HOVER, EVENT_COLORS
 )
 from utils.helpers import get_font, wrap_lines, text_block_height, color
+from utils.glyph_atlas import draw_text, render_text, get_atlas
+from ui.modal_layer import blit_overlay
+from core.answer_timing import AnswerTiming
+from core.answer_judge import is_text_question, judge_text, MAX_INPUT
 
 SCROLL_SPEED = 40
+TEXT_INPUT_H = 52  # ô nhập câu trả lời (câu tự luận)
 
 # NEW: Định nghĩa màu cho feedback đáp án
 CORRECT_BG = (212, 237, 218)       # Xanh lá cây nhạt
@@ -20,8 +27,38 @@ def _pill(surface, rect, bg, radius=16, border=None):
     if border:
         pygame.draw.rect(surface, color(border), rect, width=2, border_radius=radius)
 
+def question_content_width(screen_w):
+    """Bề rộng vùng nội dung của popup cho một chiều rộng màn hình (khớp với draw)."""
+    pw = min(760, int(screen_w * 0.78))
+    return pw - 28 * 2
+
+class QuestionLayout:
+    """
+    Bố cục đã wrap + surface chữ đã render sẵn cho một câu hỏi ở một bề rộng.
+    Dựng được trên worker thread (với font riêng của thread) hoặc ngay trong popup.
+    """
+    __slots__ = ("width", "q_surfs", "opt_labels", "opt_surfs", "opt_heights", "content_total_h")
+
+    def __init__(self, question_obj, content_w, f_title, f_body):
+        txt = color(TEXT_PRIMARY)
+        self.width = content_w
+        q_lines = wrap_lines(f_title, question_obj.get("question", ""), content_w)
+        options = question_obj.get("options", [])
+        opt_line_sets = [wrap_lines(f_body, opt, content_w - 56) for opt in options]
+        self.opt_heights = [text_block_height(f_body, lines, 4) + 18 for lines in opt_line_sets]
+        q_h = text_block_height(f_title, q_lines, 6)
+        if options:
+            self.content_total_h = q_h + 16 + sum(self.opt_heights) + 12 * (len(options) - 1)
+        else:  # câu tự luận: ô nhập + một dòng đáp án khi lật
+            self.content_total_h = q_h + 16 + TEXT_INPUT_H + 10 + f_body.get_linesize()
+
+        self.q_surfs = [f_title.render(ln, True, txt) for ln in q_lines]
+        self.opt_labels = [render_text(f_body, f"{chr(65+i)}.", txt) for i in range(len(options))]
+        self.opt_surfs = [[f_body.render(ln, True, txt) for ln in lines] for lines in opt_line_sets]
+
 class QuestionPopup:
-    def __init__(self, question_obj, team_label="A", seconds=15, cell_label=None, event_context=None):
+    def __init__(self, question_obj, team_label="A", seconds=15, cell_label=None, event_context=None, prepared=None,
+                 judge=None):
         import random # Đảm bảo đã import random
         self.q = question_obj
         self.team = team_label
@@ -34,7 +71,20 @@ class QuestionPopup:
         self.result = None
         self._correct_answer_idx = self._get_correct_answer_index()
         self.time_left_on_reveal = -1
-        self._start_ms = pygame.time.get_ticks()
+
+        # --- Câu tự luận: gõ câu trả lời, chấm trên thread của judge (core.answer_judge.AnswerJudge) ---
+        self.text_mode = is_text_question(question_obj)
+        self.typed = ""
+        self.verdict = None   # Judgement sau khi chấm
+        self._judge = judge
+        self._ticket = None
+        self.text_hint = None
+        self._text_input = self.text_mode  # đang bật nhận gõ chữ (IME) của SDL
+        if self.text_mode:
+            pygame.key.start_text_input()
+        # Đồng hồ chính xác (ns): đếm ngược + đo thời gian trả lời
+        self._start_ns = time.perf_counter_ns()
+        self.timing = AnswerTiming(team_label, question_obj.get("id"))
 
         # --- Logic cho HINT_UNLOCK ---
         self.disabled_options = []
@@ -44,6 +94,8 @@ class QuestionPopup:
             random.shuffle(incorrect_indices)
             num_to_disable = 2 if options_count > 3 else 1
             self.disabled_options = incorrect_indices[:num_to_disable]
+            if self.text_mode and self.q.get("answer"):
+                self.text_hint = f"Gợi ý: bắt đầu bằng “{str(self.q['answer']).strip()[0]}”"
 
         # Fonts
         self.f_title = get_font("heading2", "semibold")
@@ -61,6 +113,10 @@ class QuestionPopup:
         self._option_content_rects = []
         self._last_done_rect = None
 
+        # Layout đã dựng sẵn (từ QuestionPrefetcher) hoặc tự dựng ở lần draw đầu
+        self._layout = prepared
+        self._header_surf = None
+
     # --- MODIFIED: Phương thức helper mới ---
     def _get_correct_answer_index(self):
         """Xác định index (0-3) của câu trả lời đúng từ dữ liệu."""
@@ -74,13 +130,26 @@ class QuestionPopup:
                 return i
         return -1
 
+    def remaining(self):
+        """Số giây còn lại (float, theo perf_counter_ns)."""
+        return max(0.0, self.seconds - (time.perf_counter_ns() - self._start_ns) / 1e9)
+
     def time_left(self):
-        elapsed = (pygame.time.get_ticks() - self._start_ms) / 1000.0
-        return max(0, int(self.seconds - elapsed))
+        """Số giây hiển thị: làm tròn lên, nên "15" hiện trọn giây đầu và về 0 đúng lúc hết giờ."""
+        return math.ceil(self.remaining())
 
     # --- MODIFIED: is_finished giờ rất đơn giản ---
     def is_finished(self):
-        return self.state == "FINISHED"
+        if self.state == "FINISHED":
+            self.stop_text_input()
+            return True
+        return False
+
+    def stop_text_input(self):
+        """Tắt nhận gõ chữ khi rời ANSWERING/JUDGING, khi xong hoặc khi popup bị bỏ (đổi câu); gọi lại không sao."""
+        if self._text_input:
+            self._text_input = False
+            pygame.key.stop_text_input()
 
     def was_correct(self):
         return self.result is True
@@ -88,18 +157,71 @@ class QuestionPopup:
     def _answer_is_correct(self, picked_idx):
         return picked_idx == self._correct_answer_idx
 
+    @property
+    def accepts_text(self):
+        """Đang nhận gõ phím (main.py không dùng phím tắt như R khi này)."""
+        return self.text_mode and self.state == "ANSWERING"
+
+    def _submit_text(self, timed_out=False):
+        """Gửi câu trả lời đã gõ cho judge; kết quả được lấy ở draw() (trạng thái JUDGING)."""
+        self.time_left_on_reveal = 0 if timed_out else self.time_left()
+        self.timing.submit(timed_out=timed_out)
+        if self._judge is not None:
+            self._ticket = self._judge.submit(self.q, self.typed)
+            self.state = "JUDGING"
+        else:
+            self._reveal_verdict(judge_text(self.q, self.typed))
+
+    def _reveal_verdict(self, verdict):
+        self.verdict = verdict
+        self.result = verdict.correct
+        self.state = "REVEALING"
+        self.stop_text_input()
+
+    def _handle_text_event(self, event):
+        if event.type == pygame.TEXTINPUT and self.state == "ANSWERING":
+            if len(self.typed) < MAX_INPUT:
+                self.typed = (self.typed + event.text)[:MAX_INPUT]
+                self.timing.select("text")
+            return True
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            if self.state == "ANSWERING" and self.typed.strip():
+                self._submit_text()
+            elif self.state == "REVEALING":
+                self.state = "FINISHED"
+            return True
+        if event.key == pygame.K_BACKSPACE and self.state == "ANSWERING":
+            if event.mod & pygame.KMOD_CTRL:
+                self.typed = self.typed.rstrip()
+                self.typed = self.typed[:self.typed.rfind(" ") + 1]
+            else:
+                self.typed = self.typed[:-1]
+            self.timing.select("text")
+            return True
+        return False
+
     # --- MODIFIED: handle_event theo trạng thái ---
-    def handle_event(self, event):
+    def handle_event(self, event, mouse_pos=None):
+        """mouse_pos: vị trí chuột cho MOUSEWHEEL (mặc định: pygame.mouse.get_pos())."""
         if event.type == pygame.MOUSEWHEEL and self._viewport and self.max_scroll > 0:
-            mx, my = pygame.mouse.get_pos()
+            mx, my = mouse_pos or pygame.mouse.get_pos()
             if self._viewport.collidepoint(mx, my):
                 self.scroll_y = max(0, min(self.scroll_y - event.y * SCROLL_SPEED, self.max_scroll))
             return
 
+        if self.text_mode and self._handle_text_event(event):
+            return
+
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             mx, my = event.pos
 
-            if self.state == "ANSWERING":
+            if self.state == "ANSWERING" and self.text_mode:
+                if self._last_done_rect and self._last_done_rect.collidepoint(mx, my) and self.typed.strip():
+                    self._submit_text()
+
+            elif self.state == "ANSWERING":
                 # Cho phép chọn/đổi đáp án
                 if self._viewport:
                     for i, content_rect in enumerate(self._option_content_rects):
@@ -111,6 +233,7 @@ class QuestionPopup:
                         visible_rect = content_rect.move(0, -self.scroll_y)
                         if self._viewport.colliderect(visible_rect) and visible_rect.collidepoint(mx, my):
                             self.selected_idx = i
+                            self.timing.select(i)
                             return
 
                 # Bấm nút "Đáp án"
@@ -118,6 +241,7 @@ class QuestionPopup:
                     if self.selected_idx is not None:
                         self.result = self._answer_is_correct(self.selected_idx)
                         self.time_left_on_reveal = self.time_left()
+                        self.timing.submit()
                         self.state = "REVEALING"
 
             elif self.state == "REVEALING":
@@ -126,10 +250,9 @@ class QuestionPopup:
                     self.state = "FINISHED"
 
     def draw(self, screen):
+        self.timing.shown()  # chỉ ghi ở frame đầu tiên
         sw, sh = screen.get_size()
-        overlay = pygame.Surface((sw, sh), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 90))
-        screen.blit(overlay, (0, 0))
+        blit_overlay(screen, 90)
 
         pw = min(760, int(sw * 0.78))
         ph = int(sh * 0.82)
@@ -142,34 +265,33 @@ class QuestionPopup:
         content_x = px + padding
         content_w = pw - padding * 2
         label_y = py + padding + 48
-        screen.blit(self.f_label.render(f"Đội {self.team} • Câu hỏi", True, color(TEXT_MUTED)), (content_x, label_y))
+        if self._header_surf is None:
+            self._header_surf = self.f_label.render(f"Đội {self.team} • Câu hỏi", True, color(TEXT_MUTED))
+        screen.blit(self._header_surf, (content_x, label_y))
 
         viewport_top = label_y + 32
         viewport_height = ph - (viewport_top - py) - 88
         viewport = pygame.Rect(content_x, viewport_top, content_w, viewport_height)
         self._viewport = viewport
 
-        q_lines = wrap_lines(self.f_title, self.q.get("question", ""), content_w)
-        options = self.q.get("options", [])
-        opt_line_sets = [wrap_lines(self.f_body, opt, content_w - 56) for opt in options]
-        opt_heights = [text_block_height(self.f_body, lines, 4) + 18 for lines in opt_line_sets]
-        q_h = text_block_height(self.f_title, q_lines, 6)
-        content_total_h = q_h + 16 + sum(opt_heights) + 12 * (len(options) - 1)
-        self.max_scroll = max(0, content_total_h - viewport_height)
+        layout = self._layout
+        if layout is None or layout.width != content_w:
+            layout = self._layout = QuestionLayout(self.q, content_w, self.f_title, self.f_body)
+        opt_heights = layout.opt_heights
+        self.max_scroll = max(0, layout.content_total_h - viewport_height)
 
         clip_prev = screen.get_clip()
         screen.set_clip(viewport)
 
         y_draw = viewport.y - self.scroll_y
-        for ln in q_lines:
-            surf = self.f_title.render(ln, True, color(TEXT_PRIMARY))
+        for surf in layout.q_surfs:
             screen.blit(surf, (viewport.x, y_draw))
             y_draw += surf.get_height() + 6
         y_draw += 10
         y_content = y_draw + self.scroll_y
 
         self._option_content_rects = []
-        for i, lines in enumerate(opt_line_sets):
+        for i, line_surfs in enumerate(layout.opt_surfs):
             btn_h = opt_heights[i]
             content_rect = pygame.Rect(viewport.x, y_content, content_w, btn_h)
             visible_rect = content_rect.move(0, -self.scroll_y)
@@ -190,47 +312,99 @@ class QuestionPopup:
                     bg, border = INCORRECT_BG, INCORRECT_BORDER
 
             _pill(screen, visible_rect, bg, radius=14, border=border)
-            
-            lab = self.f_body.render(f"{chr(65+i)}.", True, color(TEXT_PRIMARY))
+
+            lab = layout.opt_labels[i]
             screen.blit(lab, (visible_rect.x + 14, visible_rect.y + 10))
-            
+
             tx, ty = visible_rect.x + 14 + lab.get_width() + 8, visible_rect.y + 10
-            for ln in lines:
-                surf = self.f_body.render(ln, True, color(TEXT_PRIMARY))
+            for surf in line_surfs:
                 screen.blit(surf, (tx, ty))
                 ty += surf.get_height() + 4
-            
+
             y_content += btn_h + 12
 
+        if self.text_mode:
+            self._draw_text_answer(screen, viewport.x, y_content - self.scroll_y, content_w)
+
         screen.set_clip(clip_prev)
 
         footer_y = py + ph - 72
         circle_center = (content_x + 36, footer_y + 36)
         
         # --- MODIFIED: Xử lý timer và trạng thái ---
-        t_left = self.time_left_on_reveal if self.state == "REVEALING" else self.time_left()
-        if t_left <= 0 and self.state == "ANSWERING":
+        if self.state == "JUDGING":
+            verdict = self._ticket.poll()
+            if verdict is not None:
+                self._reveal_verdict(verdict)
+        remaining = self.remaining() if self.state == "ANSWERING" else max(0, self.time_left_on_reveal)
+        if remaining <= 0 and self.state == "ANSWERING" and self.text_mode:
+            if self.typed.strip():
+                self._submit_text(timed_out=True)
+            else:
+                self.time_left_on_reveal = 0
+                self.timing.submit(timed_out=True)
+                self._reveal_verdict(judge_text(self.q, ""))
+        elif remaining <= 0 and self.state == "ANSWERING":
             self.result = self._answer_is_correct(self.selected_idx) if self.selected_idx is not None else False
             self.time_left_on_reveal = 0
+            self.timing.submit(timed_out=True)
             self.state = "REVEALING"
+        t_left = self.time_left_on_reveal if self.state in ("REVEALING", "JUDGING") else math.ceil(remaining)
         
         t_col = EVENT_COLORS["danger"] if t_left <= 5 else TEXT_HOVER
-        t_surf = self.f_timer.render(str(t_left), True, color(t_col))
         pygame.draw.circle(screen, color(SURFACE), circle_center, 34)
-        screen.blit(t_surf, t_surf.get_rect(center=circle_center))
+        # Vòng tiến trình liên tục (theo đồng hồ ns) quanh số giây -> không bị giật theo từng giây
+        frac = remaining / self.seconds if self.seconds > 0 else 0
+        if frac > 0:
+            ring = pygame.Rect(0, 0, 68, 68)
+            ring.center = circle_center
+            pygame.draw.arc(screen, color(t_col), ring, math.pi / 2, math.pi / 2 + 2 * math.pi * frac, 4)
+        draw_text(screen, self.f_timer, str(t_left), color(t_col), center=circle_center)
         
         # --- MODIFIED: Xử lý nút bấm ---
         btn_w, btn_h = 140, 44
         done_rect = pygame.Rect(px + pw - padding - btn_w, footer_y + 14, btn_w, btn_h)
         self._last_done_rect = done_rect
 
-        btn_text_str = "Xong" if self.state == "REVEALING" else "Đáp án"
-        enabled = (self.selected_idx is not None) if self.state == "ANSWERING" else True
+        btn_text_str = {"REVEALING": "Xong", "JUDGING": "Đang chấm…"}.get(self.state, "Đáp án")
+        if self.state == "ANSWERING":
+            enabled = bool(self.typed.strip()) if self.text_mode else self.selected_idx is not None
+        else:
+            enabled = self.state != "JUDGING"
         
         bg = BACKGROUND_MEDIUM if enabled else "#E9EEF4"
         fg = TEXT_PRIMARY if enabled else TEXT_MUTED
         _pill(screen, done_rect, bg, radius=20)
-        label = get_font("label", "semibold").render(btn_text_str, True, color(fg))
-        screen.blit(label, label.get_rect(center=done_rect.center))
+        draw_text(screen, get_font("label", "semibold"), btn_text_str, color(fg), center=done_rect.center)
+
+        return popup_rect
+
+    def _draw_text_answer(self, screen, x, y, w):
+        """Ô nhập câu trả lời (câu tự luận) + dòng đáp án / kết quả chấm khi lật."""
+        box = pygame.Rect(x, y, w, TEXT_INPUT_H)
+        bg, border = (SELECTION_BG if self.typed else BACKGROUND_MEDIUM), None
+        if self.state == "REVEALING":
+            bg, border = (CORRECT_BG, CORRECT_BORDER) if self.result else (INCORRECT_BG, INCORRECT_BORDER)
+        _pill(screen, box, bg, radius=14, border=border)
+
+        inner = box.inflate(-28, 0)
+        clip_prev = screen.get_clip()
+        screen.set_clip(inner.clip(clip_prev))
+        if self.typed:
+            # chữ dài hơn ô: giữ phần cuối (chỗ đang gõ) trong tầm nhìn
+            tw = get_atlas(self.f_body, color(TEXT_PRIMARY)).size(self.typed)[0]
+            rect = draw_text(screen, self.f_body, self.typed, color(TEXT_PRIMARY),
+                             midleft=(min(inner.x, inner.right - tw - 4), inner.centery))
+            caret_x = rect.right + 2
+        else:
+            placeholder = self.text_hint or "Nhập câu trả lời rồi nhấn Enter"
+            draw_text(screen, self.f_body, placeholder, color(TEXT_MUTED), midleft=(inner.x, inner.centery))
+            caret_x = inner.x
+        if self.state == "ANSWERING" and (time.perf_counter_ns() // 500_000_000) % 2 == 0:
+            pygame.draw.line(screen, color(TEXT_PRIMARY), (caret_x, inner.y + 12), (caret_x, inner.bottom - 12), 2)
+        screen.set_clip(clip_prev)
 
-        return popup_rect
\ No newline at end of file
+        if self.state == "REVEALING" and self.verdict is not None:
+            note = {"fuzzy": " (chấp nhận gần đúng)", "number": " (cùng giá trị)"}.get(self.verdict.kind, "")
+            draw_text(screen, self.f_body, f"Đáp án: {self.verdict.expected}{note}", color(TEXT_MUTED),
+                      topleft=(x + 4, box.bottom + 10))
\ No newline at end of file
@@ -0,0 +1,81 @@
+# ui/question_prefetcher.py
+import queue
+import threading
+from ui.popup_question import QuestionLayout, question_content_width
+from utils.helpers import get_thread_font
+
+
+class QuestionPrefetcher:
+    """
+    Dựng sẵn QuestionLayout cho vài câu tiếp theo mà QuestionManager.get_question() sẽ trả về.
+    - Chạy trên 1 worker thread (daemon), dùng font riêng của thread (get_thread_font).
+    - main thread chỉ gọi refill() sau mỗi lần rút câu và take(q) khi mở popup.
+    """
+
+    def __init__(self, question_manager, screen_size, lookahead: int = 3):
+        self.qm = question_manager
+        self.lookahead = lookahead
+        self._width = question_content_width(screen_size[0])
+
+        self._ready = {}   # qid -> (question_obj, QuestionLayout)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="question-prefetch", daemon=True)
+        self._thread.start()
+
+    # ---------- main thread ----------
+    def set_screen_size(self, screen_size):
+        width = question_content_width(screen_size[0])
+        if width == self._width:
+            return
+        with self._lock:
+            self._width = width
+            self._ready.clear()
+        self.refill()
+
+    def refill(self):
+        """Xếp hàng các câu sắp được phát mà chưa có layout; bỏ layout của câu không còn trong tầm nhìn."""
+        upcoming = self.qm.peek_questions(self.lookahead)
+        keep = {q.get("id"): q for q in upcoming}
+        with self._lock:
+            # bỏ cả layout của bản cũ khi câu vừa được sửa (nạp lại ngân hàng): cùng id, khác object
+            for qid in [k for k, (q, _) in self._ready.items() if keep.get(k) is not q]:
+                del self._ready[qid]
+            width = self._width
+            for q in upcoming:
+                qid = q.get("id")
+                if qid in self._ready or (qid, width) in self._pending:
+                    continue
+                self._pending.add((qid, width))
+                self._queue.put((q, width))
+
+    def take(self, question_obj):
+        """Lấy layout đã dựng cho câu này (nếu có); trả None nếu chưa xong hoặc lệch bề rộng."""
+        with self._lock:
+            entry = self._ready.pop(question_obj.get("id"), None)
+        if entry is None or entry[0] is not question_obj or entry[1].width != self._width:
+            return None
+        return entry[1]
+
+    def stop(self):
+        self._queue.put(None)
+
+    # ---------- worker thread ----------
+    def _worker(self):
+        f_title = get_thread_font("heading2", "semibold")
+        f_body = get_thread_font("body", "medium")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            q, width = item
+            try:
+                layout = QuestionLayout(q, width, f_title, f_body)
+            except Exception as e:
+                print(f"[WARN] Prefetch layout failed for {q.get('id')}: {e}")
+                layout = None
+            with self._lock:
+                self._pending.discard((q.get("id"), width))
+                if layout is not None and width == self._width:
+                    self._ready[q.get("id")] = (q, layout)
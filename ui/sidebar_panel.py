@@ -5,6 +5,11 @@ from utils.colors import (
     SURFACE, TEXT_SECONDARY
 )
 from utils.helpers import get_font, color, wrap_lines
+from utils.glyph_atlas import draw_text, render_text
+from utils.ring_log import RingLog
+
+LOG_CAPACITY = 200     # số dòng lịch sử giữ trong RAM; cũ hơn thì ghi ra file (nếu có)
+LOG_SCROLL_STEP = 40
 
 def _lighten_color(rgb_tuple, amount=80):
     r = min(255, rgb_tuple[0] + amount)
@@ -21,8 +26,11 @@ def _pill(surface, rect, bg, radius=12, border=None):
     if border:
         pygame.draw.rect(surface, color(border), rect, width=2, border_radius=radius)
 
+def _cell_label(cell):
+    return f"{chr(ord('A') + cell.col)}{cell.row + 1}"
+
 class SidebarPanel:
-    def __init__(self, x, y, width):
+    def __init__(self, x, y, width, log_path=None):
         self.rect = pygame.Rect(x, y, width, 9999)
         self.h1 = get_font("heading2", "bold")
         self.body = get_font("body", "medium")
@@ -33,45 +41,100 @@ class SidebarPanel:
         self.pad_x = 8
         self.HIGHLIGHT_COLOR = SURFACE
         
-        # --- NEW: Thêm bộ nhớ cho Lịch sử trận đấu ---
-        self.logs = []
-        self.max_logs = 15 # Giới hạn hiển thị 15 dòng log gần nhất
+        # --- Lịch sử trận đấu: ring buffer (toàn bộ lịch sử ghi ra log_path) ---
+        self.logs = RingLog(LOG_CAPACITY, log_path, encode=str)
         self.log_font = get_font("caption", "medium")
+        self.log_line_gap = 2
+        self.log_entry_gap = 4
+        self.version = 0  # tăng khi nội dung log / vị trí cuộn đổi (để lớp modal biết nền cần vẽ lại)
+        # Vùng lịch sử ảo hoá: chỉ render các mục đang thấy; bố cục mỗi mục cache theo seq
+        self.log_scroll = 0        # px tính từ mục mới nhất (0 = đang ở đầu)
+        self._log_rect = None      # vùng lịch sử của lần vẽ trước (để nhận lăn chuột)
+        self._log_layouts = {}     # seq -> [lines, height, surfaces|None]
+        self._log_layout_w = width
+        self._log_total_h = 0      # tổng chiều cao các mục còn trong RAM (cập nhật O(1) mỗi lần thêm)
 
     # --- NEW: Thêm phương thức để main.py "gửi" log tới ---
     def add_log(self, message: str):
-        """Thêm một tin nhắn mới vào đầu danh sách log."""
-        self.logs.insert(0, message)
-        # Nếu log quá dài, cắt bỏ những dòng cũ nhất
-        if len(self.logs) > self.max_logs:
-            self.logs = self.logs[:self.max_logs]
-
-    def draw(self, screen, gm, win_length: int):
+        """Thêm một tin nhắn mới (mục mới nhất hiện trên cùng)."""
+        self.version += 1
+        logs = self.logs
+        if len(logs) - logs.first == logs.capacity:  # mục cũ nhất sắp bị đẩy ra khỏi RAM
+            old = self._log_layouts.pop(logs.first, None)
+            if old is not None:
+                self._log_total_h -= old[1]
+        logs.append(message)
+        h = self._log_layout(len(logs) - 1, message)[1]
+        self._log_total_h += h
+        if self.log_scroll > 0:
+            # Đang xem lịch sử cũ: giữ nguyên nội dung đang nhìn, không bị đẩy xuống
+            self.log_scroll += h
+
+    def close(self):
+        """Ghi phần lịch sử còn trong RAM ra file (gọi khi thoát game)."""
+        self.logs.close()
+
+    def handle_event(self, event, mouse_pos):
+        """Lăn chuột trên vùng lịch sử để cuộn. Trả về True nếu đã xử lý sự kiện."""
+        if event.type != pygame.MOUSEWHEEL or self._log_rect is None or not self._log_rect.collidepoint(mouse_pos):
+            return False
+        self.scroll_log(-event.y * LOG_SCROLL_STEP)
+        return True
+
+    def scroll_log(self, dy):
+        new = max(0, min(self.log_scroll + dy, self._log_max_scroll()))
+        if new != self.log_scroll:
+            self.log_scroll = new
+            self.version += 1
+
+    def _log_layout(self, seq, message):
+        lay = self._log_layouts.get(seq)
+        if lay is None:
+            lines = wrap_lines(self.log_font, message, self._log_layout_w)
+            line_h = self.log_font.get_height() + self.log_line_gap
+            lay = self._log_layouts[seq] = [lines, line_h * len(lines) + self.log_entry_gap, None]
+        return lay
+
+    def _relayout_log(self, width):
+        """Bề rộng đổi: wrap lại toàn bộ (hiếm khi xảy ra)."""
+        self._log_layouts.clear()
+        self._log_layout_w = width
+        seq, self._log_total_h = self.logs.first, 0
+        for msg in self.logs:
+            self._log_total_h += self._log_layout(seq, msg)[1]
+            seq += 1
+
+    def _log_max_scroll(self):
+        if self._log_rect is None:
+            return 0
+        return max(0, self._log_total_h - self._log_rect.height)
+
+    def draw(self, screen, gm, win_length: int, hints=None):
         x, y = self.rect.x, self.rect.y
         w = self.rect.width
 
         # --- Phần Thông tin & Thứ tự lượt đi (giữ nguyên) ---
-        title = self.h1.render("Thông tin", True, color(TEXT_PRIMARY))
+        title = render_text(self.h1, "Thông tin", color(TEXT_PRIMARY))
         screen.blit(title, (x, y))
         y += title.get_height() + self.sec_gap
 
         cur = gm.current_player
         dir_arrow = "→" if getattr(gm, "turn_dir", 1) > 0 else "←"
         turn_txt = f"Lượt: {cur.name} ({cur.symbol}) {dir_arrow}"
-        screen.blit(self.body.render(turn_txt, True, color(TEXT_PRIMARY)), (x, y))
+        screen.blit(render_text(self.body, turn_txt, color(TEXT_PRIMARY)), (x, y))
         y += 28
         
         skip_sym = getattr(gm, "skip_symbol", None)
         if skip_sym:
             skip_note = f"Sắp bỏ qua lượt của: {skip_sym}"
-            screen.blit(self.small.render(skip_note, True, color(TEXT_MUTED)), (x, y))
+            screen.blit(render_text(self.small, skip_note, color(TEXT_MUTED)), (x, y))
             y += 20
 
         win_txt = f"Thắng: {win_length} liên tiếp"
-        screen.blit(self.body.render(win_txt, True, color(TEXT_PRIMARY)), (x, y))
+        screen.blit(render_text(self.body, win_txt, color(TEXT_PRIMARY)), (x, y))
         y += 32
 
-        screen.blit(self.label.render("Thứ tự lượt:", True, color(TEXT_PRIMARY)), (x, y))
+        screen.blit(render_text(self.label, "Thứ tự lượt:", color(TEXT_PRIMARY)), (x, y))
         y += 24
 
         counts = self._get_owner_counts(gm)
@@ -84,8 +147,7 @@ class SidebarPanel:
             turn_number_str = f"{i + 1}."
             font_weight = "bold" if is_current else "medium"
             number_font = get_font("body", font_weight)
-            number_surf = number_font.render(turn_number_str, True, color(TEXT_PRIMARY))
-            screen.blit(number_surf, (x, y + (chip_h - number_surf.get_height()) // 2))
+            draw_text(screen, number_font, turn_number_str, color(TEXT_PRIMARY), midleft=(x, y + chip_h // 2))
 
             chip_x, chip_w = x + number_gutter, w - number_gutter
             chip = pygame.Rect(chip_x, y, chip_w, chip_h)
@@ -100,31 +162,76 @@ class SidebarPanel:
             pygame.draw.circle(screen, team_color, (dot_x, dot_y), dot_r)
 
             name_txt = f"{p.name} [{p.symbol}]"
-            name_surf = name_font.render(name_txt, True, color(TEXT_PRIMARY))
+            name_surf = render_text(name_font, name_txt, color(TEXT_PRIMARY))
             screen.blit(name_surf, (dot_x + dot_r + 8, chip.y + (chip_h - name_surf.get_height()) // 2))
 
             score = counts.get(p.symbol, 0)
-            score_surf = self.small.render(f"{score}", True, color(TEXT_MUTED))
-            screen.blit(score_surf, (chip.right - score_surf.get_width() - 10, chip.y + (chip_h - score_surf.get_height()) // 2))
+            draw_text(screen, self.small, f"{score}", color(TEXT_MUTED), midright=(chip.right - 10, chip.y + chip_h // 2))
             y += chip_h + self.line_gap
 
         y += self.sec_gap
 
+        # --- Gợi ý (chế độ luyện tập): ô tốt nhất + đe doạ, lấy từ ThreatTracker ---
+        if hints is not None:
+            y = self._draw_hints(screen, hints, ordered_players, x, y, w)
+            y += self.sec_gap
+
         # --- NEW: Vẽ khu vực Lịch sử trận đấu ---
-        screen.blit(self.label.render("Lịch sử:", True, color(TEXT_PRIMARY)), (x, y))
+        screen.blit(render_text(self.label, "Lịch sử:", color(TEXT_PRIMARY)), (x, y))
         y += 24
 
-        for log_msg in self.logs:
-            # Tự động wrap text nếu log quá dài
-            lines = wrap_lines(self.log_font, log_msg, w)
-            for line in lines:
-                log_surf = self.log_font.render(line, True, color(TEXT_SECONDARY))
-                screen.blit(log_surf, (x, y))
-                y += log_surf.get_height() + 2
-            
-            y += 4 # Thêm khoảng cách nhỏ giữa các log
-            if y > screen.get_height() - 20: # Ngăn vẽ tràn ra ngoài
+        self._draw_log(screen, pygame.Rect(x, y, w, max(0, screen.get_height() - 20 - y)))
+
+    def _draw_log(self, screen, rect):
+        """Vẽ lịch sử (mới nhất trên cùng) trong rect, bỏ qua mục nằm ngoài vùng nhìn."""
+        self._log_rect = rect
+        if rect.width != self._log_layout_w:
+            self._relayout_log(rect.width)
+        self.log_scroll = max(0, min(self.log_scroll, self._log_max_scroll()))
+        clip_prev = screen.get_clip()
+        screen.set_clip(rect.clip(clip_prev))
+        txt = color(TEXT_SECONDARY)
+        line_h = self.log_font.get_height() + self.log_line_gap
+        y, seq = rect.y - self.log_scroll, len(self.logs)
+        for msg in self.logs.newest():
+            seq -= 1
+            lay = self._log_layout(seq, msg)
+            if y + lay[1] > rect.y:
+                if lay[2] is None:  # chỉ render khi mục lần đầu lọt vào vùng nhìn
+                    lay[2] = [self.log_font.render(ln, True, txt) for ln in lay[0]]
+                ly = y
+                for surf in lay[2]:
+                    screen.blit(surf, (rect.x, ly))
+                    ly += line_h
+            y += lay[1]
+            if y >= rect.bottom:
                 break
+        screen.set_clip(clip_prev)
+
+        # Thanh cuộn mảnh khi lịch sử dài hơn vùng nhìn
+        max_scroll = self._log_max_scroll()
+        if max_scroll > 0 and rect.height > 0:
+            content_h = max_scroll + rect.height
+            bar_h = max(16, rect.height * rect.height // content_h)
+            bar_y = rect.y + (rect.height - bar_h) * self.log_scroll // max_scroll
+            pygame.draw.rect(screen, color(BACKGROUND_MEDIUM), (rect.right + 4, bar_y, 4, bar_h), border_radius=2)
+
+    def _draw_hints(self, screen, hints, players, x, y, w):
+        screen.blit(render_text(self.label, "Gợi ý:", color(TEXT_PRIMARY)), (x, y))
+        y += 24
+        for p in players:
+            best = ", ".join(_cell_label(c) for c, _ in hints.best_cells(p.symbol, 3)) or "-"
+            threats = hints.threats(p.symbol)
+            line = f"{p.symbol}: {best}"
+            if threats["win_now"]:
+                line += "  Nguy hiểm: " + ", ".join(_cell_label(c) for c in threats["win_now"][:3])
+            elif threats["open"]:
+                line += "  • " + ", ".join(_cell_label(c) for c in threats["open"][:3])
+            for ln in wrap_lines(self.log_font, line, w):
+                surf = self.log_font.render(ln, True, color(TEAM_COLORS.get(p.symbol, TEXT_SECONDARY)))
+                screen.blit(surf, (x, y))
+                y += surf.get_height() + 2
+        return y
 
     @staticmethod
     def _get_owner_counts(gm):
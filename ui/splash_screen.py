@@ -0,0 +1,52 @@
+# ui/splash_screen.py
+import pygame
+from utils.colors import BACKGROUND_LIGHT, BACKGROUND_MEDIUM, TEXT_PRIMARY, TEXT_MUTED, TEAM_COLORS
+from utils.helpers import get_font, color
+
+SPLASH_SIZE = (640, 360)
+
+
+class SplashScreen:
+    """
+    Màn hình chờ lúc khởi động: tiêu đề + thanh tiến trình + nhãn giai đoạn.
+    Vẽ được ngay sau pygame.init() (chỉ cần 2 font), để frame đầu tiên hiện trước khi
+    đọc ngân hàng câu hỏi / nạp ảnh.
+    """
+
+    def __init__(self, title="CỜ GIÁO"):
+        self.title = title
+        self.font_title = get_font("heading1", "bold")
+        self.font_label = get_font("caption", "semibold")
+        self._title_surf = self.font_title.render(title, True, color(TEXT_PRIMARY))
+        self.progress = 0.0
+        self.label = ""
+
+    def pump(self):
+        """Xử lý hàng đợi sự kiện để cửa sổ không bị treo; trả False nếu người dùng đóng cửa sổ."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        return True
+
+    def show(self, screen, progress=None, label=None):
+        """Vẽ một frame splash và flip. progress trong [0, 1]."""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if label is not None:
+            self.label = label
+        sw, sh = screen.get_size()
+        screen.fill(color(BACKGROUND_LIGHT))
+        screen.blit(self._title_surf, self._title_surf.get_rect(center=(sw // 2, sh // 2 - 40)))
+
+        bar = pygame.Rect(0, 0, min(420, sw - 80), 10)
+        bar.center = (sw // 2, sh // 2 + 20)
+        pygame.draw.rect(screen, color(BACKGROUND_MEDIUM), bar, border_radius=5)
+        if self.progress > 0:
+            fill = bar.copy()
+            fill.width = max(10, int(bar.width * self.progress))
+            pygame.draw.rect(screen, color(TEAM_COLORS["A"]), fill, border_radius=5)
+
+        if self.label:
+            surf = self.font_label.render(self.label, True, color(TEXT_MUTED))
+            screen.blit(surf, surf.get_rect(midtop=(sw // 2, bar.bottom + 12)))
+        pygame.display.flip()
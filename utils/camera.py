@@ -0,0 +1,84 @@
+# utils/camera.py
+import math
+
+
+class Camera:
+    """
+    Camera 2D cho bàn cờ: viewport trên màn hình + zoom + pan.
+    - Toạ độ "world" là pixel bàn cờ ở zoom 1 (ô (r, c) nằm tại c*step, r*step).
+    - x, y: toạ độ world tại góc trên-trái của viewport.
+    - Không phụ thuộc pygame (chỉ là toán), để core có thể import nhẹ.
+    """
+
+    def __init__(self, viewport, world_w, world_h, zoom=1.0, min_zoom=None, max_zoom=2.0):
+        self.vx, self.vy, self.vw, self.vh = viewport
+        self.world_w, self.world_h = world_w, world_h
+        self.max_zoom = max_zoom
+        self.min_zoom = min_zoom if min_zoom is not None else min(1.0, self.fit_zoom())
+        self.zoom = max(self.min_zoom, min(self.max_zoom, zoom))
+        self.x, self.y = 0.0, 0.0
+        self._clamp()
+
+    # ---------- Chuyển đổi toạ độ ----------
+    @property
+    def viewport(self):
+        return (self.vx, self.vy, self.vw, self.vh)
+
+    def contains(self, sx, sy):
+        return self.vx <= sx < self.vx + self.vw and self.vy <= sy < self.vy + self.vh
+
+    def to_screen(self, wx, wy):
+        return (self.vx + (wx - self.x) * self.zoom, self.vy + (wy - self.y) * self.zoom)
+
+    def to_world(self, sx, sy):
+        return (self.x + (sx - self.vx) / self.zoom, self.y + (sy - self.vy) / self.zoom)
+
+    def visible_cells(self, step, n):
+        """Khoảng hàng/cột (r0, r1, c0, c1) — nửa mở — đang nằm trong viewport."""
+        x1, y1 = self.x + self.vw / self.zoom, self.y + self.vh / self.zoom
+        c0, r0 = max(0, int(self.x // step)), max(0, int(self.y // step))
+        c1, r1 = min(n, int(math.ceil(x1 / step))), min(n, int(math.ceil(y1 / step)))
+        return r0, r1, c0, c1
+
+    # ---------- Điều khiển ----------
+    def fit_zoom(self):
+        return min(self.vw / max(1, self.world_w), self.vh / max(1, self.world_h))
+
+    def fit(self):
+        self.zoom = max(self.min_zoom, min(self.max_zoom, self.fit_zoom()))
+        self._clamp()
+
+    def zoom_at(self, factor, anchor=None):
+        """Zoom giữ nguyên điểm world dưới anchor (toạ độ màn hình; mặc định: tâm viewport)."""
+        if anchor is None:
+            anchor = (self.vx + self.vw / 2, self.vy + self.vh / 2)
+        wx, wy = self.to_world(*anchor)
+        self.zoom = max(self.min_zoom, min(self.max_zoom, self.zoom * factor))
+        self.x = wx - (anchor[0] - self.vx) / self.zoom
+        self.y = wy - (anchor[1] - self.vy) / self.zoom
+        self._clamp()
+
+    def pan(self, dx, dy):
+        """Kéo bàn theo (dx, dy) pixel màn hình."""
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self._clamp()
+
+    def reveal(self, wx0, wy0, wx1, wy1, margin=0):
+        """Pan ít nhất có thể để vùng world [wx0, wx1] x [wy0, wy1] (cộng lề) nằm trong viewport."""
+        view_w, view_h = self.vw / self.zoom, self.vh / self.zoom
+        if wx0 - margin < self.x:
+            self.x = wx0 - margin
+        elif wx1 + margin > self.x + view_w:
+            self.x = wx1 + margin - view_w
+        if wy0 - margin < self.y:
+            self.y = wy0 - margin
+        elif wy1 + margin > self.y + view_h:
+            self.y = wy1 + margin - view_h
+        self._clamp()
+
+    def _clamp(self):
+        view_w, view_h = self.vw / self.zoom, self.vh / self.zoom
+        # Bàn nhỏ hơn viewport -> căn trái/trên như bố cục cũ; lớn hơn -> không cho kéo ra ngoài
+        self.x = 0.0 if self.world_w <= view_w else max(0.0, min(self.x, self.world_w - view_w))
+        self.y = 0.0 if self.world_h <= view_h else max(0.0, min(self.y, self.world_h - view_h))
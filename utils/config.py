@@ -2,6 +2,9 @@
 
 WIN_LENGTH = 5
 
+# Chế độ luyện tập: sidebar hiện gợi ý ô tốt + đe doạ của từng đội
+PRACTICE_MODE = False
+
 # Font paths
 FONT_MEDIUM   = "assets/fonts/Montserrat-Medium.ttf"
 FONT_SEMIBOLD = "assets/fonts/Montserrat-SemiBold.ttf"
@@ -19,6 +22,26 @@ FONT_SIZES = {
 CELL_SIZE   = 60
 MARGIN      = 8
 PANEL_WIDTH = 300
+MAX_BOARD_VIEW = 840   # vùng bàn cờ tối đa (px); bàn lớn hơn thì dùng camera zoom/pan
 
 # Data path (chỉ là hằng)
-DATA_PATH = "datas/questions.json"
\ No newline at end of file
+DATA_PATH = "datas/questions.json"
+
+# Tỉ lệ rút câu theo tag (trường tags/subject/grade trong ngân hàng), ví dụ {"subject:toán": 2, "subject:văn": 1}.
+# {} = rút theo thứ tự pool như cũ
+QUESTION_TAG_MIX = {}
+
+# Theo dõi file ngân hàng; sửa file khi đang chơi thì nạp lại ngay, không cần khởi động lại
+BANK_HOT_RELOAD = True
+
+# Câu tự luận: thời hạn chấm (ms) trên thread nền; quá hạn thì chấm ngay, chỉ khớp đúng (bỏ phần gần đúng)
+TEXT_ANSWER_JUDGE_MS = 30
+
+# Hover ô sự kiện chưa ai chiếm: hiện thẻ tên sự kiện dưới nhãn ô
+EVENT_HOVER_PREVIEW = True
+
+# Lịch sử mỗi trận (nước đi + log sidebar) ghi vào thư mục này; RAM chỉ giữ phần gần nhất
+MATCH_LOG_DIR = "logs/matches"
+
+# Thống kê thời gian khởi động (first frame / đọc ngân hàng / sẵn sàng), mỗi lần chạy một dòng JSON
+STARTUP_LOG_PATH = "logs/startup.jsonl"
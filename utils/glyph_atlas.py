@@ -0,0 +1,113 @@
+# utils/glyph_atlas.py
+"""
+Vẽ chữ có cache cho các nhãn lặp lại mỗi frame (toạ độ bàn cờ, số đếm ngược, "A."/"B.",
+tooltip, điểm + số thứ tự lượt ở sidebar).
+
+- Chuỗi ngắn (<= SHORT_TEXT_MAX ký tự): ghép từ surface từng glyph đã render sẵn
+  cho mỗi cặp (font, màu) -> không gọi Font.render sau lần đầu gặp glyph.
+- Chuỗi dài hơn (hoặc có dấu tổ hợp cần font tự dựng): render cả chuỗi một lần, giữ trong LRU.
+
+pygame được import trễ như utils.helpers, để core (Board) vẫn import được mà không cần pygame.
+Mỗi atlas gắn với một đối tượng Font; worker thread dùng font riêng (get_thread_font)
+nên cũng có atlas riêng.
+"""
+import unicodedata
+from collections import OrderedDict
+
+SHORT_TEXT_MAX = 8
+FULL_CACHE_MAX = 256
+
+
+class GlyphAtlas:
+    __slots__ = ("font", "rgb", "height", "_glyphs", "_full")
+
+    def __init__(self, font, rgb):
+        self.font = font
+        self.rgb = tuple(rgb[:3])
+        self.height = font.get_height()
+        self._glyphs = {}          # ký tự -> (surface, advance) | None nếu font không có glyph
+        self._full = OrderedDict()  # chuỗi -> surface (LRU)
+
+    def _glyph(self, ch):
+        g = self._glyphs.get(ch, False)
+        if g is False:
+            m = self.font.metrics(ch)
+            if not m or m[0] is None or unicodedata.combining(ch):
+                g = None
+            else:
+                g = (self.font.render(ch, True, self.rgb), m[0][4])
+            self._glyphs[ch] = g
+        return g
+
+    def _glyph_run(self, text):
+        """Danh sách (surface, advance) nếu chuỗi ghép được từ glyph, ngược lại None."""
+        if len(text) > SHORT_TEXT_MAX:
+            return None
+        run = []
+        for ch in text:
+            g = self._glyph(ch)
+            if g is None:
+                return None
+            run.append(g)
+        return run
+
+    def render(self, text):
+        """Surface của cả chuỗi (render một lần, cache LRU). Dùng khi cần surface thật."""
+        surf = self._full.get(text)
+        if surf is None:
+            surf = self._full[text] = self.font.render(text, True, self.rgb)
+            if len(self._full) > FULL_CACHE_MAX:
+                self._full.popitem(last=False)
+        else:
+            self._full.move_to_end(text)
+        return surf
+
+    def size(self, text):
+        run = self._glyph_run(text)
+        if run is None:
+            return self.render(text).get_size()
+        return (sum(adv for _, adv in run), self.height)
+
+    def draw(self, screen, text, **anchor):
+        """
+        Vẽ text lên screen, vị trí theo một thuộc tính Rect (topleft=..., center=..., midright=...).
+        Trả về Rect đã vẽ.
+        """
+        import pygame
+        run = self._glyph_run(text)
+        if run is None:
+            surf = self.render(text)
+            rect = surf.get_rect(**anchor)
+            screen.blit(surf, rect)
+            return rect
+        rect = pygame.Rect(0, 0, sum(adv for _, adv in run), self.height)
+        for k, v in anchor.items():
+            setattr(rect, k, v)
+        x = rect.x
+        for surf, adv in run:
+            screen.blit(surf, (x, rect.y))
+            x += adv
+        return rect
+
+
+_atlases = {}
+
+
+def get_atlas(font, rgb):
+    key = (font, tuple(rgb[:3]))
+    atlas = _atlases.get(key)
+    if atlas is None:
+        if len(_atlases) > 128:
+            _atlases.clear()
+        atlas = _atlases[key] = GlyphAtlas(font, rgb)
+    return atlas
+
+
+def draw_text(screen, font, text, rgb, **anchor):
+    """Thay cho screen.blit(font.render(text, True, rgb), ...) trong vòng vẽ mỗi frame."""
+    return get_atlas(font, rgb).draw(screen, text, **anchor)
+
+
+def render_text(font, text, rgb):
+    """Thay cho font.render(text, True, rgb) khi cần surface; có cache."""
+    return get_atlas(font, rgb).render(text)
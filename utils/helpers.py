@@ -1,17 +1,14 @@
 # utils/helpers.py
-import pygame
+import threading
 from utils.config import FONT_MEDIUM, FONT_SEMIBOLD, FONT_BOLD, FONT_SIZES
+from utils.text_metrics import text_metrics, MAX_ERROR_PX
 
 # ---------------- Font helpers (memoized) ----------------
 _font_cache = {}
+_font_lock = threading.Lock()      # FreeType: tạo face mới phải tuần tự
+_thread_fonts = threading.local()  # Font riêng cho từng worker thread
 
-def get_font(style="body", weight="medium"):
-    """
-    Lấy pygame.font.Font theo (style, weight), có cache để tránh load nhiều lần.
-    """
-    key = (style, weight)
-    if key in _font_cache:
-        return _font_cache[key]
+def _load_font(style, weight):
     size = FONT_SIZES.get(style, 22)
     if weight == "bold":
         path = FONT_BOLD
@@ -19,9 +16,37 @@ def get_font(style="body", weight="medium"):
         path = FONT_SEMIBOLD
     else:
         path = FONT_MEDIUM
-    _font_cache[key] = pygame.font.Font(path, size)
+    import pygame  # import trễ: module này còn được core dùng (không cần pygame lúc import)
+    with _font_lock:
+        return pygame.font.Font(path, size)
+
+def get_font(style="body", weight="medium"):
+    """
+    Lấy pygame.font.Font theo (style, weight), có cache để tránh load nhiều lần.
+    Chỉ dùng trên main thread (UI).
+    """
+    key = (style, weight)
+    if key in _font_cache:
+        return _font_cache[key]
+    _font_cache[key] = _load_font(style, weight)
     return _font_cache[key]
 
+def get_thread_font(style="body", weight="medium"):
+    """
+    Giống get_font nhưng mỗi thread có bộ Font riêng.
+    Một đối tượng Font không an toàn khi dùng đồng thời từ nhiều thread,
+    nên worker (ví dụ prefetch câu hỏi) phải dùng hàm này thay vì get_font.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return get_font(style, weight)
+    cache = getattr(_thread_fonts, "cache", None)
+    if cache is None:
+        cache = _thread_fonts.cache = {}
+    key = (style, weight)
+    if key not in cache:
+        cache[key] = _load_font(style, weight)
+    return cache[key]
+
 # ---------------- Color helpers (RGB-safe) ----------------
 def hex_to_rgb(value: str):
     """
@@ -38,6 +63,7 @@ def hex_to_rgb(value: str):
             pass
     # fallback: pygame.Color có thể hiểu nhiều định dạng
     try:
+        import pygame
         col = pygame.Color(value)
         return (col.r, col.g, col.b)
     except Exception:
@@ -50,29 +76,23 @@ def color(c):
     - hex string '#RRGGBB' hoặc 'RRGGBB' -> (r,g,b)
     - loại khác -> trả lại nguyên giá trị (để không phá vỡ nơi khác)
     """
-    if isinstance(c, pygame.Color):
-        return (c.r, c.g, c.b)
     if isinstance(c, (list, tuple)):
         # Cho phép (r,g,b,a) -> cắt alpha
         return tuple(c[:3])
     if isinstance(c, str):
         return hex_to_rgb(c)
+    if hasattr(c, "r") and hasattr(c, "g") and hasattr(c, "b"):  # pygame.Color
+        return (c.r, c.g, c.b)
     return c
 
 # ---------------- Text wrapping ----------------
+# Đo qua utils.text_metrics (advance từng glyph + kerning đã cache), không gọi font.size cho từng từ / tiền tố;
+# chỉ khi ước lượng cách max_width trong MAX_ERROR_PX mới đo lại bằng font.size để quyết định chỗ ngắt.
 def fit_substring(word: str, font, max_width: int) -> str:
     """Lấy phần đầu của 'word' vừa với max_width (dùng cho từ siêu dài)."""
     if not word:
         return ""
-    lo, hi, best = 1, len(word), 1
-    while lo <= hi:
-        mid = (lo + hi) // 2
-        if font.size(word[:mid])[0] <= max_width:
-            best = mid
-            lo = mid + 1
-        else:
-            hi = mid - 1
-    return word[:best]
+    return word[:text_metrics(font).fit(word, max_width)]
 
 def wrap_lines(font, text, max_width):
     """
@@ -81,6 +101,7 @@ def wrap_lines(font, text, max_width):
     - Bẻ cả 'từ' quá dài nếu vượt max_width.
     """
     lines_out = []
+    tm = text_metrics(font)
     paragraphs = text.split('\n') if text else []
     for raw in paragraphs:
         raw = raw.strip()
@@ -89,10 +110,12 @@ def wrap_lines(font, text, max_width):
             continue
 
         words, cur, cur_w = raw.split(' '), [], 0
-        space_w = font.size(' ')[0]
+        space_w = tm.width(' ')
 
         for w in words:
-            wpx = font.size(w)[0]
+            wpx = tm.width(w)
+            if abs(wpx - max_width) <= MAX_ERROR_PX:
+                wpx = font.size(w)[0]
 
             # Nếu từ đơn lẻ đã quá rộng, bẻ nhỏ theo pixel
             if wpx > max_width:
@@ -102,8 +125,8 @@ def wrap_lines(font, text, max_width):
                     cur, cur_w = [], 0
                 # bẻ từ thành nhiều mảnh
                 rest = w
-                while font.size(rest)[0] > max_width and len(rest) > 0:
-                    cut = fit_substring(rest, font, max_width)
+                while len(rest) > 0 and font.size(rest)[0] > max_width:
+                    cut = rest[:tm.fit(rest, max_width)]
                     lines_out.append(cut)
                     rest = rest[len(cut):]
                 if rest:
@@ -111,11 +134,13 @@ def wrap_lines(font, text, max_width):
                     cur_w = font.size(rest)[0]
                 continue
 
-            # ghép thêm w vào dòng hiện tại nếu còn chỗ
-            add = (space_w if cur else 0) + wpx
-            if cur_w + add <= max_width:
+            # ghép thêm w vào dòng hiện tại nếu còn chỗ (sát giới hạn: đo cả dòng thật)
+            new_w = cur_w + (space_w if cur else 0) + wpx
+            if abs(new_w - max_width) <= MAX_ERROR_PX:
+                new_w = font.size(' '.join(cur + [w]))[0]
+            if new_w <= max_width:
                 cur.append(w)
-                cur_w += add
+                cur_w = new_w
             else:
                 # đẩy dòng cũ, bắt đầu dòng mới với w
                 lines_out.append(' '.join(cur) if cur else w)
@@ -130,7 +155,5 @@ def text_block_height(font, lines, line_spacing=6):
     """Tính tổng chiều cao khối text đã wrap."""
     if not lines:
         return 0
-    h = 0
-    for ln in lines:
-        h += font.size(ln)[1] + line_spacing
-    return h - line_spacing  # bỏ spacing dư cuối
+    # font.size(ln)[1] luôn là chiều cao font, không phụ thuộc nội dung dòng
+    return len(lines) * (font.get_height() + line_spacing) - line_spacing  # bỏ spacing dư cuối
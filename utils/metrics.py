@@ -0,0 +1,130 @@
+# utils/metrics.py
+"""
+Registry số đo trong tiến trình (không phụ thuộc pygame).
+
+    from utils.metrics import REGISTRY
+    REGISTRY.histogram("answer.submit_ns", team="A").observe(dt_ns)
+    REGISTRY.summaries("answer.submit_ns", by="team")   # {"A": {...}, "B": {...}}
+
+Histogram lưu bucket log (mỗi bucket rộng ~10%) dạng dict thưa: bộ nhớ nhỏ và không đổi theo
+số mẫu, nên giữ được một histogram cho từng câu hỏi. Phân vị tính từ bucket (sai số <~5%);
+n / mean / min / max là chính xác.
+"""
+import json
+import math
+import os
+import threading
+
+_LOG_BASE = math.log(1.1)
+
+
+class Histogram:
+    __slots__ = ("unit", "count", "total", "min", "max", "_buckets")
+
+    def __init__(self, unit="ns"):
+        self.unit = unit
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._buckets = {}  # chỉ số bucket -> số mẫu
+
+    @staticmethod
+    def _bucket(v):
+        return -1 if v <= 0 else int(math.log(v) / _LOG_BASE)
+
+    @staticmethod
+    def _bucket_mid(b):
+        return 0.0 if b < 0 else math.exp((b + 0.5) * _LOG_BASE)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        b = self._bucket(value)
+        self._buckets[b] = self._buckets.get(b, 0) + 1
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank, seen = p * (self.count - 1), 0
+        for b in sorted(self._buckets):
+            seen += self._buckets[b]
+            if seen > rank:
+                return min(self.max, max(self.min, self._bucket_mid(b)))
+        return self.max
+
+    def summary(self):
+        """Thống kê; histogram đơn vị ns được đổi sang ms (khớp benchmarks._common.summarize)."""
+        if not self.count:
+            return {"n": 0}
+        if self.unit == "ns":
+            scale, suffix = 1e-6, "_ms"
+        else:
+            scale, suffix = 1.0, ""
+        out = {"n": self.count, "mean" + suffix: self.total / self.count * scale,
+               "min" + suffix: self.min * scale, "max" + suffix: self.max * scale}
+        for p in (0.5, 0.9, 0.99):
+            out[f"p{int(p * 100)}" + suffix] = self.percentile(p) * scale
+        return out
+
+
+class MetricsRegistry:
+    """Histogram theo (tên, nhãn). Tạo histogram có khoá; observe không cần khoá (chỉ main thread ghi)."""
+
+    def __init__(self):
+        self._hists = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, unit="ns", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        h = self._hists.get(key)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(key, Histogram(unit))
+        return h
+
+    def observe(self, name, value, unit="ns", **labels):
+        self.histogram(name, unit, **labels).observe(value)
+
+    def names(self):
+        return sorted({name for name, _ in self._hists})
+
+    def summaries(self, name, by=None):
+        """
+        Thống kê của mọi histogram tên name. by=None -> khoá là tuple nhãn;
+        by="team" -> khoá là giá trị nhãn team (chỉ các histogram có đúng một nhãn đó).
+        """
+        out = {}
+        for (n, labels), h in list(self._hists.items()):
+            if n != name:
+                continue
+            if by is None:
+                out[labels] = h.summary()
+            elif len(labels) == 1 and labels[0][0] == by:
+                out[labels[0][1]] = h.summary()
+        return out
+
+    def snapshot(self):
+        """{tên: [{"labels": {...}, ...thống kê}]} — dạng JSON được."""
+        out = {}
+        for (name, labels), h in sorted(self._hists.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+            out.setdefault(name, []).append(dict(h.summary(), labels=dict(labels)))
+        return out
+
+    def dump(self, path):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,122 @@
+# utils/ring_log.py
+import json
+import os
+
+
+class RingLog:
+    """
+    Log dung lượng cố định trong RAM + (tuỳ chọn) toàn bộ lịch sử trong file append-only.
+
+    - Mỗi mục có số thứ tự tuyệt đối (seq) tăng dần từ 0; log[seq] / log[a:b] dùng seq này,
+      len(log) = seq của mục kế tiếp — như một list mà phần đầu (seq < first) chỉ còn trên đĩa.
+    - Mỗi mục được ghi + flush vào spill_path (mỗi mục một dòng) ngay khi append: tiến trình chết giữa chừng
+      cũng không mất gì. Ring chỉ là phần nhìn trong RAM; khi đầy, mục cũ nhất bị ghi đè: bộ nhớ không đổi.
+    - del log[n:] (undo) chỉ cắt được phần còn trong RAM; file bị cắt (truncate) về đúng vị trí của mục n,
+      nên file luôn khớp lịch sử hiện tại.
+    """
+
+    def __init__(self, capacity, spill_path=None, encode=None):
+        self.capacity = max(1, int(capacity))
+        self.spill_path = spill_path
+        self._encode = encode or (lambda entry: json.dumps(entry, ensure_ascii=False))
+        self._buf = [None] * self.capacity
+        self._offsets = [0] * self.capacity  # vị trí byte trong spill_path nơi mỗi mục trong RAM bắt đầu
+        self._start = 0   # vị trí trong _buf của mục cũ nhất
+        self._count = 0   # số mục đang giữ
+        self.total = 0    # số mục đã từng thêm (trừ phần bị cắt)
+        self._spill = None
+
+    # ---------- Thông tin ----------
+    @property
+    def first(self):
+        """seq của mục cũ nhất còn trong RAM."""
+        return self.total - self._count
+
+    def __len__(self):
+        return self.total
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __iter__(self):
+        """Các mục còn trong RAM, cũ -> mới."""
+        buf, cap, start = self._buf, self.capacity, self._start
+        for i in range(self._count):
+            yield buf[(start + i) % cap]
+
+    def newest(self, n=None):
+        """Các mục mới nhất trước (tối đa n)."""
+        buf, cap = self._buf, self.capacity
+        k = self._count if n is None else min(n, self._count)
+        for i in range(k):
+            yield buf[(self._start + self._count - 1 - i) % cap]
+
+    # ---------- Truy cập theo seq ----------
+    def _index(self, seq):
+        if seq < 0:
+            seq += self.total
+        if not self.first <= seq < self.total:
+            raise IndexError(f"seq {seq} not in memory [{self.first}, {self.total})")
+        return (self._start + seq - self.first) % self.capacity
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.total)
+            return [self._buf[self._index(s)] for s in range(max(start, self.first), stop, step)]
+        return self._buf[self._index(key)]
+
+    def __delitem__(self, key):
+        if not isinstance(key, slice) or key.stop is not None or key.step not in (None, 1):
+            raise TypeError("RingLog only supports truncating the tail: del log[n:]")
+        n = key.start or 0
+        if n < 0:
+            n += self.total
+        n = max(self.first, min(n, self.total))
+        if n < self.total and self._spill is not None:
+            self._spill.truncate(self._offsets[self._index(n)])
+        for seq in range(n, self.total):
+            self._buf[self._index(seq)] = None
+        drop = self.total - n
+        self._count -= drop
+        self.total -= drop
+
+    # ---------- Ghi ----------
+    def append(self, entry):
+        if self._count == self.capacity:
+            i = self._start
+            self._start = (self._start + 1) % self.capacity
+        else:
+            i = (self._start + self._count) % self.capacity
+            self._count += 1
+        self._buf[i] = entry
+        self._offsets[i] = self._write(entry)
+        self.total += 1
+
+    def extend(self, entries):
+        for e in entries:
+            self.append(e)
+
+    def clear(self):
+        """Bỏ mọi mục trong RAM (cắt cả phần tương ứng trong file)."""
+        del self[self.first:]
+
+    def _write(self, entry):
+        """Ghi + flush một mục; trả về vị trí byte nơi mục bắt đầu (0 nếu không có spill_path)."""
+        if self.spill_path is None:
+            return 0
+        if self._spill is None:
+            d = os.path.dirname(self.spill_path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._spill = open(self.spill_path, "ab")
+        f = self._spill
+        offset = f.seek(0, os.SEEK_END)
+        f.write((self._encode(entry) + "\n").encode("utf-8"))
+        f.flush()
+        return offset
+
+    def close(self):
+        """Đóng file (mọi mục đã được ghi lúc append)."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
@@ -0,0 +1,137 @@
+# utils/text_metrics.py
+"""
+Đo bề rộng chữ không qua FreeType cho mỗi chuỗi (dùng cho wrap_lines / fit_substring).
+
+- Mỗi font một TextMetrics: advance từng glyph (Font.metrics, hỏi một lần / ký tự) + bảng kerning theo cặp
+  chữ gốc: "Tạ", "Tà", "Ta" dùng chung hiệu chỉnh của cặp "Ta" (bỏ dấu trước khi tra), nên tiếng Việt
+  nhiều dấu chỉ cần vài trăm cặp cho cả ngân hàng thay vì mỗi tổ hợp dấu một cặp.
+- width(s) = tổng advance + tổng kerning các cặp kề; từ ngắn được cache nguyên chuỗi (từ lặp lại rất nhiều).
+  Chỉ là ước lượng: Font.size đặt glyph theo toạ độ lẻ pixel và tính cả phần glyph cuối tràn khỏi advance,
+  nên không cộng dồn được. Trên ngân hàng câu hỏi (3 font giao diện) ~40% chuỗi lệch, tới ±6 px; học kerning
+  theo cặp ký tự thật thay vì cặp chữ gốc còn lệch nhiều hơn (sai số làm tròn dồn theo từng cặp).
+  Vì vậy khi ước lượng cách giới hạn trong MAX_ERROR_PX, wrap_lines / fit đo lại bằng Font.size.
+- Ký tự font không có glyph / dấu tổ hợp rời (chuỗi chưa NFC) -> đo cả chuỗi bằng Font.size như cũ.
+  Ngân hàng câu hỏi đã NFC từ lúc nạp (core.question_manager.normalize_question).
+
+Như glyph_atlas: mỗi TextMetrics gắn với một đối tượng Font; worker thread dùng font riêng (get_thread_font)
+nên cũng có TextMetrics riêng. pygame không được import ở đây.
+"""
+import unicodedata
+from typing import Dict, Optional
+
+WORD_CACHE_MAX = 4096
+WORD_CACHE_LEN = 32  # chỉ cache nguyên chuỗi cho chuỗi ngắn (từ, nhãn)
+MAX_ERROR_PX = 8     # |width - Font.size| lớn nhất đo được là 6 px; gần giới hạn hơn mức này -> đo thật
+
+
+def _base_char(ch: str) -> str:
+    """Chữ gốc để tra kerning: bỏ dấu tiếng Việt (ạ -> a, Đ -> D)."""
+    if ch < "À":
+        return ch
+    if ch in "đĐ":
+        return "d" if ch == "đ" else "D"
+    return unicodedata.normalize("NFD", ch)[0]
+
+
+class TextMetrics:
+    __slots__ = ("font", "height", "_adv", "_base", "_kern", "_words")
+
+    def __init__(self, font):
+        self.font = font
+        self.height = font.get_height()
+        self._adv: Dict[str, Optional[int]] = {}   # ký tự -> advance (px) | None nếu phải đo bằng Font.size
+        self._base: Dict[str, str] = {}
+        self._kern: Dict[str, int] = {}            # cặp chữ gốc -> hiệu chỉnh (px)
+        self._words: Dict[str, int] = {}
+
+    def advance(self, ch: str) -> Optional[int]:
+        adv = self._adv.get(ch, False)
+        if adv is False:
+            m = self.font.metrics(ch)
+            adv = None if not m or m[0] is None or unicodedata.combining(ch) else m[0][4]
+            self._adv[ch] = adv
+            self._base[ch] = _base_char(ch)
+        return adv
+
+    def kerning(self, a: str, b: str) -> int:
+        """Hiệu chỉnh giữa hai ký tự kề nhau, học từ Font.size của cặp chữ gốc (một lần mỗi cặp)."""
+        pair = self._base[a] + self._base[b]
+        k = self._kern.get(pair)
+        if k is None:
+            ba, bb = self.advance(pair[0]), self.advance(pair[1])
+            k = 0 if ba is None or bb is None else self.font.size(pair)[0] - ba - bb
+            self._kern[pair] = k
+        return k
+
+    def _measure(self, text: str) -> int:
+        total, prev = 0, None
+        for ch in text:
+            adv = self.advance(ch)
+            if adv is None:
+                return self.font.size(text)[0]
+            total += adv
+            if prev is not None:
+                total += self.kerning(prev, ch)
+            prev = ch
+        return total
+
+    def width(self, text: str) -> int:
+        if len(text) > WORD_CACHE_LEN:
+            return self._measure(text)
+        w = self._words.get(text)
+        if w is None:
+            if len(self._words) >= WORD_CACHE_MAX:
+                self._words.clear()
+            w = self._words[text] = self._measure(text)
+        return w
+
+    def size(self, text: str):
+        """Như Font.size: (bề rộng, chiều cao font)."""
+        return self.width(text), self.height
+
+    def fit(self, text: str, max_width: int) -> int:
+        """
+        Số ký tự đầu của text vừa max_width (ít nhất 1): cộng dồn advance tới chỗ ước lượng vượt giới hạn,
+        rồi chỉnh lại điểm cắt bằng Font.size (vài lần đo quanh điểm đó, không tìm nhị phân cả chuỗi).
+        """
+        total, prev, n = 0, None, len(text)
+        for i, ch in enumerate(text):
+            adv = self.advance(ch)
+            if adv is None:
+                return self._fit_slow(text, max_width)
+            total += adv + (self.kerning(prev, ch) if prev is not None else 0)
+            if total > max_width:
+                n = i
+                break
+            prev = ch
+        if total < max_width - MAX_ERROR_PX:
+            return max(1, n)
+        size = self.font.size
+        while n > 1 and size(text[:n])[0] > max_width:
+            n -= 1
+        while n < len(text) and size(text[:n + 1])[0] <= max_width:
+            n += 1
+        return max(1, n)
+
+    def _fit_slow(self, text: str, max_width: int) -> int:
+        lo, hi, best = 1, len(text), 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if self.font.size(text[:mid])[0] <= max_width:
+                best = mid
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return best
+
+
+_metrics = {}
+
+
+def text_metrics(font) -> TextMetrics:
+    tm = _metrics.get(font)
+    if tm is None:
+        if len(_metrics) > 64:
+            _metrics.clear()
+        tm = _metrics[font] = TextMetrics(font)
+    return tm